@@ -1,15 +1,28 @@
+import os
+import sys
 import streamlit as st
 from langfuse import get_client
 import langfuse as langfuse_module
 import pandas as pd
 import plotly.express as px
 import time
+import ast
 from datetime import datetime
 from streamlit_autorefresh import st_autorefresh
 from importlib.metadata import version, PackageNotFoundError
 
 from dotenv import load_dotenv
 load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config.settings import (
+    TRACE_STORE_PATH, TRACE_SYNC_PAGE_SIZE, TRACE_SYNC_MAX_PAGES, TRACE_SYNC_OVERLAP_S
+)
+from utils.trace_store import TraceStore
+from utils.csv_table import (
+    StaleRowError, apply_row_edits, distinct_values, file_fingerprint, read_page
+)
+from utils.file_lock import FileLockTimeout
 
 st.set_page_config(
     page_title="Agent Admin Dashboard",
@@ -20,48 +33,149 @@ st.set_page_config(
 # Automatically refresh every 10 seconds
 st_autorefresh(interval=10000, key="datarefresh")
 
+TABLE_PAGE_SIZE = 50
+DATA_PAGE_SIZE = 100
+
+DATA_TABLES = {
+    "Room Bookings": "data/bookings.csv",
+    "Room Service Orders": "data/room_service.csv",
+    "Transport Bookings": "data/transport_bookings.csv",
+    "Festival Discounts": "data/festivals.csv",
+    "Room Inventory": "data/room_inventory.csv",
+    "Social Media": "data/social_media.csv"
+}
+
 try:
     langfuse_client = get_client()
 except Exception as e:
     st.error(f"Langfuse error: {e}")
     st.stop()
 
-@st.cache_data(ttl=300)
-def get_traces():
+@st.cache_resource
+def get_trace_store():
+    return TraceStore(TRACE_STORE_PATH)
+
+def sync_traces(store):
+    """Pulls only the traces added since the last refresh into the local store."""
     try:
-        traces_page = langfuse_client.api.trace.list(limit=20)
-        return traces_page.data
+        return store.sync(
+            langfuse_client.api,
+            page_size=TRACE_SYNC_PAGE_SIZE,
+            max_pages=TRACE_SYNC_MAX_PAGES,
+            overlap_s=TRACE_SYNC_OVERLAP_S,
+        )
     except Exception as e:
         st.sidebar.error(f"Trace error: {e}")
-        return []
+        return 0
+
+def format_seconds(value):
+    return f"{value:.2f}" if value is not None else "N/A"
+
+# The file fingerprint is part of the cache key, so a page is only re-read after the file changes.
+@st.cache_data(max_entries=32)
+def load_table_page(file_path, page, statuses, fingerprint):
+    where = (lambda row: row.get("status") in statuses) if statuses is not None else None
+    return read_page(file_path, offset=(page - 1) * DATA_PAGE_SIZE, limit=DATA_PAGE_SIZE, where=where)
 
-def render_dashboard(traces):
-    if not traces:
+@st.cache_data(max_entries=32)
+def load_statuses(file_path, fingerprint):
+    return distinct_values(file_path, "status")
+
+def format_items(value):
+    """Shows room service items stored as a Python list literal as a plain list."""
+    if value.startswith("["):
+        try:
+            return ", ".join(ast.literal_eval(value))
+        except (ValueError, SyntaxError):
+            pass
+    return value
+
+def collect_row_edits(editor_state, rows):
+    """Turns the data editor's pending changes into row-level updates, deletes and inserts."""
+    updates = {
+        rows[int(position)]["index"]: (
+            rows[int(position)]["hash"],
+            {column: "" if value is None else value for column, value in changes.items()},
+        )
+        for position, changes in editor_state.get("edited_rows", {}).items()
+    }
+    deletes = {rows[int(position)]["index"]: rows[int(position)]["hash"] for position in editor_state.get("deleted_rows", [])}
+    inserts = [row for row in editor_state.get("added_rows", []) if any(row.values())]
+    return updates, deletes, inserts
+
+def render_data_overview():
+    st.markdown("## 📝 Data Overview")
+
+    selected_table = st.selectbox("Select Booking Table", options=list(DATA_TABLES.keys()))
+    file_path = DATA_TABLES[selected_table]
+
+    try:
+        fingerprint = file_fingerprint(file_path)
+        statuses = None
+        if "status" in load_table_page(file_path, 1, None, fingerprint)["columns"]:
+            unique_statuses = load_statuses(file_path, fingerprint)
+            selected_statuses = st.multiselect("Filter by Status", unique_statuses, default=unique_statuses)
+            statuses = tuple(selected_statuses)
+
+        # Only the page being viewed is loaded; rows keep their position in the file for saving.
+        page = st.number_input("Page", min_value=1, value=1, step=1, key=f"page_{selected_table}")
+        table_page = load_table_page(file_path, page, statuses, fingerprint)
+        rows = table_page["rows"]
+        df_table = pd.DataFrame([row["values"] for row in rows], columns=table_page["columns"])
+
+        read_only = []
+        if selected_table == "Room Service Orders" and "items" in df_table.columns:
+            df_table["items"] = df_table["items"].apply(format_items)
+            read_only.append("items")
+
+        st.markdown(f"### 📄 {selected_table} (Editable)")
+        if "status" in df_table.columns:
+            st.markdown("🖋️ **Edit Status or Sort Any Column Below**")
+
+        # Bumped after each save so the editor starts again from the saved file.
+        version_key = f"editor_version_{selected_table}"
+        editor_key = f"editor_{selected_table}_{page}_{statuses}_{st.session_state.get(version_key, 0)}"
+        st.data_editor(
+            df_table,
+            use_container_width=True,
+            num_rows="dynamic",
+            hide_index=True,
+            disabled=read_only,
+            key=editor_key,
+        )
+
+        st.metric(f"{selected_table}", table_page["total"])
+        st.caption(f"Rows {(page - 1) * DATA_PAGE_SIZE + 1}–{(page - 1) * DATA_PAGE_SIZE + len(rows)} of {table_page['total']}")
+
+        if st.button("💾 Save Changes"):
+            updates, deletes, inserts = collect_row_edits(st.session_state.get(editor_key, {}), rows)
+            if not (updates or deletes or inserts):
+                st.info("No changes to save.")
+                return
+            try:
+                changed = apply_row_edits(file_path, updates=updates, deletes=deletes, inserts=inserts)
+                st.session_state[version_key] = st.session_state.get(version_key, 0) + 1
+                st.success(f"✅ Saved {changed} row change(s).")
+                st.rerun()
+            except StaleRowError as e:
+                st.session_state[version_key] = st.session_state.get(version_key, 0) + 1
+                st.error(f"❌ {len(e.conflicts)} row(s) were changed by someone else since you loaded them. Nothing was saved; the table has been reloaded, please re-apply your edits.")
+            except FileLockTimeout:
+                st.error("❌ The file is busy, please try saving again.")
+            except Exception as e:
+                st.error(f"❌ Failed to save changes: {e}")
+
+    except FileNotFoundError:
+        st.error(f"❌ File not found: {file_path}")
+    except Exception as e:
+        st.error(f"⚠️ Error loading data: {e}")
+
+def render_dashboard(store, new_traces):
+    kpis_all = store.kpis()
+    if not kpis_all["traces"]:
         st.warning("No traces found. Trigger some agent calls first.")
         return
 
-    # Build DataFrame
-    trace_data = []
-    for trace in traces:
-        trace_input = trace.input or {}
-        trace_output = trace.output or {}
-        metadata = trace.metadata or {}
-        trace_data.append({
-            "Trace ID": trace.id,
-            "Timestamp": trace.timestamp,
-            "Language": trace_input.get("detected_language", "N/A"),
-            "User Query": trace_input.get("original_query", "N/A"),
-            "Agent Response": trace_output.get("aggregated_output", "N/A"),
-            "Intents": ", ".join(trace_output.get("intents") or []),
-            "Agents Run": ", ".join(trace_output.get("processed_intents") or []),
-            "Latency (s)": trace.latency if trace.latency is not None else None,
-            "Observations": len(trace.observations) if trace.observations else 0,
-            "Trace URL": langfuse_client.get_trace_url(trace_id=trace.id)
-        })
-
-    df = pd.DataFrame(trace_data)
-    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
-
     # Sidebar Filters
     st.sidebar.header("🔍 Filters")
 
@@ -71,48 +185,66 @@ def render_dashboard(traces):
         langfuse_version = "not installed"
 
     st.sidebar.info(f"Langfuse v{langfuse_version}")
-    st.sidebar.markdown(f"🕒 Last Sync: {datetime.now().strftime('%H:%M:%S')}")
+    st.sidebar.markdown(f"🕒 Last Sync: {datetime.now().strftime('%H:%M:%S')} (+{new_traces} traces)")
 
-    lang_options = ["All"] + sorted(df["Language"].dropna().unique().tolist())
+    lang_options = ["All"] + store.languages()
     selected_lang = st.sidebar.selectbox("Language", lang_options)
-    if selected_lang != "All":
-        df = df[df["Language"] == selected_lang]
-
-    agent_options = sorted(set(agent for x in df["Agents Run"] for agent in x.split(", ") if agent))
-    selected_agents = st.sidebar.multiselect("Agent(s)", agent_options)
-    if selected_agents:
-        df = df[df["Agents Run"].str.contains("|".join(selected_agents))]
-
-    # KPIs
-    kpi1, kpi2 = st.columns(2)
-    kpi1.metric("📈 Total Traces", len(df))
-    kpi2.metric("⏱️ Avg Latency (s)", f"{df['Latency (s)'].dropna().mean():.2f}" if not df['Latency (s)'].isna().all() else "N/A")
+    languages = [selected_lang] if selected_lang != "All" else None
+
+    selected_agents = st.sidebar.multiselect("Agent(s)", store.agents())
+
+    # KPIs, over the full trace history
+    kpis = store.kpis(languages, selected_agents)
+    kpi1, kpi2, kpi3, kpi4 = st.columns(4)
+    kpi1.metric("📈 Total Traces", kpis["traces"])
+    kpi2.metric("⏱️ Avg Latency (s)", format_seconds(kpis["mean_latency"]))
+    kpi3.metric("⏱️ p50 Latency (s)", format_seconds(kpis["p50_latency"]))
+    kpi4.metric("⏱️ p95 Latency (s)", format_seconds(kpis["p95_latency"]))
+
+    # Only the displayed page of traces is loaded from the store
+    page = st.sidebar.number_input("Table page", min_value=1, value=1, step=1)
+    rows = store.recent(
+        limit=TABLE_PAGE_SIZE, offset=(page - 1) * TABLE_PAGE_SIZE,
+        languages=languages, agents=selected_agents,
+    )
+    df = pd.DataFrame([
+        {
+            "Trace ID": row["id"],
+            "Timestamp": pd.to_datetime(row["timestamp"]),
+            "Language": row["language"],
+            "User Query": row["user_query"],
+            "Agent Response": row["agent_response"],
+            "Intents": row["intents"],
+            "Agents Run": row["agents_run"],
+            "Latency (s)": row["latency"],
+            "Observations": row["observations"],
+            "Trace URL": langfuse_client.get_trace_url(trace_id=row["id"])
+        }
+        for row in rows
+    ])
 
     # Tabs
     tab1, tab2, tab3, tab4 = st.tabs(["📋 Table View", "📊 Visual Analytics", "🧠 Trace Breakdown", "📝 Data Overview"])
 
     with tab1:
-        st.dataframe(
-            df,
-            column_config={
-                "Trace URL": st.column_config.LinkColumn("Trace", display_text="🔗 Open")
-            },
-            use_container_width=True,
-            hide_index=True
-        )
+        if df.empty:
+            st.info("No traces match the filters on this page.")
+        else:
+            st.dataframe(
+                df,
+                column_config={
+                    "Trace URL": st.column_config.LinkColumn("Trace", display_text="🔗 Open")
+                },
+                use_container_width=True,
+                hide_index=True
+            )
 
     with tab2:
         col1, col2 = st.columns(2)
 
         with col1:
-            if "Agents Run" in df.columns:
-                agent_counts = (
-                    df["Agents Run"]
-                    .str.split(", ")
-                    .explode()
-                    .value_counts()
-                    .reset_index()
-                )
+            agent_counts = pd.DataFrame(store.agent_counts(languages, selected_agents), columns=["agent", "count"])
+            if not agent_counts.empty:
                 agent_counts.columns = ["Agent", "Count"]
                 fig_agents = px.bar(
                     agent_counts,
@@ -124,92 +256,42 @@ def render_dashboard(traces):
                 st.plotly_chart(fig_agents, use_container_width=True)
 
         with col2:
-            if "Latency (s)" in df.columns and not df['Latency (s)'].isna().all():
-                fig_latency = px.histogram(
-                    df,
+            latency_histogram = pd.DataFrame(store.latency_histogram(languages, selected_agents), columns=["le", "count"])
+            if not latency_histogram.empty:
+                latency_histogram.columns = ["Latency (s)", "Traces"]
+                fig_latency = px.bar(
+                    latency_histogram,
                     x="Latency (s)",
-                    nbins=10,
+                    y="Traces",
                     title="⏱️ Latency Distribution"
                 )
                 st.plotly_chart(fig_latency, use_container_width=True)
 
         st.markdown("### 📅 Traces Over Time")
 
-        if "Timestamp" in df.columns:
-            df["Date"] = pd.to_datetime(df["Timestamp"]).dt.date
-            daily_counts = df.groupby("Date").size().reset_index(name="Traces")
+        daily_counts = pd.DataFrame(store.daily_volume(languages, selected_agents), columns=["date", "count"])
+        if not daily_counts.empty:
+            daily_counts.columns = ["Date", "Traces"]
             fig_time = px.line(daily_counts, x="Date", y="Traces", title="📈 Daily Trace Count")
             st.plotly_chart(fig_time, use_container_width=True)
 
     with tab3:
-        selected_trace = st.selectbox("Select Trace for Details", df["Trace ID"])
-        selected = df[df["Trace ID"] == selected_trace].iloc[0]
-
-        st.markdown(f"**User Query:** {selected['User Query']}")
-        st.markdown(f"**Agent Response:** {selected['Agent Response']}")
-        st.markdown(f"**Agents Involved:** {selected['Agents Run']}")
-        st.markdown(f"**Latency:** {selected['Latency (s)']} seconds")
-        st.markdown(f"[🔗 View Full Trace in Langfuse]({selected['Trace URL']})")
+        if df.empty:
+            st.info("No traces match the filters on this page.")
+        else:
+            selected_trace = st.selectbox("Select Trace for Details", df["Trace ID"])
+            selected = df[df["Trace ID"] == selected_trace].iloc[0]
+
+            st.markdown(f"**User Query:** {selected['User Query']}")
+            st.markdown(f"**Agent Response:** {selected['Agent Response']}")
+            st.markdown(f"**Agents Involved:** {selected['Agents Run']}")
+            st.markdown(f"**Latency:** {selected['Latency (s)']} seconds")
+            st.markdown(f"[🔗 View Full Trace in Langfuse]({selected['Trace URL']})")
 
     with tab4:
-      with tab4:
-        st.markdown("## 📝 Data Overview")
-
-        table_options = {
-            "Room Bookings": "data/bookings.csv",
-            "Room Service Orders": "data/room_service.csv",
-            "Transport Bookings": "data/transport_bookings.csv",
-            "Festival Discounts": "data/festivals.csv",
-            "Room Inventory": "data/room_inventory.csv",
-            "Social Media": "data/social_media.csv"
-        }
-
-        selected_table = st.selectbox("Select Booking Table", options=list(table_options.keys()))
-        file_path = table_options[selected_table]
-
-        try:
-            df_table = pd.read_csv(file_path, dtype=str, on_bad_lines='skip')  # Read all as string for editing
-
-            # Parse 'items' column for Room Service Orders
-            if selected_table == "Room Service Orders" and "items" in df_table.columns:
-                import ast
-                df_table["items"] = df_table["items"].apply(lambda x: ", ".join(ast.literal_eval(x)) if pd.notna(x) else "")
-
-            st.markdown(f"### 📄 {selected_table} (Editable)")
-
-            # If 'status' column exists, enable filtering and editing
-            if "status" in df_table.columns:
-                # Filter
-                unique_statuses = df_table["status"].dropna().unique().tolist()
-                selected_statuses = st.multiselect("Filter by Status", unique_statuses, default=unique_statuses)
-                df_table = df_table[df_table["status"].isin(selected_statuses)]
-
-                st.markdown("🖋️ **Edit Status or Sort Any Column Below**")
-
-            # Sortable and editable table
-            edited_df = st.data_editor(
-                df_table,
-                use_container_width=True,
-                num_rows="dynamic",
-                hide_index=True,
-                key="editable_table",
-            )
-
-            st.metric(f"{selected_table}", len(edited_df))
-
-            if st.button("💾 Save Changes"):
-                try:
-                    # Save back to CSV (overwriting original)
-                    edited_df.to_csv(file_path, index=False)
-                    st.success("✅ Changes saved successfully.")
-                except Exception as e:
-                    st.error(f"❌ Failed to save changes: {e}")
-
-        except FileNotFoundError:
-            st.error(f"❌ File not found: {file_path}")
-        except Exception as e:
-            st.error(f"⚠️ Error loading data: {e}")
+        render_data_overview()
 
 # Run app
-traces = get_traces()
-render_dashboard(traces)
+trace_store = get_trace_store()
+new_traces = sync_traces(trace_store)
+render_dashboard(trace_store, new_traces)
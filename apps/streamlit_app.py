@@ -11,6 +11,10 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 import asyncio
 import nest_asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     asyncio.get_event_loop()
@@ -20,14 +24,22 @@ except RuntimeError:
 nest_asyncio.apply()
 
 
-from hospitalitybot.graph import hospitality_graph
+from hospitalitybot.graph import invoke_turn
+from hospitalitybot.routers import direct_dispatch_agent
+from hospitalitybot.state import message_count
 from langchain_core.messages import HumanMessage, AIMessage
 from workflows.language_helpers import detect_language, translate_text
 from langfuse import get_client
 from langfuse.langchain import CallbackHandler
 from utils.memory_setup import create_long_term_memory
-from config.settings import CONVERSATION_WINDOW_SIZE
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from utils.tool_loader import warm_up_tools
+from utils.rate_limiter import DeadlineExceeded, call_deadline
+from config.settings import CONVERSATION_SUMMARY_ENABLED, CHAT_TURN_WORKERS, TURN_TIMEOUT_S
+from workflows.conversation_summary import ConversationSummarizer, RollingSummary, history_context
+from utils.embeddings import get_memory_embeddings
+
+# How long a rerun waits on a running chat turn before refreshing the page.
+TURN_POLL_INTERVAL_S = 0.5
 
 # --- Langfuse Configuration ---
 # Initialize once and store in session state if not already present
@@ -42,6 +54,26 @@ if "langfuse_enabled" not in st.session_state:
         st.sidebar.warning(f"Langfuse not configured: {e}")
 
 
+@st.cache_resource
+def get_conversation_summarizer():
+    """One background summarizer shared by all sessions of this server process."""
+    return ConversationSummarizer() if CONVERSATION_SUMMARY_ENABLED else None
+
+
+@st.cache_resource
+def get_turn_executor():
+    """Worker pool that runs chat turns off the script thread, shared by all sessions."""
+    return ThreadPoolExecutor(max_workers=CHAT_TURN_WORKERS, thread_name_prefix="chat-turn")
+
+
+@st.cache_resource
+def start_tool_warm_up():
+    """Builds the tool indexes in the background once per process, before the first guest needs them."""
+    thread = threading.Thread(target=warm_up_tools, name="tool-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
 def initialize_session_state():
     """Initializes the session state for the chat."""
     if "messages" not in st.session_state:
@@ -49,34 +81,148 @@ def initialize_session_state():
         st.session_state.messages = [
             {"role": "assistant", "content": "Hello! I am your AI Travel Companion. How can I help you plan your trip?"}
         ]
+    if "thread_id" not in st.session_state:
+        # The agent's conversation (always in English) is checkpointed by the graph under this id.
+        st.session_state.thread_id = f"streamlit-{uuid.uuid4().hex}"
     if "graph_state" not in st.session_state:
-        # This holds the state for the LangGraph agent (always in English)
+        # What the app itself needs to know about the agent's thread
         st.session_state.graph_state = {
-            "messages": [],
             "detected_language": None,
-            "memory": None,
+            "message_count": 0,
         }
+    if "conversation_summary" not in st.session_state:
+        st.session_state.conversation_summary = RollingSummary()
+    if "pending_turn" not in st.session_state:
+        st.session_state.pending_turn = None
     # Initialize Long-Term Memory once per session
     if "long_term_memory" not in st.session_state:
         try:
-            # This embedding model should correspond to your LLM provider
-            embedding_model_name = os.getenv("EMBEDDING_MODEL_NAME", "models/embedding-001")
-            embedding_model = GoogleGenerativeAIEmbeddings(model=embedding_model_name)
-            st.session_state.long_term_memory = create_long_term_memory(embedding_model)
+            # Shared by all sessions; each session only gets its own (empty) FAISS index.
+            embedding_model, embedding_size = get_memory_embeddings()
+            st.session_state.long_term_memory = create_long_term_memory(embedding_model, embedding_size)
         except Exception as e:
             st.sidebar.error(f"Could not initialize memory: {e}")
             st.session_state.long_term_memory = None
 
+def render_assistant_message(content):
+    """Shows an assistant reply, with videos and upgrade offers highlighted."""
+    if "https://" in content:
+        st.video(content.split("https://")[1])
+    elif "Would you like to upgrade" in content:
+        st.success(content)
+    else:
+        st.markdown(content)
+
 def display_chat_history():
     """Displays the chat history from st.session_state.messages."""
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+            if message["role"] == "assistant" and message.get("fresh"):
+                render_assistant_message(message["content"])
+                message.pop("fresh")
+            else:
+                st.markdown(message["content"])
+
+def run_turn(prompt, thread_id, graph_state, long_term_memory, rolling_summary, summarizer, langfuse_enabled, deadline):
+    """
+    Runs one chat turn on a worker thread.
+
+    It must not touch st.session_state: it works on the values it is given and
+    returns the thread's messages and the reply, which `collect_finished_turn`
+    applies on the script thread. Every LLM call of the turn, including
+    detection and translation, is bounded by `deadline`.
+    """
+    with call_deadline(deadline):
+        # --- Language Handling ---
+        session_language = graph_state.get("detected_language")
+        if direct_dispatch_agent(prompt):
+            # Emergencies skip detection and translation both ways, so the turn waits on no LLM call.
+            final_language, session_language_after = 'en', session_language
+        else:
+            current_language = detect_language(prompt)
+            # Make non-English "sticky" for the session
+            final_language = session_language if session_language and session_language != 'en' else current_language
+            session_language_after = final_language
+
+        # Translate query to English for the agent
+        english_query = translate_text(prompt, target_language="english") if final_language != 'en' else prompt
+        turn = {"language": session_language_after, "messages": None, "message_base": 0, "display_response": None, "error": None}
+
+        # IMPORTANT: Bound the history the graph sees. With the rolling summary enabled,
+        # the summary covers everything older than the unsummarized tail; otherwise a
+        # plain window keeps token usage predictable.
+        summary_text, history_offset = history_context(
+            rolling_summary if summarizer is not None else None, graph_state["message_count"] + 1
+        )
+
+        # --- Agent Invocation ---
+        try:
+            # Only the new message is sent; the graph restores the history from its checkpointer.
+            result = invoke_turn(
+                thread_id,
+                HumanMessage(content=english_query),
+                memory=long_term_memory,
+                callbacks=[CallbackHandler()] if langfuse_enabled else None,
+                deadline=deadline,
+                original_query=prompt,
+                detected_language=final_language,
+                conversation_summary=summary_text,
+                history_offset=history_offset,
+            )
+            turn["messages"] = result.get("messages", [])
+            turn["message_base"] = result.get("message_base", 0)
+
+            # The new AI message is the last one in the thread.
+            if turn["messages"] and isinstance(turn["messages"][-1], AIMessage):
+                english_ai_response = turn["messages"][-1].content
+                # Translate response back to user's language
+                try:
+                    turn["display_response"] = translate_text(
+                        english_ai_response, target_language=final_language, original_query=prompt
+                    ) if final_language != 'en' else english_ai_response
+                except DeadlineExceeded:
+                    # Out of time: an untranslated answer beats an error message.
+                    turn["display_response"] = english_ai_response
+            else:
+                turn["display_response"] = "Sorry, no response was generated."
+        except Exception as e:
+            print(f"Agent invocation error: {e}\nThread: {thread_id}, query: {english_query!r}")
+            turn["error"] = e
+    return turn
+
+def collect_finished_turn():
+    """Applies the result of this session's chat turn once its worker has finished."""
+    future = st.session_state.pending_turn
+    if future is None or not future.done():
+        return
+    st.session_state.pending_turn = None
+    try:
+        turn = future.result()
+    except Exception as e:
+        print(f"Agent invocation error: {e}")
+        turn = {"error": e}
+
+    if "language" in turn:
+        st.session_state.graph_state["detected_language"] = turn["language"]
+    if turn.get("messages"):
+        st.session_state.graph_state["message_count"] = message_count(turn)
+
+    if turn.get("error") is not None:
+        error_message = "Sorry, I encountered an error while processing your request. Please try again."
+        st.error(error_message)
+        st.session_state.messages.append({"role": "assistant", "content": error_message})
+        return
+
+    summarizer = get_conversation_summarizer()
+    if summarizer is not None and turn["messages"] and isinstance(turn["messages"][-1], AIMessage):
+        summarizer.schedule_update(st.session_state.conversation_summary, turn["messages"], turn["message_base"])
+    st.session_state.messages.append({"role": "assistant", "content": turn["display_response"], "fresh": True})
 
 def handle_user_input():
-    """Handles user input, runs the graph, and manages state."""
-    prompt = st.chat_input("Ask about your travel plans...")
-    if not prompt:
+    """Handles user input and hands the turn to the worker pool."""
+    pending = st.session_state.pending_turn is not None
+    prompt = st.chat_input("Ask about your travel plans...", disabled=pending)
+    if not prompt or pending:
         return
 
     # Display user message in the chat
@@ -84,71 +230,37 @@ def handle_user_input():
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # --- Language Handling ---
-    session_language = st.session_state.graph_state.get("detected_language")
-    current_language = detect_language(prompt)
-    # Make non-English "sticky" for the session
-    final_language = session_language if session_language and session_language != 'en' else current_language
-    st.session_state.graph_state["detected_language"] = final_language
+    st.session_state.pending_turn = get_turn_executor().submit(
+        run_turn,
+        prompt,
+        st.session_state.thread_id,
+        dict(st.session_state.graph_state),
+        st.session_state.long_term_memory,
+        st.session_state.conversation_summary,
+        get_conversation_summarizer(),
+        st.session_state.get("langfuse_enabled"),
+        # The turn's deadline starts now, so time spent queued for a worker counts against it.
+        time.monotonic() + TURN_TIMEOUT_S,
+    )
 
-    # Translate query to English for the agent
-    english_query = translate_text(prompt, target_language="english") if final_language != 'en' else prompt
-    st.session_state.graph_state["messages"].append(HumanMessage(content=english_query))
+def wait_for_pending_turn():
+    """
+    Shows the thinking indicator while this session's turn runs.
 
-    # --- Agent Invocation ---
+    The script only waits briefly before rerunning, so other widgets stay
+    usable and any interaction interrupts the wait instead of queueing behind it.
+    """
+    future = st.session_state.pending_turn
+    if future is None:
+        return
     with st.chat_message("assistant"):
         with st.spinner("🤖 Agent is thinking..."):
-            config = {}
-            if st.session_state.get("langfuse_enabled"):
-                config["callbacks"] = [CallbackHandler()]
-
-            # Prepare the input for the graph for this specific turn.
-            # Start with a copy of the full agent state.
-            graph_input = st.session_state.graph_state.copy()
-            
-            # Add turn-specific data.
-            graph_input["original_query"] = prompt
-            graph_input["memory"] = st.session_state.long_term_memory
-
-            # IMPORTANT: Enforce the conversation window. This ensures all nodes in the graph
-            # (including routers) operate on a consistent, limited view of the history,
-            # preventing context overflow and keeping token usage predictable.
-            graph_input["messages"] = graph_input["messages"][-CONVERSATION_WINDOW_SIZE:]
-
             try:
-                # Invoke the graph with the prepared, windowed input
-                result = hospitality_graph.invoke(graph_input, config=config)
-
-                # Translate response back to user's language
-                # The result from the graph contains the new AI message. We should not assume it
-                # contains the full history. The new message is the last one in the list.
-                # We append this new message to our canonical history to preserve the conversation.
-                if "messages" in result and result["messages"] and isinstance(result["messages"][-1], AIMessage):
-                    new_ai_message = result["messages"][-1]
-                    # Append the new AI message to our canonical agent state history.
-                    st.session_state.graph_state["messages"].append(new_ai_message)
-                    english_ai_response = new_ai_message.content
-                    display_response = translate_text(
-                        english_ai_response, target_language=final_language, original_query=prompt
-                    ) if final_language != 'en' else english_ai_response
-
-                    if "https://" in display_response:
-                        st.video(display_response.split("https://")[1])
-                    elif "Would you like to upgrade" in display_response:
-                        st.success(display_response)
-                    else:
-                        st.markdown(display_response)
-
-                else:
-                    display_response = "Sorry, no response was generated."
-                    st.markdown(display_response)
-
-                st.session_state.messages.append({"role": "assistant", "content": display_response})
-            except Exception as e:
-                error_message = "Sorry, I encountered an error while processing your request. Please try again."
-                st.error(error_message)
-                print(f"Agent invocation error: {e}\nGraph input: {graph_input}")
-                st.session_state.messages.append({"role": "assistant", "content": error_message})
+                future.result(timeout=TURN_POLL_INTERVAL_S)
+            except Exception:
+                # Still running, or failed; collect_finished_turn reports failures on the next run.
+                pass
+    st.rerun()
 
 def download_chat_history():
     """Provides a button to download the chat history."""
@@ -161,7 +273,10 @@ st.set_page_config(page_title="AI Travel Companion", page_icon="✈️")
 st.title("✈️ AI Travel Companion")
 st.caption("Your personal agent for planning the perfect trip.")
 
+start_tool_warm_up()
 initialize_session_state()
+collect_finished_turn()
 display_chat_history()
 handle_user_input()
-download_chat_history()
\ No newline at end of file
+download_chat_history()
+wait_for_pending_turn()
\ No newline at end of file
@@ -1,8 +1,9 @@
 import sys
 import os
 import io
+import time
 import tempfile  # Import the tempfile module
-from flask import Flask, request
+from flask import Flask, Response, jsonify, request
 import mimetypes
 from twilio.twiml.messaging_response import MessagingResponse
 from datetime import datetime, timezone
@@ -13,15 +14,21 @@ import requests
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # Custom imports
-from hospitalitybot.graph import hospitality_graph
+from hospitalitybot.graph import invoke_turn, load_thread_state
+from hospitalitybot.routers import direct_dispatch_agent
+from hospitalitybot.state import message_count
 from langchain_core.messages import HumanMessage, AIMessage
 from workflows.language_helpers import detect_language, translate_text
 from utils.memory_setup import create_long_term_memory
-from config.settings import CONVERSATION_WINDOW_SIZE, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN
+from config.settings import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, ASYNC_REPLY_MODE, CONVERSATION_SUMMARY_ENABLED, TURN_TIMEOUT_S
+from utils.async_delivery import ReplyDispatcher
+from utils.metrics import metrics
+from utils.rate_limiter import DeadlineExceeded, call_deadline
+from workflows.conversation_summary import ConversationSummarizer, RollingSummary, history_context
 from langfuse import get_client
 from langfuse.langchain import CallbackHandler
 from flask import send_file
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from utils.embeddings import get_memory_embeddings
 
 # Load environment variables
 load_dotenv()
@@ -43,6 +50,12 @@ except Exception as e:
 # In-memory session store (replace with Redis/db for prod)
 user_sessions = {}
 
+# Background worker pool used when replies are delivered asynchronously.
+reply_dispatcher = ReplyDispatcher() if ASYNC_REPLY_MODE else None
+
+# Folds turns that leave the conversation window into a per-session summary.
+conversation_summarizer = ConversationSummarizer() if CONVERSATION_SUMMARY_ENABLED else None
+
 def get_or_create_session(session_id: str):
     if session_id not in user_sessions:
         print(f"Creating new session for {session_id}")
@@ -52,85 +65,133 @@ def get_or_create_session(session_id: str):
         try:
             # Only attempt embedding setup if explicitly allowed
             if os.getenv("ENABLE_EMBEDDINGS", "false").lower() == "true":
-                embedding_model_name = os.getenv("EMBEDDING_MODEL_NAME", "models/embedding-001")
-                embedding_model = GoogleGenerativeAIEmbeddings(model=embedding_model_name)
-                long_term_memory = create_long_term_memory(embedding_model)
+                embedding_model, embedding_size = get_memory_embeddings()
+                long_term_memory = create_long_term_memory(embedding_model, embedding_size)
             else:
                 print("🛑 Embeddings disabled via ENV. Skipping memory setup.")
         except Exception as e:
             print(f"⚠️ Could not initialize memory: {e}")
             long_term_memory = None
 
+        # The conversation itself lives in the graph's checkpointer; resume from it if present.
+        saved = load_thread_state(session_id)
         user_sessions[session_id] = {
-            "graph_state": {
-                "messages": [],
-                "detected_language": None,
-            },
+            "detected_language": saved.get("detected_language"),
+            "message_count": message_count(saved),
             "long_term_memory": long_term_memory,
+            "conversation_summary": RollingSummary(
+                saved.get("conversation_summary", ""), saved.get("history_offset", 0)
+            ),
         }
 
     return user_sessions[session_id]
 
 
-@app.route("/sms", methods=['POST'])
-def sms_reply():
-    from_number = request.values.get("From", None)
-    text_message = request.values.get("Body", None)
-
+@metrics.timed("hospitalitybot_turn_duration_seconds")
+def process_message(from_number: str, text_message: str) -> str:
+    """Runs one conversational turn for a guest and returns the reply text."""
+    # Everything downstream (STT, every LLM call) must fit in the time left until this deadline.
+    deadline = time.monotonic() + TURN_TIMEOUT_S
     session = get_or_create_session(from_number)
-    graph_state = session["graph_state"]
     long_term_memory = session["long_term_memory"]
+    conversation_summary = session["conversation_summary"]
 
     try:
-        # 1. Get user text
-        prompt = text_message or "No message received."
-        print(f"User Query from {from_number}: {prompt}")
-
-        # 2. Detect language
-        session_language = graph_state.get("detected_language")
-        current_language = detect_language(prompt)
-        final_language = session_language if session_language and session_language != "en" else current_language
-        graph_state["detected_language"] = final_language
-
-        english_query = translate_text(prompt, target_language="english") if final_language != "en" else prompt
-        graph_state["messages"].append(HumanMessage(content=english_query))
-
-        # 3. Prepare graph input
-        graph_input = {
-            **graph_state,
-            "original_query": prompt,
-            "memory": long_term_memory,
-            "messages": graph_state["messages"][-CONVERSATION_WINDOW_SIZE:],
-            "current_time": datetime.now(timezone.utc).isoformat()
-        }
-
-        # 4. Invoke graph
-        config = {}
-        if langfuse_enabled:
-            config["callbacks"] = [CallbackHandler()]
-
-        result = hospitality_graph.invoke(graph_input, config=config)
-
-        if result.get("messages") and isinstance(result["messages"][-1], AIMessage):
-            new_ai_message = result["messages"][-1]
-            graph_state["messages"].append(new_ai_message)
-            english_ai_response = new_ai_message.content
-            display_response = translate_text(
-                english_ai_response, target_language=final_language, original_query=prompt
-            ) if final_language != "en" else english_ai_response
-        else:
-            display_response = "Sorry, I couldn't generate a response."
+        with call_deadline(deadline):
+            # 1. Get user text
+            prompt = text_message or "No message received."
+            print(f"User Query from {from_number}: {prompt}")
+
+            # 2. Detect language. A message that triggers a direct-dispatch agent (an emergency)
+            # skips detection and translation both ways, so the turn waits on no LLM call.
+            if direct_dispatch_agent(prompt):
+                final_language = "en"
+            else:
+                session_language = session.get("detected_language")
+                current_language = detect_language(prompt)
+                final_language = session_language if session_language and session_language != "en" else current_language
+                session["detected_language"] = final_language
+
+            english_query = translate_text(prompt, target_language="english") if final_language != "en" else prompt
+
+            # 3. Decide how much history the graph sees. With the rolling summary enabled,
+            # the summary covers everything older than the unsummarized tail of the conversation.
+            summary_text, history_offset = history_context(
+                conversation_summary if conversation_summarizer is not None else None,
+                session["message_count"] + 1,
+            )
+
+            # 4. Invoke graph. Only the new message is sent; the history comes from the checkpointer.
+            result = invoke_turn(
+                from_number,
+                HumanMessage(content=english_query),
+                memory=long_term_memory,
+                callbacks=[CallbackHandler()] if langfuse_enabled else None,
+                deadline=deadline,
+                original_query=prompt,
+                detected_language=final_language,
+                conversation_summary=summary_text,
+                history_offset=history_offset,
+                current_time=datetime.now(timezone.utc).isoformat(),
+            )
+            session["message_count"] = message_count(result)
+
+            if result.get("messages") and isinstance(result["messages"][-1], AIMessage):
+                new_ai_message = result["messages"][-1]
+                if conversation_summarizer is not None:
+                    conversation_summarizer.schedule_update(
+                        conversation_summary, result["messages"], result.get("message_base", 0)
+                    )
+                english_ai_response = new_ai_message.content
+                try:
+                    display_response = translate_text(
+                        english_ai_response, target_language=final_language, original_query=prompt
+                    ) if final_language != "en" else english_ai_response
+                except DeadlineExceeded:
+                    # Out of time: an untranslated answer beats an error message.
+                    display_response = english_ai_response
+            else:
+                display_response = "Sorry, I couldn't generate a response."
 
     except Exception as e:
         print(f"Error processing message from {from_number}: {e}")
         display_response = "Sorry, there was an error processing your message."
 
+    return display_response
+
+
+@app.route("/sms", methods=['POST'])
+def sms_reply():
+    from_number = request.values.get("From", None)
+    text_message = request.values.get("Body", None)
+
+    if reply_dispatcher is not None:
+        # Acknowledge right away and let a worker send the reply via the REST API,
+        # so webhook latency no longer depends on LLM latency.
+        reply_dispatcher.submit(
+            from_number,
+            lambda: process_message(from_number, text_message),
+            to=from_number,
+            from_=request.values.get("To") or TWILIO_PHONE_NUMBER,
+        )
+        return str(MessagingResponse())
+
+    display_response = process_message(from_number, text_message)
+
     # Twilio text-only reply
     twilio_response = MessagingResponse()
     twilio_response.message(display_response)
     return str(twilio_response)
 
 
+@app.route("/metrics", methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint. Add ?format=json for p50/p99 per component."""
+    if request.args.get("format") == "json":
+        return jsonify(metrics.summary())
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     print("🚀 Starting Twilio Hospitality Bot Server...")
     port = int(os.environ.get("PORT", 5000))  # fallback for local
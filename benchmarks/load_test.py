@@ -0,0 +1,439 @@
+"""
+Load test for the /sms webhook of the Twilio apps.
+
+Starts apps/twilio_app.py (or apps/twilio_app_with_stt.py with --app stt) in a
+subprocess with every LLM role on the scripted fake provider, plus two local
+stubs: a media server for MediaUrl0 voice notes and a Messages API that
+collects replies sent in ASYNC_REPLY_MODE. Virtual guests, each with its own
+From number, replay the multi-turn conversations in conversations.json using
+realistic Twilio form payloads.
+
+The load is stepped up through --stages (concurrent guests). Each stage
+reports throughput, p50/p95/p99 latency and error rate. The RSS of the app
+process is sampled throughout. The saturation point is the first stage where
+adding guests no longer adds throughput.
+
+Usage:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --app stt --voice-ratio 0.3
+    python benchmarks/load_test.py --async-replies --stages 4,16,32,64 --stage-seconds 30
+
+Linux only for RSS sampling (reads /proc).
+"""
+import argparse
+import io
+import json
+import os
+import queue
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from xml.etree import ElementTree
+
+import requests
+
+from run_benchmark import DEFAULT_CORPUS, PROJECT_ROOT, build_script, configure_environment, percentile
+
+APPS = {
+    "text": os.path.join(PROJECT_ROOT, "apps", "twilio_app.py"),
+    "stt": os.path.join(PROJECT_ROOT, "apps", "twilio_app_with_stt.py"),
+}
+ACCOUNT_SID = "AC" + "0" * 32
+BOT_NUMBER = "whatsapp:+14155238886"
+ERROR_REPLIES = ("Sorry, there was an error", "Sorry, I couldn't generate a response")
+
+# A stage whose throughput is less than this much above the previous one counts as saturated.
+SATURATION_GAIN = 0.10
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_voice_note(seconds: float = 2.0, rate: int = 16000) -> bytes:
+    """A short mono WAV of a quiet tone, standing in for a guest's voice note."""
+    frames = bytearray()
+    for i in range(int(seconds * rate)):
+        sample = int(800 * ((i * 440 * 2 // rate) % 2 * 2 - 1))
+        frames += sample.to_bytes(2, "little", signed=True)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+class StubServers:
+    """
+    The stand-ins for Twilio's side: media downloads and the Messages API.
+
+    Replies posted to the Messages API are queued per recipient so each
+    virtual guest can wait for its own reply.
+    """
+
+    def __init__(self, media_delay_s: float = 0.0):
+        self.media = make_voice_note()
+        self.media_delay_s = media_delay_s
+        self.replies = {}
+        self.replies_lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", free_port()), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def reply_queue(self, number: str) -> queue.Queue:
+        with self.replies_lock:
+            return self.replies.setdefault(number, queue.Queue())
+
+    def _handler(self):
+        stubs = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if not self.path.startswith("/media/"):
+                    return self._send(404, b"not found", "text/plain")
+                if stubs.media_delay_s:
+                    time.sleep(stubs.media_delay_s)
+                self._send(200, stubs.media, "audio/wav")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                if not self.path.endswith("/Messages.json"):
+                    return self._send(404, b"{}", "application/json")
+                to = form.get("To", [""])[0]
+                stubs.reply_queue(to).put((time.perf_counter(), form.get("Body", [""])[0]))
+                sid = "SM" + uuid.uuid4().hex
+                self._send(201, json.dumps({"sid": sid, "status": "queued"}).encode(), "application/json")
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class RssSampler:
+    """Samples the resident set size of a process at a fixed interval."""
+
+    def __init__(self, pid: int, interval_s: float = 1.0):
+        self.pid = pid
+        self.interval_s = interval_s
+        self.samples = []  # (seconds since start, MiB)
+        self._stop = threading.Event()
+        self._start = time.perf_counter()
+
+    def read_rss_mib(self):
+        try:
+            with open(f"/proc/{self.pid}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            return None
+        return None
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = self.read_rss_mib()
+            if rss is not None:
+                self.samples.append((time.perf_counter() - self._start, rss))
+            self._stop.wait(self.interval_s)
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+class VirtualGuest:
+    """One guest (one From number) working through conversations turn by turn."""
+
+    def __init__(self, number: str, conversations: list, args, stubs: StubServers, app_url: str, rng: random.Random):
+        self.number = number
+        self.conversations = conversations
+        self.args = args
+        self.stubs = stubs
+        self.app_url = app_url
+        self.rng = rng
+        self.session = requests.Session()
+        self.replies = stubs.reply_queue(number)
+
+    def payload(self, text: str, voice: bool) -> dict:
+        form = {
+            "SmsMessageSid": "SM" + uuid.uuid4().hex,
+            "MessageSid": "SM" + uuid.uuid4().hex,
+            "AccountSid": ACCOUNT_SID,
+            "From": self.number,
+            "To": BOT_NUMBER,
+            "WaId": self.number.split("+")[-1],
+            "ProfileName": "Load Test Guest",
+            "SmsStatus": "received",
+            "NumSegments": "1",
+            "ApiVersion": "2010-04-01",
+            "Body": "" if voice else text,
+            "NumMedia": "1" if voice else "0",
+        }
+        if voice:
+            form["MediaUrl0"] = f"{self.stubs.base_url}/media/{uuid.uuid4().hex}.wav"
+            form["MediaContentType0"] = "audio/wav"
+        return form
+
+    def send_turn(self, text: str) -> tuple:
+        """Sends one message and waits for the reply. Returns (seconds, error or None, kind)."""
+        voice = self.rng.random() < self.args.voice_ratio
+        kind = "voice" if voice else "text"
+        start = time.perf_counter()
+        try:
+            response = self.session.post(f"{self.app_url}/sms", data=self.payload(text, voice), timeout=self.args.reply_timeout)
+        except requests.RequestException as e:
+            return time.perf_counter() - start, f"request failed: {type(e).__name__}", kind
+        if response.status_code != 200:
+            return time.perf_counter() - start, f"HTTP {response.status_code}", kind
+
+        if self.args.async_replies:
+            try:
+                received_at, body = self.replies.get(timeout=self.args.reply_timeout)
+            except queue.Empty:
+                return time.perf_counter() - start, "no reply delivered", kind
+            elapsed = received_at - start
+        else:
+            elapsed = time.perf_counter() - start
+            try:
+                message = ElementTree.fromstring(response.text).find("Message")
+            except ElementTree.ParseError:
+                return elapsed, "invalid TwiML", kind
+            body = message.text if message is not None else None
+            if not body:
+                return elapsed, "empty reply", kind
+
+        if body.startswith(ERROR_REPLIES):
+            return elapsed, "error reply", kind
+        return elapsed, None, kind
+
+    def run_until(self, deadline: float, results: list):
+        while time.perf_counter() < deadline:
+            conversation = self.rng.choice(self.conversations)
+            for turn in conversation["turns"]:
+                if time.perf_counter() >= deadline:
+                    return
+                results.append(self.send_turn(turn["guest"]))
+                if self.args.think_time_ms:
+                    time.sleep(self.rng.uniform(0, 2 * self.args.think_time_ms) / 1000)
+
+
+def run_stage(users: int, stage_index: int, conversations: list, args, stubs: StubServers, app_url: str) -> dict:
+    results = []
+    deadline = time.perf_counter() + args.stage_seconds
+    guests = [
+        VirtualGuest(
+            f"whatsapp:+1555{stage_index:02d}{i:05d}", conversations, args, stubs, app_url,
+            random.Random(args.seed * 1000 + stage_index * 100 + i),
+        )
+        for i in range(users)
+    ]
+    start = time.perf_counter()
+    threads = [threading.Thread(target=guest.run_until, args=(deadline, results)) for guest in guests]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+
+    latencies_ms = [seconds * 1000 for seconds, error, _ in results if error is None]
+    errors = {}
+    for _, error, _ in results:
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+    return {
+        "users": users,
+        "requests": len(results),
+        "voice_requests": sum(1 for _, _, kind in results if kind == "voice"),
+        "throughput_rps": len(latencies_ms) / wall_time,
+        "error_rate": (len(results) - len(latencies_ms)) / len(results) if results else 0.0,
+        "errors": errors,
+        "p50_ms": percentile(latencies_ms, 50) if latencies_ms else None,
+        "p95_ms": percentile(latencies_ms, 95) if latencies_ms else None,
+        "p99_ms": percentile(latencies_ms, 99) if latencies_ms else None,
+    }
+
+
+def find_saturation(stages: list):
+    """Returns the last stage before throughput stopped growing, or None if it never did."""
+    for previous, current in zip(stages, stages[1:]):
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 + SATURATION_GAIN) or current["error_rate"] > 0.01:
+            return previous
+    return None
+
+
+def start_app(args, stubs: StubServers, script_path: str, log_file) -> tuple:
+    port = free_port()
+    configure_environment(script_path, args.latency_ms)
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "TWILIO_ACCOUNT_SID": ACCOUNT_SID,
+        "TWILIO_AUTH_TOKEN": "load-test",
+        "TWILIO_PHONE_NUMBER": BOT_NUMBER,
+        "TWILIO_API_BASE_URL": stubs.base_url,
+        "ASYNC_REPLY_MODE": "true" if args.async_replies else "false",
+        "MEDIA_ALLOW_INSECURE_HTTP": "true",
+        "ENABLE_EMBEDDINGS": "false",
+        "LANGFUSE_TRACING_ENABLED": "false",
+        "LANGFUSE_PUBLIC_KEY": "",
+        "LANGFUSE_SECRET_KEY": "",
+        "PYTHONUNBUFFERED": "1",
+    })
+    process = subprocess.Popen(
+        [sys.executable, APPS[args.app]], cwd=PROJECT_ROOT, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+    )
+    app_url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + args.startup_timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The app exited during startup with code {process.returncode}.")
+        try:
+            if requests.get(f"{app_url}/metrics", timeout=1).status_code == 200:
+                return process, app_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"The app did not come up within {args.startup_timeout}s.")
+
+
+def print_report(stages: list, rss: RssSampler, stage_marks: list, component_summary: dict):
+    print(f"\n{'users':>6} {'requests':>9} {'voice':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'RSS MiB':>8}")
+    for stage, (start_s, end_s) in zip(stages, stage_marks):
+        stage_rss = [mib for t, mib in rss.samples if start_s <= t <= end_s]
+        fmt = lambda v: f"{v:9.1f}" if v is not None else f"{'-':>9}"
+        print(
+            f"{stage['users']:>6} {stage['requests']:>9} {stage['voice_requests']:>6} {stage['throughput_rps']:>8.2f} "
+            f"{fmt(stage['p50_ms'])} {fmt(stage['p95_ms'])} {fmt(stage['p99_ms'])} {stage['error_rate']:>7.1%} "
+            f"{(max(stage_rss) if stage_rss else float('nan')):>8.1f}"
+        )
+        if stage["errors"]:
+            print(f"{'':>6} errors: {stage['errors']}")
+
+    saturated = find_saturation(stages)
+    if saturated:
+        print(f"\nSaturation: throughput stops growing beyond ~{saturated['users']} concurrent guests "
+              f"({saturated['throughput_rps']:.2f} req/s).")
+    else:
+        print("\nSaturation: not reached; add larger stages.")
+
+    if rss.samples:
+        first, peak, last = rss.samples[0][1], max(mib for _, mib in rss.samples), rss.samples[-1][1]
+        duration = rss.samples[-1][0] - rss.samples[0][0]
+        print(f"RSS: start {first:.1f} MiB, peak {peak:.1f} MiB, end {last:.1f} MiB "
+              f"(growth {last - first:+.1f} MiB over {duration:.0f}s)")
+    else:
+        print("RSS: not available on this platform.")
+
+    nodes = component_summary.get("histograms", {}).get("hospitalitybot_node_duration_seconds", {})
+    if nodes:
+        print("\nServer-side node latency (ms, from /metrics):")
+        for series, stats in sorted(nodes.items()):
+            print(f"  {series:<45} p50 {stats['p50'] * 1000:8.1f}   p99 {stats['p99'] * 1000:8.1f}   n={stats['count']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the /sms webhook with a scripted fake LLM.")
+    parser.add_argument("--app", choices=sorted(APPS), default="text", help="Which Twilio app to run.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--stages", default="1,2,4,8,16", help="Comma-separated concurrent guests per stage.")
+    parser.add_argument("--stage-seconds", type=float, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Simulated latency of every LLM call.")
+    parser.add_argument("--voice-ratio", type=float, default=None,
+                        help="Share of turns sent as voice notes (default 0.3 for --app stt, else 0).")
+    parser.add_argument("--media-delay-ms", type=float, default=0, help="Delay of the stub media server.")
+    parser.add_argument("--think-time-ms", type=float, default=0, help="Mean pause between a guest's turns.")
+    parser.add_argument("--async-replies", action="store_true", help="Run the app with ASYNC_REPLY_MODE=true.")
+    parser.add_argument("--reply-timeout", type=float, default=120)
+    parser.add_argument("--startup-timeout", type=float, default=180)
+    parser.add_argument("--rss-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Also write the results as JSON to this path.")
+    args = parser.parse_args()
+    if args.voice_ratio is None:
+        args.voice_ratio = 0.3 if args.app == "stt" else 0.0
+
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    stages_users = [int(users) for users in args.stages.split(",") if users.strip()]
+
+    stubs = StubServers(media_delay_s=args.media_delay_ms / 1000)
+    stubs.start()
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    script_path = os.path.join(workdir, "fake_llm_script.json")
+    with open(script_path, "w", encoding="utf-8") as f:
+        json.dump(build_script(corpus), f)
+    log_path = os.path.join(workdir, "app.log")
+
+    with open(log_path, "w", encoding="utf-8") as log_file:
+        try:
+            process, app_url = start_app(args, stubs, script_path, log_file)
+        except RuntimeError as e:
+            log_file.flush()
+            print(f"{e} Last lines of {log_path}:", file=sys.stderr)
+            with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+                print("".join(f.readlines()[-20:]), file=sys.stderr)
+            stubs.stop()
+            return 1
+
+        print(f"Load testing {os.path.relpath(APPS[args.app], PROJECT_ROOT)} (pid {process.pid}, "
+              f"{'async' if args.async_replies else 'sync'} replies, voice ratio {args.voice_ratio:.0%}); log: {log_path}")
+        rss = RssSampler(process.pid, args.rss_interval)
+        rss.start()
+        stages, stage_marks = [], []
+        try:
+            for index, users in enumerate(stages_users):
+                print(f"  stage {index + 1}/{len(stages_users)}: {users} concurrent guests for {args.stage_seconds:.0f}s...")
+                start_s = time.perf_counter() - rss._start
+                stages.append(run_stage(users, index, corpus["conversations"], args, stubs, app_url))
+                stage_marks.append((start_s, time.perf_counter() - rss._start))
+            component_summary = requests.get(f"{app_url}/metrics", params={"format": "json"}, timeout=10).json()
+        finally:
+            rss.stop()
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            stubs.stop()
+
+    print_report(stages, rss, stage_marks, component_summary)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"stages": stages, "rss_mib": rss.samples, "settings": vars(args)}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""
+Offline end-to-end benchmark for hospitality_graph.
+
+Replays the recorded guest conversations in benchmarks/conversations.json
+through the real graph, with every LLM role served by the scripted fake
+provider (utils/fake_llm.py). No network or API keys are needed, so it can
+run on CI to catch orchestration regressions.
+
+Reports turns per second, p50/p95/p99 turn latency, LLM calls per turn and
+prompt tokens per turn, and compares them against benchmarks/baseline.json.
+With --speculate, agents are started speculatively while the router runs,
+and the speculation outcomes and wasted agent time are reported as well.
+
+Usage:
+    python benchmarks/run_benchmark.py
+    python benchmarks/run_benchmark.py --latency-ms 50 --repeat 5 --concurrency 4
+    python benchmarks/run_benchmark.py --speculate
+    python benchmarks/run_benchmark.py --update-baseline
+
+Exits with status 1 if any metric regressed beyond the tolerance, if the
+graph produced a different final answer than the recorded one, or if a turn
+did not add exactly one AI message to the conversation thread.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(BENCHMARK_DIR, "conversations.json")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+# Fixed so that prompts, and therefore token counts, are identical between runs.
+BENCHMARK_TIME = "2025-07-15T09:00:00+00:00"
+
+ROUTER_PROMPT_MARKER = "intent classifier"
+SUMMARIZER_PROMPT_MARKER = "final response synthesizer"
+LANGUAGE_PROMPT_MARKER = "language detection expert"
+
+# For latency and throughput, which vary with the machine and its load.
+DEFAULT_TOLERANCE = 0.25
+# For LLM calls and prompt tokens, which are deterministic for a given corpus.
+DEFAULT_COUNT_TOLERANCE = 0.02
+
+LOWER_IS_BETTER = ["p50_ms", "p95_ms", "p99_ms", "llm_calls_per_turn", "prompt_tokens_per_turn"]
+HIGHER_IS_BETTER = ["turns_per_second"]
+COUNT_METRICS = {"llm_calls_per_turn", "prompt_tokens_per_turn"}
+
+
+def build_script(corpus: dict) -> dict:
+    """
+    Turns the recorded conversations into fake LLM rules.
+
+    For each turn the router returns the recorded intents, each agent makes the
+    recorded calls to the tools it has, and the summarizer returns the recorded
+    answer. Tool rules come before plain agent rules so they win ties.
+    """
+    tool_rules, agent_rules, other_rules = [], [], []
+    for conversation in corpus["conversations"]:
+        for turn in conversation["turns"]:
+            guest = re.escape(turn["guest"])
+            other_rules.append({
+                "prompt": ROUTER_PROMPT_MARKER,
+                "match": guest,
+                "tools": False,
+                "response": json.dumps({"intents": turn["intents"], "confidence": 95}),
+            })
+            other_rules.append({
+                "prompt": SUMMARIZER_PROMPT_MARKER,
+                "match": guest,
+                "tools": False,
+                "response": turn["answer"],
+            })
+            for call in turn.get("tool_calls", []):
+                tool_rules.append({"match": guest, "tools": True, "tool_calls": [call], "response": "{tool_output}"})
+            agent_rules.append({"match": guest, "tools": True, "response": turn.get("agent_reply", turn["answer"])})
+
+    fallbacks = [
+        {"prompt": ROUTER_PROMPT_MARKER, "response": json.dumps({"intents": ["general"], "confidence": 90})},
+        # Used when the script drives the apps, which detect the guest's language first.
+        {"prompt": LANGUAGE_PROMPT_MARKER, "tools": False, "response": "en"},
+    ]
+    return {"rules": tool_rules + agent_rules + other_rules + fallbacks}
+
+
+def configure_environment(script_path: str, latency_ms: float, speculate: bool = False):
+    """Points every LLM role at the fake provider. Must run before project imports."""
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAST_LLM_PROVIDER"] = "fake"
+    for role in ("ROUTER", "LANGUAGE", "TRANSLATION", "AGENT", "SUMMARIZER"):
+        os.environ[f"{role}_LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_SCRIPT_PATH"] = script_path
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(latency_ms)
+    # Measure the orchestration itself: no response cache, no client-side throttling.
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["LLM_REQUESTS_PER_SECOND"] = "0"
+    os.environ["METRICS_ENABLED"] = "true"
+    os.environ["SPECULATIVE_EXECUTION_ENABLED"] = "true" if speculate else "false"
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of `values` (0 < q <= 100)."""
+    ordered = sorted(values)
+    rank = max(int(-(-q * len(ordered) // 100)), 1)
+    return ordered[rank - 1]
+
+
+def replay_conversation(conversation: dict, window_size: int) -> list:
+    """
+    Runs one conversation turn by turn, as the apps do.
+
+    Also checks that each turn grows the thread by exactly the guest's message
+    and one AI reply, so histories are never copied into themselves or duplicated.
+
+    Returns:
+        list: (seconds, answer_matched, history_ok) per turn.
+    """
+    from langchain_core.messages import AIMessage, HumanMessage
+    from hospitalitybot.graph import invoke_turn
+    from hospitalitybot.state import message_count as thread_message_count
+    from workflows.conversation_summary import history_context
+
+    # A fresh thread per replay, so repeated and concurrent replays don't share history.
+    thread_id = f"benchmark-{conversation['id']}-{uuid.uuid4().hex}"
+    message_count = 0
+    results = []
+    for turn in conversation["turns"]:
+        summary_text, history_offset = history_context(None, message_count + 1, window_size)
+        start = time.perf_counter()
+        result = invoke_turn(
+            thread_id,
+            HumanMessage(content=turn["guest"]),
+            original_query=turn["guest"],
+            detected_language="en",
+            conversation_summary=summary_text,
+            history_offset=history_offset,
+            current_time=BENCHMARK_TIME,
+        )
+        elapsed = time.perf_counter() - start
+
+        messages = result.get("messages", [])
+        added = messages[message_count - result.get("message_base", 0):]
+        history_ok = (
+            len(added) == 2 and isinstance(added[0], HumanMessage) and isinstance(added[1], AIMessage)
+        )
+        if not history_ok:
+            print(f"  history grew by {[type(m).__name__ for m in added]} instead of one human and one AI "
+                  f"message in {conversation['id']!r} for {turn['guest']!r}", file=sys.stderr)
+        message_count = thread_message_count(result)
+
+        answer = messages[-1] if messages else None
+        matched = isinstance(answer, AIMessage) and answer.content == turn["answer"]
+        if not matched:
+            print(f"  answer mismatch in {conversation['id']!r} for {turn['guest']!r}: "
+                  f"{getattr(answer, 'content', None)!r}", file=sys.stderr)
+        results.append((elapsed, matched, history_ok))
+    return results
+
+
+def run(corpus: dict, repeat: int, concurrency: int, warmup: bool) -> dict:
+    from config.settings import CONVERSATION_WINDOW_SIZE
+    from utils.metrics import metrics
+
+    conversations = corpus["conversations"]
+    if warmup:
+        for conversation in conversations:
+            replay_conversation(conversation, CONVERSATION_WINDOW_SIZE)
+    metrics.reset()
+
+    jobs = [conversation for _ in range(repeat) for conversation in conversations]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        per_conversation = list(pool.map(
+            lambda conversation: replay_conversation(conversation, CONVERSATION_WINDOW_SIZE),
+            jobs,
+        ))
+    wall_time = time.perf_counter() - start
+
+    turns = [turn for conversation in per_conversation for turn in conversation]
+    latencies_ms = [seconds * 1000 for seconds, _, _ in turns]
+    llm_calls = metrics.total("hospitalitybot_llm_duration_seconds")
+    prompt_tokens = metrics.total("hospitalitybot_llm_tokens_total", direction="input")
+
+    return {
+        "turns": len(turns),
+        "turns_per_second": len(turns) / wall_time,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+        "llm_calls_per_turn": llm_calls / len(turns),
+        "prompt_tokens_per_turn": prompt_tokens / len(turns),
+        "answer_mismatches": sum(1 for _, matched, _ in turns if not matched),
+        "history_violations": sum(1 for _, _, history_ok in turns if not history_ok),
+        "per_node": metrics.summary()["histograms"].get("hospitalitybot_node_duration_seconds", {}),
+        "speculation": {
+            **{
+                outcome: metrics.total("hospitalitybot_speculation_total", outcome=outcome)
+                for outcome in ("hit", "miss", "blocked", "queued", "unused", "error")
+            },
+            "wasted_seconds": metrics.total("hospitalitybot_speculation_wasted_seconds_total"),
+        },
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float, count_tolerance: float) -> list:
+    """Returns a description of every metric that is worse than the baseline beyond its tolerance."""
+    regressions = []
+    for name in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+        if name not in baseline:
+            continue
+        allowed = count_tolerance if name in COUNT_METRICS else tolerance
+        current, reference = results[name], baseline[name]
+        if name in LOWER_IS_BETTER:
+            worse = current > reference * (1 + allowed)
+        else:
+            worse = current < reference * (1 - allowed)
+        if worse:
+            regressions.append(f"{name}: {current:.2f} vs baseline {reference:.2f} (tolerance {allowed:.0%})")
+    return regressions
+
+
+def print_report(results: dict, baseline: dict = None):
+    print(f"\nTurns replayed:         {results['turns']}")
+    for name in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+        line = f"{name + ':':<24}{results[name]:>10.2f}"
+        if baseline and name in baseline:
+            change = (results[name] - baseline[name]) / baseline[name] * 100 if baseline[name] else 0.0
+            line += f"   (baseline {baseline[name]:.2f}, {change:+.1f}%)"
+        print(line)
+    print(f"{'answer_mismatches:':<24}{results['answer_mismatches']:>10}")
+    print(f"{'history_violations:':<24}{results['history_violations']:>10}")
+
+    speculation = results["speculation"]
+    if any(speculation.values()):
+        outcomes = ", ".join(f"{outcome} {int(count)}" for outcome, count in speculation.items() if outcome != "wasted_seconds")
+        print(f"{'speculation:':<24}{outcomes}; wasted agent time {speculation['wasted_seconds']:.2f}s")
+
+    print("\nPer-node latency (ms):")
+    for series, stats in sorted(results["per_node"].items()):
+        print(f"  {series:<45} p50 {stats['p50'] * 1000:8.1f}   p99 {stats['p99'] * 1000:8.1f}   n={stats['count']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of hospitality_graph with a scripted fake LLM.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Recorded conversations to replay.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare against.")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Simulated latency of every LLM call.")
+    parser.add_argument("--repeat", type=int, default=3, help="How many times the corpus is replayed.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Conversations replayed in parallel.")
+    parser.add_argument("--no-warmup", action="store_true", help="Skip the untimed warm-up pass.")
+    parser.add_argument("--speculate", action="store_true", help="Enable speculative agent execution.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--count-tolerance", type=float, default=DEFAULT_COUNT_TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument("--output", help="Also write the results as JSON to this path.")
+    args = parser.parse_args()
+
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as script_file:
+        json.dump(build_script(corpus), script_file)
+    configure_environment(script_file.name, args.latency_ms, args.speculate)
+
+    # Tools and prompts use paths relative to the project root.
+    os.chdir(PROJECT_ROOT)
+    sys.path.insert(0, PROJECT_ROOT)
+    try:
+        results = run(corpus, args.repeat, args.concurrency, warmup=not args.no_warmup)
+    finally:
+        os.remove(script_file.name)
+    results["settings"] = {
+        "latency_ms": args.latency_ms, "repeat": args.repeat, "concurrency": args.concurrency, "speculate": args.speculate,
+    }
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        stored = {name: round(results[name], 3) for name in HIGHER_IS_BETTER + LOWER_IS_BETTER}
+        stored["settings"] = results["settings"]
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(stored, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    failures = []
+    if results["answer_mismatches"]:
+        failures.append(f"{results['answer_mismatches']} turn(s) produced a different final answer")
+    if results["history_violations"]:
+        failures.append(f"{results['history_violations']} turn(s) did not add exactly one AI message to the thread")
+    if baseline:
+        if baseline.get("settings") != results["settings"]:
+            print("\nWarning: baseline was recorded with different settings; comparison may be meaningless.")
+        failures += compare(results, baseline, args.tolerance, args.count_tolerance)
+
+    if failures:
+        print("\nREGRESSIONS:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
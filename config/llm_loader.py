@@ -1,33 +1,134 @@
-from config.settings import LLM_PROVIDER, MODEL_NAME, GOOGLE_API_KEY, OPENAI_API_KEY, ANTHROPIC_API_KEY
+import threading
+
+from config.settings import (
+    LLM_PROVIDER, MODEL_NAME, LLM_ROLE_MODELS, GOOGLE_API_KEY, OPENAI_API_KEY, ANTHROPIC_API_KEY,
+    FAKE_LLM_SCRIPT_PATH, FAKE_LLM_LATENCY_MS,
+    LLM_REQUESTS_PER_SECOND, LLM_BURST_SIZE, LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY_S, LLM_RETRY_MAX_DELAY_S, LLM_REQUEST_TIMEOUT_S,
+    LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTLS,
+)
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
+from utils.fake_llm import ScriptedChatModel, load_script
+from utils.llm_cache import LLMResponseCache, RoleCache
+from utils.managed_llm import ManagedChatModel
+from utils.metrics import metrics
+from utils.rate_limiter import ProviderLimiter
+
+# Registry of shared objects. Provider clients (and their HTTP pools) are shared
+# by every role that resolves to the same provider and model.
+_registry_lock = threading.Lock()
+_clients = {}      # (provider, model_name) -> provider chat model
+_limiters = {}     # provider -> ProviderLimiter
+_role_models = {}  # role -> ManagedChatModel
+_response_cache = None  # LLMResponseCache, created on first use when enabled
 
-def load_llm():
+def _create_chat_model(provider: str, model_name: str):
     """
-    Loads and returns the specified LLM provider and model based on environment settings.
+    Creates a new provider chat model.
+
+    Provider-side retries are disabled because ProviderLimiter retries with
+    coordinated, jittered backoff instead. Each request times out after
+    LLM_REQUEST_TIMEOUT_S (ManagedChatModel lowers it near a turn's deadline).
 
     Raises:
         ValueError: If the required API key for the selected provider is not found.
-        ValueError: If the LLM_PROVIDER is not supported.
-
-    Returns:
-        An instance of a LangChain chat model.
+        ValueError: If the provider is not supported.
     """
-    provider = LLM_PROVIDER.lower()
-
     if provider == "gemini":
         if not GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY not found in environment. Please set it in your .env file.")
         # The new create_react_agent handles system messages correctly, so convert_system_message_to_human is no longer needed.
-        return ChatGoogleGenerativeAI(model=MODEL_NAME, google_api_key=GOOGLE_API_KEY)
+        return ChatGoogleGenerativeAI(model=model_name, google_api_key=GOOGLE_API_KEY, max_retries=0, timeout=LLM_REQUEST_TIMEOUT_S)
     elif provider == "openai":
         if not OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY not found in environment. Please set it in your .env file.")
-        return ChatOpenAI(model=MODEL_NAME, api_key=OPENAI_API_KEY)
+        return ChatOpenAI(model=model_name, api_key=OPENAI_API_KEY, max_retries=0, timeout=LLM_REQUEST_TIMEOUT_S)
     elif provider == "claude":
         if not ANTHROPIC_API_KEY:
             raise ValueError("ANTHROPIC_API_KEY not found in environment. Please set it in your .env file.")
-        return ChatAnthropic(model=MODEL_NAME, api_key=ANTHROPIC_API_KEY)
+        return ChatAnthropic(model=model_name, api_key=ANTHROPIC_API_KEY, max_retries=0, timeout=LLM_REQUEST_TIMEOUT_S)
+    elif provider == "fake":
+        # Offline scripted model for benchmarks and load tests; needs no API key.
+        return ScriptedChatModel(
+            model_name=model_name,
+            latency_s=FAKE_LLM_LATENCY_MS / 1000,
+            rules=load_script(FAKE_LLM_SCRIPT_PATH),
+        )
     else:
-        raise ValueError(f"Unsupported LLM provider specified in .env: '{LLM_PROVIDER}'")
\ No newline at end of file
+        raise ValueError(f"Unsupported LLM provider specified in .env: '{provider}'")
+
+def _get_limiter(provider: str) -> ProviderLimiter:
+    if provider not in _limiters:
+        _limiters[provider] = ProviderLimiter(
+            name=provider,
+            requests_per_second=LLM_REQUESTS_PER_SECOND,
+            burst=LLM_BURST_SIZE,
+            max_concurrency=LLM_MAX_CONCURRENCY,
+            max_retries=LLM_MAX_RETRIES,
+            base_delay=LLM_RETRY_BASE_DELAY_S,
+            max_delay=LLM_RETRY_MAX_DELAY_S,
+        )
+    return _limiters[provider]
+
+def _get_role_cache(role: str):
+    """Returns the response cache view for a role, or None if caching is off for it."""
+    global _response_cache
+    ttl = LLM_CACHE_TTLS.get(role, 0)
+    if not LLM_CACHE_ENABLED or ttl <= 0:
+        return None
+    if _response_cache is None:
+        _response_cache = LLMResponseCache(LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES)
+    return RoleCache(_response_cache, role, ttl)
+
+def get_llm_cache_stats() -> dict:
+    """Returns hit/miss counters and hit rates of the LLM response cache, per role."""
+    if _response_cache is None:
+        return {}
+    return _response_cache.stats()
+
+def _cache_gauges():
+    for role, stats in get_llm_cache_stats().items():
+        for field, value in stats.items():
+            yield f"hospitalitybot_llm_cache_{field}", {"role": role}, value
+
+metrics.register_collector(_cache_gauges)
+
+def load_llm(role: str = "default"):
+    """
+    Returns the shared chat model for the given role.
+
+    The provider and model come from the role's tier in LLM_ROLE_MODELS, so
+    classification roles can use a small fast model while agents use a
+    stronger one. Unknown roles use LLM_PROVIDER and MODEL_NAME.
+
+    Models are created once per process and reused. All calls are rate limited,
+    concurrency bounded and retried per provider. When LLM_CACHE_ENABLED is set,
+    identical prompts are answered from the response cache using the role's TTL.
+
+    Args:
+        role (str): The caller's role (e.g. "router", "agent", "summarizer").
+
+    Raises:
+        ValueError: If the required API key for the selected provider is not found.
+        ValueError: If the LLM_PROVIDER is not supported.
+
+    Returns:
+        An instance of a LangChain chat model.
+    """
+    with _registry_lock:
+        if role not in _role_models:
+            provider, model_name = LLM_ROLE_MODELS.get(role, (LLM_PROVIDER, MODEL_NAME))
+            provider = provider.lower()
+            key = (provider, model_name)
+            if key not in _clients:
+                _clients[key] = _create_chat_model(provider, model_name)
+            _role_models[role] = ManagedChatModel(
+                client=_clients[key],
+                limiter=_get_limiter(provider),
+                role=role,
+                request_timeout=LLM_REQUEST_TIMEOUT_S,
+                cache=_get_role_cache(role),
+            )
+        return _role_models[role]
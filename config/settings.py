@@ -4,11 +4,110 @@ import os
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
 MODEL_NAME = os.getenv("MODEL_NAME", "gemini-pro")
 
+# Offline scripted model used when a provider is set to "fake" (benchmarks, load tests)
+FAKE_LLM_SCRIPT_PATH = os.getenv("FAKE_LLM_SCRIPT_PATH", "")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "0").split('#')[0].strip())
+
 # API keys
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
+# LLM roles served by the client registry in config/llm_loader.py
+LLM_ROLES = ["router", "language", "translation", "agent", "summarizer"]
+
+# Model tiers. The "fast" tier serves cheap classification calls and falls back
+# to the default provider/model when not configured.
+FAST_LLM_PROVIDER = os.getenv("FAST_LLM_PROVIDER", LLM_PROVIDER).split('#')[0].strip()
+FAST_MODEL_NAME = os.getenv("FAST_MODEL_NAME", MODEL_NAME).split('#')[0].strip()
+LLM_TIERS = {
+    "default": (LLM_PROVIDER, MODEL_NAME),
+    "fast": (FAST_LLM_PROVIDER, FAST_MODEL_NAME),
+}
+LLM_ROLE_TIERS = {
+    "router": "fast",
+    "language": "fast",
+    "translation": "default",
+    "agent": "default",
+    "summarizer": "default",
+}
+# Resolved (provider, model) per role. <ROLE>_LLM_PROVIDER and <ROLE>_MODEL_NAME
+# (e.g. AGENT_MODEL_NAME) override the role's tier.
+LLM_ROLE_MODELS = {
+    role: (
+        os.getenv(f"{role.upper()}_LLM_PROVIDER", LLM_TIERS[LLM_ROLE_TIERS[role]][0]).split('#')[0].strip(),
+        os.getenv(f"{role.upper()}_MODEL_NAME", LLM_TIERS[LLM_ROLE_TIERS[role]][1]).split('#')[0].strip(),
+    )
+    for role in LLM_ROLES
+}
+
+# Built-in latency histograms and counters, exposed on /metrics by the Twilio apps
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").split('#')[0].strip().lower() == "true"
+
+# Result caching for read-only tools declared with @cacheable (TTLs and sizes are set per tool)
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "true").split('#')[0].strip().lower() == "true"
+
+# Maximum number of ranked answers returned by one hotel FAQ lookup
+FAQ_TOP_K = int(os.getenv("FAQ_TOP_K", "3").split('#')[0].strip())
+
+# Knowledge-base search: dense (FAISS) and lexical (BM25) candidates fused with reciprocal rank fusion.
+# KB_TOP_K chunks are returned, at most KB_MAX_RESULT_TOKENS in total.
+KB_DENSE_K = int(os.getenv("KB_DENSE_K", "4").split('#')[0].strip())
+KB_LEXICAL_K = int(os.getenv("KB_LEXICAL_K", "4").split('#')[0].strip())
+KB_RRF_K = int(os.getenv("KB_RRF_K", "60").split('#')[0].strip())
+KB_TOP_K = int(os.getenv("KB_TOP_K", "3").split('#')[0].strip())
+KB_MAX_RESULT_TOKENS = int(os.getenv("KB_MAX_RESULT_TOKENS", "600").split('#')[0].strip())
+# Token budget for the FAQ retriever's (faq_tool) result.
+FAQ_MAX_RESULT_TOKENS = int(os.getenv("FAQ_MAX_RESULT_TOKENS", "300").split('#')[0].strip())
+
+# Attraction search: grid cell size (degrees) of the spatial index and the default number of results
+ATTRACTIONS_GRID_CELL_DEG = float(os.getenv("ATTRACTIONS_GRID_CELL_DEG", "0.02").split('#')[0].strip())
+ATTRACTIONS_MAX_RESULTS = int(os.getenv("ATTRACTIONS_MAX_RESULTS", "10").split('#')[0].strip())
+
+# Room bookings and availability quotes: longest stay in nights, and how many days ahead a stay may start
+MAX_STAY_NIGHTS = int(os.getenv("MAX_STAY_NIGHTS", "30").split('#')[0].strip())
+BOOKING_HORIZON_DAYS = int(os.getenv("BOOKING_HORIZON_DAYS", "365").split('#')[0].strip())
+
+# Local copy of the Langfuse traces for the admin dashboard, synced incrementally on each refresh
+TRACE_STORE_PATH = os.getenv("TRACE_STORE_PATH", ".cache/traces.sqlite").split('#')[0].strip()
+TRACE_SYNC_PAGE_SIZE = int(os.getenv("TRACE_SYNC_PAGE_SIZE", "100").split('#')[0].strip())
+TRACE_SYNC_MAX_PAGES = int(os.getenv("TRACE_SYNC_MAX_PAGES", "5").split('#')[0].strip())
+TRACE_SYNC_OVERLAP_S = float(os.getenv("TRACE_SYNC_OVERLAP_S", "300").split('#')[0].strip())
+
+# Worker threads running chat turns for the Streamlit app, shared by all browser sessions
+CHAT_TURN_WORKERS = int(os.getenv("CHAT_TURN_WORKERS", "4").split('#')[0].strip())
+
+# Embeddings for long-term guest memory: "local" (sentence-transformers on CPU, works offline) or "gemini".
+# An empty model name selects the backend default (all-MiniLM-L6-v2 / models/embedding-001).
+MEMORY_EMBEDDING_BACKEND = os.getenv("MEMORY_EMBEDDING_BACKEND", "local").split('#')[0].strip().lower()
+MEMORY_EMBEDDING_MODEL = os.getenv("MEMORY_EMBEDDING_MODEL", "").split('#')[0].strip()
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32").split('#')[0].strip())
+
+# Where the graph keeps each session's state between turns: "memory" (per process) or "sqlite" (survives restarts)
+GRAPH_CHECKPOINTER = os.getenv("GRAPH_CHECKPOINTER", "memory").split('#')[0].strip().lower()
+GRAPH_CHECKPOINT_PATH = os.getenv("GRAPH_CHECKPOINT_PATH", ".cache/checkpoints.sqlite").split('#')[0].strip()
+
+# Process-wide LLM traffic shaping, applied per provider
+LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", "5").split('#')[0].strip())
+LLM_BURST_SIZE = float(os.getenv("LLM_BURST_SIZE", "10").split('#')[0].strip())
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8").split('#')[0].strip())
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4").split('#')[0].strip())
+LLM_RETRY_BASE_DELAY_S = float(os.getenv("LLM_RETRY_BASE_DELAY_S", "0.5").split('#')[0].strip())
+LLM_RETRY_MAX_DELAY_S = float(os.getenv("LLM_RETRY_MAX_DELAY_S", "20").split('#')[0].strip())
+# Timeout for one provider request. Within a turn it is also capped by the time left before the turn's deadline.
+LLM_REQUEST_TIMEOUT_S = float(os.getenv("LLM_REQUEST_TIMEOUT_S", "10").split('#')[0].strip())
+
+# Opt-in exact-match LLM response cache (in-memory LRU in front of SQLite)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").split('#')[0].strip().lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite").split('#')[0].strip()
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048").split('#')[0].strip())
+# Per-role TTL in seconds, overridable with LLM_CACHE_TTL_<ROLE>_S. A TTL of 0 disables caching for that role.
+DEFAULT_LLM_CACHE_TTLS = {"router": 3600, "language": 86400, "translation": 86400, "agent": 0, "summarizer": 900}
+LLM_CACHE_TTLS = {
+    role: float(os.getenv(f"LLM_CACHE_TTL_{role.upper()}_S", str(DEFAULT_LLM_CACHE_TTLS.get(role, 0))).split('#')[0].strip())
+    for role in LLM_ROLES
+}
+
 
 # Router settings
 confidence_str = os.getenv("CONFIDENCE_THRESHOLD", "70")
@@ -24,6 +123,16 @@ WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL_NAME", "base.en")
 WHISPER_DOWNLOAD_ROOT = os.getenv("WHISPER_DOWNLOAD_ROOT", "models/stt")
 PIPER_VOICE_MODEL_PATH = os.getenv("PIPER_VOICE_MODEL_PATH", "models/tts/en_US-lessac-medium.onnx")
 
+# Media download settings for incoming voice notes
+media_max_bytes_str = os.getenv("MEDIA_MAX_BYTES", "10485760")
+MEDIA_MAX_BYTES = int(media_max_bytes_str.split('#')[0].strip())
+MEDIA_CONNECT_TIMEOUT_S = float(os.getenv("MEDIA_CONNECT_TIMEOUT_S", "3.05").split('#')[0].strip())
+MEDIA_READ_TIMEOUT_S = float(os.getenv("MEDIA_READ_TIMEOUT_S", "10").split('#')[0].strip())
+MEDIA_DOWNLOAD_TIMEOUT_S = float(os.getenv("MEDIA_DOWNLOAD_TIMEOUT_S", "30").split('#')[0].strip())
+MEDIA_POOL_SIZE = int(os.getenv("MEDIA_POOL_SIZE", "10").split('#')[0].strip())
+# Accept plain http:// media URLs. Only for local stub servers (e.g. benchmarks/load_test.py).
+MEDIA_ALLOW_INSECURE_HTTP = os.getenv("MEDIA_ALLOW_INSECURE_HTTP", "false").split('#')[0].strip().lower() == "true"
+
 # New agent architecture: Define agents and their specific tools.
 # The keys are the agent names the router will use.
 # The values are the names of the tools for that agent. A value of `None`
@@ -67,10 +176,88 @@ AGENT_TOOL_MAPPING = {
 # The router will now choose from these high-level agent capabilities.
 ROUTER_INTENTS = list(AGENT_TOOL_MAPPING.keys())
 
+# Direct-dispatch agents answer without any LLM call: their tool is called with arguments extracted
+# from the guest's message, and its result is the reply, unsummarized. Each argument is a regex; its
+# first group (or whole match) is passed, and unmatched arguments are left out. Messages matching
+# "trigger" go straight to the agent without waiting for the router, and get that agent's answer only,
+# so a trigger must list unambiguous phrases ("there's a fire", not "fire", which also matches
+# "fire exit"). Other messages reach the agent when the router picks it.
+DIRECT_DISPATCH_AGENTS = {
+    "emergency_services": {
+        "tool": "emergency_help_tool",
+        "trigger": (
+            r"(?i)\b(?:emergency(?!\s+(?:exits?|stairs|staircases?|lighting|procedures?|numbers?|contacts?|hotline)\b)"
+            r"|ambulance|paramedics?|fainted|passed out|collapsed|unconscious|not breathing|can'?t breathe"
+            r"|heart attack|seizure|overdosed?|bleeding (?:heavily|badly|a lot)|(?:there'?s|there is) a fire"
+            r"|on fire|call (?:the )?police|intruder|being attacked)\b"
+        ),
+    },
+}
+
+# Budgets for one agent run: model calls (ReAct steps), tool calls and wall-clock seconds.
+# <AGENT>_MAX_STEPS, <AGENT>_MAX_TOOL_CALLS and <AGENT>_TIMEOUT_S (e.g. HOTEL_SERVICES_TIMEOUT_S)
+# override them per agent. An agent out of budget returns what it has found so far.
+AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "6").split('#')[0].strip())
+AGENT_MAX_TOOL_CALLS = int(os.getenv("AGENT_MAX_TOOL_CALLS", "8").split('#')[0].strip())
+AGENT_TIMEOUT_S = float(os.getenv("AGENT_TIMEOUT_S", "20").split('#')[0].strip())
+AGENT_BUDGETS = {
+    agent: {
+        "max_steps": int(os.getenv(f"{agent.upper()}_MAX_STEPS", str(AGENT_MAX_STEPS)).split('#')[0].strip()),
+        "max_tool_calls": int(os.getenv(f"{agent.upper()}_MAX_TOOL_CALLS", str(AGENT_MAX_TOOL_CALLS)).split('#')[0].strip()),
+        "timeout_s": float(os.getenv(f"{agent.upper()}_TIMEOUT_S", str(AGENT_TIMEOUT_S)).split('#')[0].strip()),
+    }
+    for agent in AGENT_TOOL_MAPPING
+}
+
+# Asynchronous reply delivery: when enabled, the /sms webhook acknowledges
+# immediately and replies are sent through the Messages REST API by a worker pool.
+ASYNC_REPLY_MODE = os.getenv("ASYNC_REPLY_MODE", "false").split('#')[0].strip().lower() == "true"
+
+# Deadline for a whole turn, counted from when the app receives the message. It bounds every LLM call
+# of the turn (detection, routing, agents, translation); agents stop early enough to leave
+# TURN_FINALIZE_RESERVE_S for the final response and its translation. Twilio gives up on a
+# synchronous /sms webhook after 15 s, so the default stays under that unless ASYNC_REPLY_MODE is on.
+TURN_TIMEOUT_S = float(os.getenv("TURN_TIMEOUT_S", "45" if ASYNC_REPLY_MODE else "12").split('#')[0].strip())
+TURN_FINALIZE_RESERVE_S = float(os.getenv("TURN_FINALIZE_RESERVE_S", "5").split('#')[0].strip())
+
+# Speculative execution: a keyword predictor guesses the agent and starts it while the router is
+# still deciding. The result is used if the router agrees and cancelled otherwise. Speculative runs
+# stop before any tool not declared @read_only or @cacheable, so they never book or order anything.
+SPECULATIVE_EXECUTION_ENABLED = os.getenv("SPECULATIVE_EXECUTION_ENABLED", "false").split('#')[0].strip().lower() == "true"
+SPECULATION_WORKERS = int(os.getenv("SPECULATION_WORKERS", "4").split('#')[0].strip())
+SPECULATION_KEYWORDS = {
+    "weather_checker": ["weather", "forecast", "rain", "raining", "sunny", "temperature", "humid", "storm", "snow"],
+    "support_agent": ["policy", "policies", "pet", "pets", "refund", "complaint", "lost", "smoking"],
+    "promotions_agent": ["promotion", "promotions", "deal", "deals", "discount", "discounts", "offer", "offers", "festival", "festivals"],
+    "hotel_services": ["room", "rooms", "suite", "suites", "pool", "breakfast", "gym", "wi-fi", "wifi", "spa",
+                       "upgrade", "checkout", "check-out", "check-in", "availability", "available", "book", "booking"],
+    "transportation_agent": ["taxi", "cab", "bus", "metro", "train", "shuttle", "airport", "transport", "ride"],
+    "attractions_agent": ["museum", "museums", "park", "parks", "attraction", "attractions", "sightseeing",
+                          "dining", "restaurant", "restaurants", "music", "nightlife", "shopping"],
+}
+
 # Agent Memory settings
 conversation_window_str = os.getenv("CONVERSATION_WINDOW_SIZE", "6")
 CONVERSATION_WINDOW_SIZE = int(conversation_window_str.split('#')[0].strip())
 
+# Rolling summary of turns that have fallen out of the conversation window
+CONVERSATION_SUMMARY_ENABLED = os.getenv("CONVERSATION_SUMMARY_ENABLED", "true").split('#')[0].strip().lower() == "true"
+SUMMARY_MIN_BATCH = int(os.getenv("SUMMARY_MIN_BATCH", "2").split('#')[0].strip())
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "300").split('#')[0].strip())
+
+# Approximate prompt token budget per role, overridable with <ROLE>_CONTEXT_TOKEN_BUDGET.
+# Retrieved memory is truncated first, then the oldest turns are dropped.
+DEFAULT_CONTEXT_TOKEN_BUDGETS = {"router": 1500, "agent": 4000}
+CONTEXT_TOKEN_BUDGETS = {
+    role: int(os.getenv(f"{role.upper()}_CONTEXT_TOKEN_BUDGET", str(budget)).split('#')[0].strip())
+    for role, budget in DEFAULT_CONTEXT_TOKEN_BUDGETS.items()
+}
+
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
\ No newline at end of file
+TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
+
+reply_worker_pool_str = os.getenv("REPLY_WORKER_POOL_SIZE", "8")
+REPLY_WORKER_POOL_SIZE = int(reply_worker_pool_str.split('#')[0].strip())
+# Point this at a local stub server to exercise delivery without Twilio.
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL", "https://api.twilio.com")
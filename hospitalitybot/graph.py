@@ -1,32 +1,58 @@
 # hospitalitybot/graph.py
+import time
+import uuid
+from typing import Optional
+
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, END
 
 # Local imports for the supervisor agent components
 from .state import AgentState
-from .nodes import aggregator_node, create_agent_runner, summarizer_node
-from .routers import initial_router, continuation_router
+from .nodes import (
+    aggregator_node,
+    create_agent_runner,
+    create_direct_dispatch_runner,
+    create_router_node,
+    summarizer_node,
+    SPECULATIONS,
+)
+from .routers import entry_router, initial_router, continuation_router
 
 # Workflow-level imports
 from workflows.llm_router import route_intent
 from workflows.formatter import format_output
-from config.settings import ROUTER_INTENTS, AGENT_TOOL_MAPPING
+from config.settings import ROUTER_INTENTS, AGENT_TOOL_MAPPING, DIRECT_DISPATCH_AGENTS, TURN_TIMEOUT_S
+from utils.metrics import instrument_node
+from utils.checkpointer import create_checkpointer
+from utils.rate_limiter import call_deadline
 
 # 1. Build LangGraph
 graph = StateGraph(AgentState)
 
 # 2. Add nodes to the graph
-graph.add_node("llm_router", route_intent)
-graph.add_node("aggregator", aggregator_node)
-graph.add_node("summarizer", summarizer_node)
-graph.add_node("final_output", format_output) # Renamed for clarity
+# Every node is wrapped so its run time is recorded in the node latency histogram.
+# With speculative execution, the router node also starts the agent the keyword predictor expects.
+graph.add_node("llm_router", instrument_node("llm_router", create_router_node(route_intent)))
+graph.add_node("aggregator", instrument_node("aggregator", aggregator_node))
+graph.add_node("summarizer", instrument_node("summarizer", summarizer_node))
+graph.add_node("final_output", instrument_node("final_output", format_output)) # Renamed for clarity
 
-# 3. Dynamically create a node for each defined agent capability
+# 3. Dynamically create a node for each defined agent capability.
+# Direct-dispatch agents call their tool without an LLM; the others run a ReActAgent.
 for agent_name, tool_names in AGENT_TOOL_MAPPING.items():
-    graph.add_node(agent_name, create_agent_runner(agent_name, tool_names))
+    if agent_name in DIRECT_DISPATCH_AGENTS:
+        runner = create_direct_dispatch_runner(agent_name, DIRECT_DISPATCH_AGENTS[agent_name])
+    else:
+        runner = create_agent_runner(agent_name, tool_names)
+    graph.add_node(agent_name, instrument_node(agent_name, runner))
     graph.add_edge(agent_name, "aggregator")
 
-# 4. Wire the graph together
-graph.set_entry_point("llm_router")
+# 4. Wire the graph together.
+# A message matching a direct-dispatch trigger goes straight to that agent, skipping the router.
+entry_route_map = {agent_name: agent_name for agent_name in DIRECT_DISPATCH_AGENTS}
+entry_route_map["llm_router"] = "llm_router"
+graph.set_conditional_entry_point(entry_router, entry_route_map)
 
 # The first router decides which agent to run first.
 # The map must include all possible outputs from the initial_router.
@@ -49,5 +75,68 @@ graph.add_conditional_edges(
 graph.add_edge("summarizer", "final_output")
 graph.add_edge("final_output", END)
 
+# Per-turn bookkeeping, cleared at the start of every turn since the checkpointed thread carries it over.
+TURN_RESET = {
+    "intents": [],
+    "processed_intents": None,  # None clears it, see append_or_reset
+    "last_completed_intent": None,
+    "output": "",
+    "aggregated_output": "",
+}
+
 # 5. Export LangGraph as an executable object
-hospitality_graph = graph.compile()
+def build_graph(checkpointer: Optional[BaseCheckpointSaver] = None):
+    """Compiles the graph. With a checkpointer, each thread_id keeps its state between turns."""
+    return graph.compile(checkpointer=checkpointer)
+
+hospitality_graph = build_graph(create_checkpointer())
+
+def invoke_turn(thread_id: str, message: BaseMessage, memory=None, callbacks: Optional[list] = None,
+                deadline: Optional[float] = None, **fields) -> dict:
+    """
+    Runs one conversational turn on a session's thread.
+
+    Only the new message and the turn's own fields (original_query,
+    detected_language, current_time, conversation_summary, history_offset)
+    are sent; the history is restored from the checkpointer. The state is
+    checkpointed once, when the turn completes, so a failed turn leaves the
+    thread unchanged. Messages before `history_offset` are dropped from the
+    thread at the end of the turn (the summary covers them), and the
+    checkpointer keeps only the thread's latest checkpoint, so the stored
+    state and the cost of writing it stay bounded however long the session. Each turn gets its own speculation_id; a speculative
+    agent run the turn did not use is cancelled when it ends.
+
+    Args:
+        thread_id (str): The session's conversation id (e.g. the guest's phone number).
+        message (BaseMessage): The guest's new message, in English.
+        memory: The session's long-term memory, passed through the run config.
+        callbacks (list, optional): Callback handlers for this run (e.g. Langfuse).
+        deadline (float, optional): time.monotonic() value by which the turn must be
+            answered. Apps set it when the message arrives; defaults to TURN_TIMEOUT_S from now.
+            Every LLM call of the turn (router, agents) is bounded by it.
+        **fields: Other AgentState fields for this turn.
+
+    Returns:
+        dict: The thread's state after the turn; the reply is messages[-1], and
+            messages[0] is message number message_base of the conversation.
+    """
+    if deadline is None:
+        deadline = time.monotonic() + TURN_TIMEOUT_S
+    speculation_id = uuid.uuid4().hex
+    config = {"configurable": {
+        "thread_id": thread_id, "memory": memory, "deadline": deadline, "speculation_id": speculation_id,
+    }}
+    if callbacks:
+        config["callbacks"] = callbacks
+    graph_input = {**TURN_RESET, **fields, "messages": [message]}
+    try:
+        with call_deadline(deadline):
+            return hospitality_graph.invoke(graph_input, config=config, durability="exit")
+    finally:
+        if SPECULATIONS is not None:
+            SPECULATIONS.discard(speculation_id, outcome="unused")
+
+def load_thread_state(thread_id: str) -> dict:
+    """The last checkpointed state of a thread, or an empty dict for a new one."""
+    snapshot = hospitality_graph.get_state({"configurable": {"thread_id": thread_id}})
+    return dict(snapshot.values) if snapshot else {}
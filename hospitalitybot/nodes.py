@@ -1,17 +1,50 @@
 # hospitalitybot/nodes.py
-from .state import AgentState
+from .state import AgentState, recent_messages
 from workflows.base_agent import ReActAgent
 from workflows.action_tool_registry import TOOL_MAP
 from config.llm_loader import load_llm
-from config.settings import CONVERSATION_WINDOW_SIZE
+from config.settings import (
+    CONTEXT_TOKEN_BUDGETS,
+    AGENT_BUDGETS,
+    SPECULATIVE_EXECUTION_ENABLED,
+    SPECULATION_WORKERS,
+    SPECULATION_KEYWORDS,
+    DIRECT_DISPATCH_AGENTS,
+)
 from langchain_core.messages import SystemMessage, BaseMessage, HumanMessage, AIMessage
+from langchain_core.runnables import RunnableConfig
+from typing import Callable
+import logging
+import re
 from utils.prompt_loader import load_prompt_from_file
+from workflows.context_builder import ContextBuilder
+from workflows.speculation import KeywordIntentPredictor, SpeculationRegistry
+from utils.tool_cache import is_read_only
+from utils.rate_limiter import DeadlineExceeded
 
-# Create a single, shared LLM instance for all nodes in this file.
-SHARED_LLM = load_llm()
+# Shared LLM client for the summarizer, served by the central registry.
+SUMMARIZER_LLM = load_llm(role="summarizer")
 BASE_PROMPT = load_prompt_from_file("config/prompts/base_prompt.txt").template
 FOCUSED_TASK_PROMPT = load_prompt_from_file("config/prompts/focused_task_prompt.txt")
 SUMMARIZER_PROMPT = load_prompt_from_file("config/prompts/summarizer_prompt.txt")
+AGENT_CONTEXT = ContextBuilder(CONTEXT_TOKEN_BUDGETS["agent"])
+
+# Agent runs started while the router is still deciding, if speculative execution is enabled.
+SPECULATIONS = SpeculationRegistry(SPECULATION_WORKERS) if SPECULATIVE_EXECUTION_ENABLED else None
+INTENT_PREDICTOR = KeywordIntentPredictor(SPECULATION_KEYWORDS)
+
+SUMMARY_BLOCK_TEMPLATE = (
+    "### SUMMARY OF THE EARLIER CONVERSATION ###\n"
+    "{summary}"
+)
+
+MEMORY_BLOCK_TEMPLATE = (
+    "You have the following potentially relevant information from a previous conversation:\n"
+    "--- START OF RETRIEVED MEMORY ---\n"
+    "{memory}\n"
+    "--- END OF RETRIEVED MEMORY ---\n"
+    "Use this information ONLY if it is relevant to the current query. Otherwise, ignore it."
+)
 
 def aggregator_node(state: AgentState) -> AgentState:
     """
@@ -28,29 +61,43 @@ def aggregator_node(state: AgentState) -> AgentState:
 
     aggregated_output = f"{current_aggregated}\n\n{new_output_part}".strip()
 
-    # Return updated fields. `messages` will be passed through automatically.
+    # Return updated fields. `processed_intents` is append-only, so only the new entry is returned.
     return {
         "aggregated_output": aggregated_output,
-        "processed_intents": state.get("processed_intents", []) + [intent_just_processed],
+        "processed_intents": [intent_just_processed],
     }
 
 def create_agent_runner(agent_name: str, tool_names: list[str] = None):
-    """Creates a graph node that runs a specialized ReActAgent."""
-    def agent_runner(state: AgentState) -> AgentState:
-        # 1. Get conversation history and memory from the state.
-        clean_history = state["messages"][-CONVERSATION_WINDOW_SIZE:]
+    """
+    Creates a graph node that runs a specialized ReActAgent.
+
+    With speculative execution enabled, the agent is also registered with
+    SPECULATIONS. A speculative run may only call the agent's read-only
+    tools (@read_only or @cacheable) and does not write to long-term memory; the node does that once the
+    result is used.
+    """
+    if tool_names is not None:
+        tools_for_agent = {name: TOOL_MAP[name] for name in tool_names if name in TOOL_MAP}
+    else:
+        tools_for_agent = TOOL_MAP
+
+    # Build the agent once per node rather than on every turn.
+    agent_instance = ReActAgent(tools_for_agent, name=agent_name, **AGENT_BUDGETS[agent_name])
+    safe_tools = {name for name, tool in tools_for_agent.items() if is_read_only(tool)}
+
+    def run_agent(state: AgentState, config: RunnableConfig, cancelled=None, speculative: bool = False) -> dict:
+        # 1. Get the recent, unsummarized turns from the thread's state and the session's
+        # memory from the run config. The context builder enforces the token budget.
+        clean_history = recent_messages(state)
     
         # Ensure last message is HumanMessage
         if not isinstance(clean_history[-1], HumanMessage):
             # This block should not be hit if state is managed correctly, but as a safeguard,
             # we ensure it doesn't modify messages and returns the current agent's name.
-            return {
-                "output": "No new user input to respond to.",
-                "last_completed_intent": agent_name,
-            }
+            return {"output": "No new user input to respond to.", "stopped_by": None, "save_memory": False}
 
-        memory = state.get("memory")
-        retrieved_memory_str = ""
+        memory = config.get("configurable", {}).get("memory")
+        retrieved_memory = ""
 
         # 2. Load relevant long-term memories if the memory object exists and is valid.
         if memory and hasattr(memory, "retriever"):
@@ -58,55 +105,77 @@ def create_agent_runner(agent_name: str, tool_names: list[str] = None):
                 query_for_retrieval = state.get("original_query", "") + " ".join(msg.content for msg in clean_history[:-1])
                 retrieved_docs = memory.retriever.invoke(query_for_retrieval)
                 if retrieved_docs:
-                    retrieved_memory_str = (
-                        "You have the following potentially relevant information from a previous conversation:\n"
-                        "--- START OF RETRIEVED MEMORY ---\n"
-                        f"{retrieved_docs[0].page_content}\n"
-                        "--- END OF RETRIEVED MEMORY ---\n"
-                        "Use this information ONLY if it is relevant to the current query. Otherwise, ignore it."
-                    )
+                    retrieved_memory = retrieved_docs[0].page_content
             except Exception as e:
                 print(f"Memory retrieval error: {e}")
-                retrieved_memory_str = ""
-        else:
-            retrieved_memory_str = ""
-
-        # 3. Prepare the tools and prompt for the agent.
-        history_str = "\n".join([f"{msg.type}: {msg.content}" for msg in clean_history[:-1]])
-        
-        if tool_names is not None:
-            tools_for_agent = {name: TOOL_MAP[name] for name in tool_names if name in TOOL_MAP}
-        else:
-            tools_for_agent = TOOL_MAP
-
-        agent_instance = ReActAgent(tools_for_agent)
+                retrieved_memory = ""
 
+        # 3. Prepare the prompt for the agent.
         task_description = "handle a general user request that did not fit a specific category" if agent_name == "general" else agent_name.replace("_", " ")
 
         current_time = state.get("current_time", "Not available. Please ask the user for the current date if needed.")
         formatted_base_prompt = BASE_PROMPT.format(current_time=current_time)
+        focused_prompt_str = FOCUSED_TASK_PROMPT.format(intent_name=task_description)
 
-        focused_prompt_str = FOCUSED_TASK_PROMPT.format(
-            intent_name=task_description,
-            conversation_history=history_str
+        # Older turns are represented by the rolling summary rather than verbatim.
+        summary = state.get("conversation_summary", "")
+        summary_str = SUMMARY_BLOCK_TEMPLATE.format(summary=summary) if summary else ""
+
+        # The history is sent once, as messages. To stay within the token budget,
+        # retrieved memory is truncated first, then the oldest turns are dropped.
+        # The memory block's wrapper only takes up room when there is memory to wrap.
+        memory_frame = MEMORY_BLOCK_TEMPLATE.format(memory="") if retrieved_memory else ""
+        retrieved_memory, agent_history, _ = AGENT_CONTEXT.build(
+            fixed_parts=[formatted_base_prompt, summary_str, memory_frame, focused_prompt_str],
+            history=clean_history,
+            memory=retrieved_memory,
         )
+        retrieved_memory_str = MEMORY_BLOCK_TEMPLATE.format(memory=retrieved_memory) if retrieved_memory else ""
 
+        system_parts = [formatted_base_prompt, summary_str, retrieved_memory_str, focused_prompt_str]
         messages_for_agent = [
-            SystemMessage(content=f"{formatted_base_prompt}\n\n{retrieved_memory_str}\n\n{focused_prompt_str}")
-        ] + clean_history
+            SystemMessage(content="\n\n".join(part for part in system_parts if part))
+        ] + agent_history
 
         # Before invoking the agent, ensure last message is HumanMessage
         if not isinstance(state["messages"][-1], HumanMessage):
             print("Warning: Last message is not HumanMessage. Agent may not respond correctly.")
             # Optionally, skip invocation or add a dummy HumanMessage
 
-        # 4. Run the agent.
+        # 4. Run the agent within its budgets and the turn's deadline.
         agent_sub_state = {"messages": messages_for_agent}
-        result_state = agent_instance(agent_sub_state)
-        agent_output = result_state.get('output', 'No output from agent.')
+        result_state = agent_instance(
+            agent_sub_state,
+            deadline=config.get("configurable", {}).get("deadline"),
+            cancelled=cancelled,
+            safe_tools=safe_tools if speculative else None,
+        )
+        return {
+            "output": result_state.get('output', 'No output from agent.'),
+            "stopped_by": result_state.get("stopped_by"),
+            "save_memory": True,
+        }
+
+    if SPECULATIONS is not None:
+        SPECULATIONS.register(
+            agent_name, lambda state, config, cancelled: run_agent(state, config, cancelled, speculative=True)
+        )
+
+    def agent_runner(state: AgentState, config: RunnableConfig) -> AgentState:
+        # Use the run the router started for this agent, unless it stopped at a tool it may not call speculatively.
+        result = None
+        speculation_id = config.get("configurable", {}).get("speculation_id")
+        if SPECULATIONS is not None and speculation_id:
+            result = SPECULATIONS.claim(
+                speculation_id, agent_name, usable=lambda speculative: speculative["stopped_by"] != "unsafe_tool"
+            )
+        if result is None:
+            result = run_agent(state, config)
+        agent_output = result["output"]
 
         # 5. Save the current interaction to long-term memory if memory is valid.
-        if memory and hasattr(memory, "save_context"):
+        memory = config.get("configurable", {}).get("memory")
+        if result["save_memory"] and memory and hasattr(memory, "save_context"):
             try:
                 memory.save_context(
                     {"input": state.get("original_query", "")},
@@ -122,11 +191,77 @@ def create_agent_runner(agent_name: str, tool_names: list[str] = None):
         }
     return agent_runner
 
+def create_router_node(route: Callable[[AgentState], dict]):
+    """
+    Wraps the intent router so the predicted agent starts while it runs.
+
+    Without speculative execution this is `route` itself. Otherwise the
+    keyword predictor's agent, if it registered for speculation, is started
+    on the same state before the router is called. If the router's intents
+    do not include it, the speculative run is cancelled.
+    """
+    if SPECULATIONS is None:
+        return route
+
+    def router_node(state: AgentState, config: RunnableConfig) -> dict:
+        speculation_id = config.get("configurable", {}).get("speculation_id")
+        messages = state.get("messages") or []
+        predicted = INTENT_PREDICTOR.predict(messages[-1].content) if speculation_id and messages else None
+        started = predicted is not None and SPECULATIONS.start(speculation_id, predicted, state, config)
+
+        routed = route(state)
+        if started and predicted not in routed.get("intents", []):
+            SPECULATIONS.discard(speculation_id, outcome="miss")
+        return routed
+    return router_node
+
+def create_direct_dispatch_runner(agent_name: str, dispatch: dict):
+    """
+    Creates a graph node that answers with a tool's result, without any LLM call.
+
+    The tool named in DIRECT_DISPATCH_AGENTS is called with arguments extracted
+    from the guest's message by regex; an argument that does not match is left
+    out so the tool's default applies. The node also sets the turn's intents
+    when it was reached by its trigger rather than through the router.
+    """
+    tool = TOOL_MAP[dispatch["tool"]]
+    argument_patterns = {name: re.compile(pattern) for name, pattern in dispatch.get("arguments", {}).items()}
+
+    def direct_runner(state: AgentState) -> AgentState:
+        messages = state.get("messages") or []
+        message = messages[-1].content if messages else state.get("original_query", "")
+        arguments = {}
+        for name, pattern in argument_patterns.items():
+            match = pattern.search(message)
+            if match:
+                arguments[name] = match.group(1) if match.groups() else match.group(0)
+
+        try:
+            output = str(tool.invoke(arguments))
+        except Exception as e:
+            logging.error(f"Direct dispatch of {agent_name} to {tool.name} failed: {e}", exc_info=True)
+            output = "I encountered an error. Please try again."
+
+        return {
+            "intents": state.get("intents") or [agent_name],
+            "output": output,
+            "last_completed_intent": agent_name,
+        }
+    return direct_runner
+
 def summarizer_node(state: AgentState) -> AgentState:
     """
     Synthesizes the aggregated output into a final response.
+
+    Turns answered only by direct-dispatch agents skip the LLM: a single
+    answer is sent as the tool returned it. So does a turn whose deadline
+    passes before the final response could be written.
     """
     aggregated_response = state.get("aggregated_output", "")
+    processed = state.get("processed_intents") or []
+    if processed and all(intent in DIRECT_DISPATCH_AGENTS for intent in processed):
+        return {"aggregated_output": state.get("output", "") if len(processed) == 1 else aggregated_response}
+
     user_query = state.get("original_query", state['messages'][-1].content)
 
     summarization_prompt_str = SUMMARIZER_PROMPT.format(
@@ -134,13 +269,12 @@ def summarizer_node(state: AgentState) -> AgentState:
         aggregated_response=aggregated_response
     )
 
-    final_response = SHARED_LLM.invoke(summarization_prompt_str).content
-    
-    # Get the full message history from the state
-    history = state.get("messages", [])
-    
-    # Return the full history plus the new final response, which the app layer expects.
-    return {
-        "aggregated_output": final_response,
-        "messages": history + [AIMessage(content=final_response)],
-    }
\ No newline at end of file
+    try:
+        final_response = SUMMARIZER_LLM.invoke(summarization_prompt_str).content
+    except DeadlineExceeded:
+        # Out of time: send what the agents found as it is.
+        logging.warning("Turn deadline reached before the final response; sending the agents' output unsynthesized")
+        final_response = aggregated_response or "I'm sorry, I couldn't finish that in time. Please try again."
+
+    # format_output turns this into the turn's AIMessage.
+    return {"aggregated_output": final_response}
\ No newline at end of file
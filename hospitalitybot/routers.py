@@ -1,5 +1,36 @@
 # hospitalitybot/routers.py
+import re
+from typing import Optional
+
 from .state import AgentState
+from config.settings import DIRECT_DISPATCH_AGENTS
+
+# Messages matching a direct-dispatch agent's trigger skip the LLM router.
+DIRECT_DISPATCH_TRIGGERS = [
+    (agent_name, re.compile(dispatch["trigger"]))
+    for agent_name, dispatch in DIRECT_DISPATCH_AGENTS.items()
+    if dispatch.get("trigger")
+]
+
+def direct_dispatch_agent(text: str) -> Optional[str]:
+    """
+    The first direct-dispatch agent whose trigger matches `text`, or None.
+
+    The apps check the guest's raw message with it before language detection,
+    so a triggered turn (an emergency) makes no LLM call at all.
+    """
+    for agent_name, trigger in DIRECT_DISPATCH_TRIGGERS:
+        if trigger.search(text):
+            return agent_name
+    return None
+
+def entry_router(state: AgentState) -> str:
+    """
+    Decides where a turn starts: at the first direct-dispatch agent whose
+    trigger matches the guest's message, otherwise at the llm_router.
+    """
+    messages = state.get("messages") or []
+    return (direct_dispatch_agent(messages[-1].content) if messages else None) or "llm_router"
 
 def initial_router(state: AgentState) -> str:
     """
@@ -17,7 +48,7 @@ def continuation_router(state: AgentState) -> str:
     - If there are more intents to process, it routes to the next agent.
     - If all intents are processed, it routes to the final output node.
     """
-    processed = set(state.get("processed_intents", []))
+    processed = set(state.get("processed_intents") or [])
     all_intents = state.get("intents", [])
 
     # Find the next intent in the list that hasn't been processed yet.
@@ -1,20 +1,70 @@
 # d:\Work\ai_hackathon\hospitalitybot\state.py
-from typing import TypedDict, List, Optional
+from dataclasses import dataclass, field
+from typing import Annotated, TypedDict, List, Optional
 from langchain_core.messages import BaseMessage
-from langchain.memory import VectorStoreRetrieverMemory
+
+@dataclass
+class DropMessages:
+    """A `messages` update that drops the first `count` messages, then appends `messages`."""
+    count: int
+    messages: List[BaseMessage] = field(default_factory=list)
+
+def append_messages(current: List[BaseMessage], update) -> List[BaseMessage]:
+    """
+    Append-only reducer for `messages`.
+
+    Nodes return only the messages they add, which go after the existing ones.
+    Nothing is matched by id or replaced, so a node must never return the
+    history it was given: it would be appended a second time. A DropMessages
+    update also drops messages from the front; the final node uses it to
+    drop the ones the conversation summary covers, so the list (and every
+    copy of it) stays bounded by the unsummarized tail of the conversation.
+    """
+    current = current or []
+    if isinstance(update, DropMessages):
+        current, update = current[update.count:], update.messages
+    elif isinstance(update, BaseMessage):
+        update = [update]
+    return current + list(update)
+
+def append_or_reset(current: Optional[list], update: Optional[list]) -> list:
+    """Append-only list reducer. An update of None clears the list (sent at the start of every turn)."""
+    if update is None:
+        return []
+    return (current or []) + list(update)
 
 class AgentState(TypedDict):
     """
     Represents the state of the AI Hospitality Agent.
+
+    The state is checkpointed per conversation thread, so it only holds
+    serializable data. The session's long-term memory object is passed per run
+    in config["configurable"]["memory"] instead.
     """
     original_query: str                     # The original user query, untouched.
     detected_language: str                  # The language code detected from the original query (e.g., 'es', 'fr', 'en').
-    messages: List[BaseMessage]             # The list of messages that forms the conversation.
+    messages: Annotated[List[BaseMessage], append_messages] # The conversation from message_base on, checkpointed per thread. Nodes return only new messages.
+    message_base: int                       # Number of earlier messages of the conversation, dropped once the summary covered them.
+    conversation_summary: str               # Rolling summary of the turns that have left the message window.
+    history_offset: int                     # Conversation index of the first message not covered by the summary, i.e. sent verbatim.
     intents: List[str]                      # List of intents identified by the router.
     confidence: int                         # Confidence score from the router.
-    processed_intents: List[str]            # Intents that have been processed by an agent.
+    processed_intents: Annotated[List[str], append_or_reset] # Intents processed by an agent this turn. Nodes return only new ones.
     last_completed_intent: Optional[str]    # The last intent that was completed.
     output: str                             # The raw output from the last agent run.
     aggregated_output: str                  # The aggregated output from all agent runs, which is synthesized for the final response.
-    memory: Optional[VectorStoreRetrieverMemory] # Session-specific long-term memory object.
-    current_time: str                       # The current time in ISO format.
\ No newline at end of file
+    current_time: str                       # The current time in ISO format.
+
+def recent_messages(state: AgentState) -> List[BaseMessage]:
+    """The messages of the thread that are not yet covered by the conversation summary."""
+    return state["messages"][max(state.get("history_offset", 0) - state.get("message_base", 0), 0):]
+
+def summarized_messages(state: AgentState) -> DropMessages:
+    """A `messages` update dropping the stored messages that the conversation summary covers."""
+    covered = state.get("history_offset", 0) - state.get("message_base", 0)
+    # The turn's own message is always kept.
+    return DropMessages(max(min(covered, len(state["messages"]) - 1), 0))
+
+def message_count(state: dict) -> int:
+    """Number of messages in the whole conversation, including those already dropped."""
+    return state.get("message_base", 0) + len(state.get("messages", []))
@@ -0,0 +1,57 @@
+"""
+invoke_turn with every LLM role scripted by the benchmark corpus (no API keys needed).
+
+Run from the project root: python -m pytest tests
+"""
+import json
+import os
+import sys
+import tempfile
+import uuid
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "benchmarks"))
+os.chdir(PROJECT_ROOT)
+
+from run_benchmark import DEFAULT_CORPUS, build_script, configure_environment  # noqa: E402
+
+with open(DEFAULT_CORPUS, encoding="utf-8") as f:
+    CORPUS = json.load(f)
+_script = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+json.dump(build_script(CORPUS), _script)
+_script.close()
+# Must run before the project modules are imported, since they read the settings at import time.
+configure_environment(_script.name, latency_ms=0)
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from config.settings import CONVERSATION_WINDOW_SIZE  # noqa: E402
+from hospitalitybot.graph import invoke_turn  # noqa: E402
+from hospitalitybot.state import message_count  # noqa: E402
+from workflows.conversation_summary import history_context  # noqa: E402
+
+
+def test_each_turn_adds_the_guest_message_and_one_ai_reply():
+    thread_id = f"test-{uuid.uuid4().hex}"
+    count = 0
+    # Replay every recorded turn on one thread, so it runs well past the message window.
+    for turn in (turn for conversation in CORPUS["conversations"] for turn in conversation["turns"]):
+        summary, history_offset = history_context(None, count + 1, CONVERSATION_WINDOW_SIZE)
+        result = invoke_turn(
+            thread_id,
+            HumanMessage(content=turn["guest"]),
+            original_query=turn["guest"],
+            detected_language="en",
+            conversation_summary=summary,
+            history_offset=history_offset,
+        )
+
+        added = result["messages"][count - result.get("message_base", 0):]
+        assert [type(message) for message in added] == [HumanMessage, AIMessage]
+        assert added[0].content == turn["guest"]
+        assert added[1].content == turn["answer"]
+        assert message_count(result) == count + 2
+        # Messages the window no longer shows are dropped from the thread.
+        assert len(result["messages"]) <= CONVERSATION_WINDOW_SIZE + 2
+        count = message_count(result)
@@ -1,23 +1,41 @@
-import pandas as pd
+from datetime import date
 from langchain.tools import tool
+from pydantic import BaseModel, Field
+from utils.tool_cache import read_only
+from utils.inventory_calendar import BookingError, get_calendar, parse_stay
 
-@tool
-def check_availability_tool(room_type: str) -> str:
-    """Checks the availability of a given room type and provides dynamic pricing."""
+class AvailabilityInput(BaseModel):
+    room_type: str = Field(default="", description="Room type (e.g., 'suite'), several separated by commas, or empty for all room types.")
+    check_in_date: str = Field(default="", description="Check-in date (YYYY-MM-DD). Defaults to tonight.")
+    check_out_date: str = Field(default="", description="Check-out date (YYYY-MM-DD). Defaults to the day after check-in.")
+
+@read_only
+@tool(args_schema=AvailabilityInput)
+def check_availability_tool(room_type: str = "", check_in_date: str = "", check_out_date: str = "") -> str:
+    """
+    Checks availability and dynamic prices for a stay, for one, several or all room types at once.
+    Prices rise on nights when a room type is nearly full.
+    """
+    room_types = [part.strip() for part in room_type.split(",") if part.strip()]
     try:
-        df = pd.read_csv("data/room_inventory.csv")
-        room_info = df[df["room_type"] == room_type].iloc[0]
-        availability_percentage = room_info["rooms_available"] / room_info["total_rooms"]
-        
-        if availability_percentage > 0.5:
-            price_multiplier = 1.0
-        elif availability_percentage > 0.2:
-            price_multiplier = 1.2
-        else:
-            price_multiplier = 1.5
-            
-        dynamic_price = room_info["base_price"] * price_multiplier
-        
-        return f"There are {room_info['rooms_available']} {room_type} rooms available. The current price is ${dynamic_price:.2f} per night."
-    except (FileNotFoundError, IndexError):
-        return f"Information for {room_type} rooms is not available."
\ No newline at end of file
+        check_in, check_out = parse_stay(check_in_date or date.today().isoformat(), check_out_date)
+        quotes = get_calendar().quote(check_in, check_out, room_types)
+    except FileNotFoundError:
+        return "Room inventory data is not available."
+    except BookingError as e:
+        return f"❌ {e}"
+
+    nights = (check_out - check_in).days
+    lines = [f"Availability from {check_in} to {check_out} ({nights} night{'s' if nights > 1 else ''}):"]
+    for quote in quotes:
+        if not quote["available"]:
+            full = ", ".join(night.isoformat() for night in quote["full_nights"])
+            lines.append(f"- {quote['room_type']}: fully booked on {full}")
+            continue
+        low, high = quote["nightly_prices"].min(), quote["nightly_prices"].max()
+        nightly = f"${low:.2f}" if low == high else f"${low:.2f}–${high:.2f}"
+        lines.append(
+            f"- {quote['room_type']}: {quote['available']} of {quote['total_rooms']} rooms available, "
+            f"{nightly} per night, ${quote['total_price']:.2f} total"
+        )
+    return "\n".join(lines)
@@ -1,6 +1,8 @@
 from langchain.tools import tool
+from utils.tool_cache import read_only
 
+@read_only
 @tool
-def emergency_help_tool(query: str) -> str:
+def emergency_help_tool(query: str = "") -> str:
     """Provide emergency support contact info or assistance."""
     return "🚨 Please call our emergency hotline at 1800-999-HELP or go to the nearest help desk immediately."
@@ -1,7 +1,10 @@
 import pandas as pd
 from langchain.tools import tool
 from datetime import datetime
+from utils.tool_cache import cacheable
 
+# Without a month the answer is for the current one, so it is not cached across a month boundary.
+@cacheable(ttl_s=3600, data_files=["data/festivals.csv"], case_insensitive=True, skip_when=lambda args: args["month"] is None)
 @tool
 def festival_promotion_tool(month: str = None) -> str:
     """Checks for festival-themed promotions."""
@@ -1,33 +1,43 @@
-import pandas as pd
+import random
+from datetime import date
 from langchain.tools import tool
 from typing import List
+from utils.inventory_calendar import BookingError, book_room
 
 @tool
-def group_booking_tool(room_requests: List[dict]) -> str:
-    """Handles group bookings with conflict resolution."""
-    try:
-        df = pd.read_csv("data/room_inventory.csv", index_col='room_type')
-        bookings = []
-        conflicts = []
+def group_booking_tool(room_requests: List[dict], check_in_date: str = "", check_out_date: str = "",
+                       guest_name: str = "Group booking") -> str:
+    """
+    Handles group bookings with conflict resolution. Each request is a dict with
+    'room_type' and 'num_rooms'. Dates are YYYY-MM-DD; check-in defaults to tonight
+    and check-out to the day after check-in.
+    """
+    check_in_date = check_in_date or date.today().isoformat()
+    bookings = []
+    conflicts = []
 
-        for request in room_requests:
-            room_type = request['room_type']
-            num_rooms = request['num_rooms']
-            if room_type in df.index and df.loc[room_type, 'rooms_available'] >= num_rooms:
-                df.loc[room_type, 'rooms_available'] -= num_rooms
-                bookings.append(f"{num_rooms} {room_type} rooms booked successfully.")
-            else:
-                conflicts.append(f"Not enough {room_type} rooms available.")
+    for request in room_requests:
+        room_type = request['room_type']
+        num_rooms = int(request['num_rooms'])
+        confirmation_number = "HCN-" + "".join([str(x) for x in random.sample(range(10), 6)])
+        booking = {
+            "confirmation_number": confirmation_number,
+            "guest_name": guest_name,
+            "room_type": room_type,
+            "check_in_date": check_in_date,
+            "check_out_date": check_out_date,
+        }
+        try:
+            # Same calendar and bookings file lock as single bookings, so both see every room taken.
+            quote = book_room(booking, rooms=num_rooms)
+        except BookingError as e:
+            conflicts.append(f"Not enough {room_type} rooms available: {e}")
+            continue
+        except FileNotFoundError:
+            return "Room inventory data not found."
+        bookings.append(
+            f"{num_rooms} {room_type} rooms booked successfully "
+            f"(${quote['total_price'] * num_rooms:.2f} total, confirmation number {confirmation_number})."
+        )
 
-        df.to_csv("data/room_inventory.csv")
-
-        response = ""
-        if bookings:
-            response += "\n".join(bookings)
-        if conflicts:
-            response += "\n".join(conflicts)
-
-        return response
-
-    except FileNotFoundError:
-        return "Room inventory data not found."
\ No newline at end of file
+    return "\n".join(bookings + conflicts)
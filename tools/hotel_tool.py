@@ -1,10 +1,16 @@
 import os
+import re
+from functools import lru_cache
 from langchain.tools import tool
+from utils.tool_cache import read_only
 from pydantic import BaseModel, Field
 from typing import List
 import random
 import pandas as pd
-import csv
+from utils.csv_table import append_row
+from utils.lexical_index import LexicalIndex
+from utils.inventory_calendar import BookingError, book_room
+from config.settings import FAQ_TOP_K
 
 # ----------------- Input Schemas -----------------
 
@@ -20,7 +26,7 @@ class RoomServiceInput(BaseModel):
     delivery_time: str = Field(description="Requested delivery time (HH:MM).")
 
 class FAQInput(BaseModel):
-    keyword: str = Field(description="Keyword to search for in the hotel FAQs.")
+    keyword: str = Field(description="Keyword or short question to search for in the hotel FAQs.")
 
 class GetHotelInfoInput(BaseModel):
     information_type: str = Field(description="Type of information requested (e.g., 'pool hours', 'gym location', 'breakfast times').")
@@ -34,19 +40,45 @@ class GetRoomDetailsInput(BaseModel):
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
 
+FAQ_MARKDOWN_PATH = os.path.join(DATA_DIR, "faq.md")
+# "**Q: question**" followed by "A: answer", up to the next blank line, question or heading.
+FAQ_MARKDOWN_PATTERN = re.compile(r"\*\*Q:\s*(.+?)\*\*\s*\nA:\s*(.+?)(?=\n\s*\n|\n\*\*Q:|\n#|\Z)", re.DOTALL)
+# Answers scoring below this fraction of the best match are left out of the FAQ tool's result.
+FAQ_RELATIVE_SCORE_CUTOFF = 0.5
+
+def _load_faq_csv():
+    df = pd.read_csv(os.path.join(DATA_DIR, "faqs.csv"))
+    return [(f"{row['keyword']} {row['answer']}", str(row["answer"])) for _, row in df.iterrows()]
+
+def _load_faq_markdown():
+    with open(FAQ_MARKDOWN_PATH, "r", encoding="utf-8") as f:
+        text = f.read()
+    return [
+        (f"{question} {answer}", f"Q: {question.strip()}\nA: {answer.strip()}")
+        for question, answer in FAQ_MARKDOWN_PATTERN.findall(text)
+    ]
+
+@lru_cache(maxsize=1)
+def _get_faq_index() -> LexicalIndex:
+    """The FAQ index over faqs.csv and faq.md. Each file is reindexed when it changes."""
+    index = LexicalIndex()
+    index.add_source("faqs.csv", [os.path.join(DATA_DIR, "faqs.csv")], _load_faq_csv)
+    index.add_source("faq.md", [FAQ_MARKDOWN_PATH], _load_faq_markdown)
+    return index
+
+def warm_up():
+    """Builds the FAQ index ahead of the first lookup. Called by `warm_up_tools`."""
+    _get_faq_index().refresh()
+
 def safe_append_csv(data: dict, file_path: str, fieldnames: List[str]):
-    file_exists = os.path.isfile(file_path)
-    with open(file_path, mode="a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(data)
+    # Locked, so appends never interleave with edits saved from the admin dashboard.
+    append_row(file_path, data, fieldnames)
 
 # ----------------- Tools -----------------
 
 @tool(args_schema=BookRoomInput)
 def book_room_tool(guest_name: str, room_type: str, check_in_date: str, check_out_date: str) -> str:
-    """Simulates booking a hotel room. Logs the booking to bookings.csv."""
+    """Books a hotel room if one of that type is free on every night of the stay. Logs the booking to bookings.csv."""
     confirmation_number = "HCN-" + "".join([str(x) for x in random.sample(range(10), 6)])
     data = {
         "confirmation_number": confirmation_number,
@@ -55,10 +87,16 @@ def book_room_tool(guest_name: str, room_type: str, check_in_date: str, check_ou
         "check_in_date": check_in_date,
         "check_out_date": check_out_date
     }
-    bookings_file = os.path.join(DATA_DIR, "bookings.csv")
-    safe_append_csv(data, bookings_file, list(data.keys()))
+    try:
+        # Checked against the inventory calendar and recorded in one step, under the bookings file lock.
+        quote = book_room(data)
+    except BookingError as e:
+        return f"❌ Could not book the room: {e}"
 
-    return f"✅ Room booked for {guest_name}: {room_type} from {check_in_date} to {check_out_date}.\nConfirmation number: {confirmation_number}"
+    return (
+        f"✅ Room booked for {guest_name}: {room_type} from {check_in_date} to {check_out_date}.\n"
+        f"Total: ${quote['total_price']:.2f}\nConfirmation number: {confirmation_number}"
+    )
 
 @tool(args_schema=RoomServiceInput)
 def room_service_tool(guest_name: str, items: List[str], delivery_time: str) -> str:
@@ -75,19 +113,17 @@ def room_service_tool(guest_name: str, items: List[str], delivery_time: str) ->
 
     return f"🛎️ Room service requested by {guest_name}:\n- Items: {items_str}\n- Delivery at: {delivery_time}\nYour order will arrive shortly."
 
+@read_only
 @tool(args_schema=FAQInput)
 def hotel_faq_tool(keyword: str) -> str:
-    """Returns hotel FAQs based on a keyword. Reads from faqs.csv."""
-    faq_file = os.path.join(DATA_DIR, "faqs.csv")
-    if not os.path.exists(faq_file):
-        return "FAQ data file not found."
-
-    df = pd.read_csv(faq_file)
-    result = df[df["keyword"].str.contains(keyword.lower(), na=False)]
-    if not result.empty:
-        return result.iloc[0]["answer"]
-    return "❌ Could not find an FAQ matching your keyword. Please try a related term."
-
+    """Returns the hotel FAQ answers that best match a keyword or question, best first. Tolerates typos."""
+    results = _get_faq_index().search(keyword, k=FAQ_TOP_K)
+    if not results:
+        return "❌ Could not find an FAQ matching your keyword. Please try a related term."
+    best_score = results[0][0]
+    return "\n".join(answer for score, answer in results if score >= best_score * FAQ_RELATIVE_SCORE_CUTOFF)
+
+@read_only
 @tool(args_schema=GetHotelInfoInput)
 def get_hotel_info_tool(information_type: str) -> str:
     """Provides specific hotel information such as pool hours, gym, breakfast, or check-in/out times."""
@@ -104,6 +140,7 @@ def get_hotel_info_tool(information_type: str) -> str:
         return "Check-out time: 11:00 AM."
     return "Information type not found. Try asking about pool, gym, or breakfast."
 
+@read_only
 @tool(args_schema=GetRoomDetailsInput)
 def get_room_details_tool(guest_name: str, room_number: int) -> str:
     """Fetches room details such as type, view, and amenities for a specific guest and room number."""
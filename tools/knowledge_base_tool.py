@@ -1,22 +1,43 @@
 import os
+from functools import lru_cache
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from utils.embeddings import get_local_embeddings
+from utils.hybrid_retriever import HybridRetriever
 from langchain.tools import tool
+from utils.tool_cache import cacheable
+from utils.retrieval_compression import compress_results
+from config.settings import KB_DENSE_K, KB_LEXICAL_K, KB_RRF_K, KB_TOP_K, KB_MAX_RESULT_TOKENS
 
 INDEX_PATH = "faiss_index"
-embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
 
-# Add allow_dangerous_deserialization=True
-vector_store = FAISS.load_local(INDEX_PATH, embedding_model, allow_dangerous_deserialization=True)
-retriever = vector_store.as_retriever()
+@lru_cache(maxsize=1)
+def get_retriever() -> HybridRetriever:
+    """Loads the embedding model, FAISS index and lexical index on first use, so importing the tool stays cheap."""
+    embedding_model = get_local_embeddings()
+    # Add allow_dangerous_deserialization=True
+    vector_store = FAISS.load_local(INDEX_PATH, embedding_model, allow_dangerous_deserialization=True)
+    retriever = HybridRetriever(vector_store, dense_k=KB_DENSE_K, lexical_k=KB_LEXICAL_K, rrf_k=KB_RRF_K)
+    retriever.lexical_index.refresh()
+    return retriever
 
+def warm_up():
+    """Builds the retriever ahead of the first query. Called by `warm_up_tools`."""
+    get_retriever()
+
+@cacheable(
+    ttl_s=3600,
+    max_entries=512,
+    data_files=[os.path.join(INDEX_PATH, "index.faiss"), os.path.join(INDEX_PATH, "index.pkl")],
+    case_insensitive=True,
+)
 @tool
 def search_knowledge_base(query: str) -> str:
     """
     Searches the knowledge base for information related to the user's query.
     The knowledge base contains information from hotel documents such as the hotel booklet,
     spa menu, bar menu, and more. Use this tool to answer questions about hotel amenities,
-    services, and policies.
+    services, and policies. Exact names, codes and numbers (e.g. "PHONE EXTENSIONS") work well.
     """
-    docs = retriever.invoke(query)
-    return "\n".join([doc.page_content for doc in docs])
+    docs = get_retriever().search(query, k=KB_TOP_K)
+    # Overlapping chunks are de-duplicated and, over budget, cut down to the sentences that match the query.
+    return compress_results(query, [doc.page_content for doc in docs], KB_MAX_RESULT_TOKENS)
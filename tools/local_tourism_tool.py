@@ -1,7 +1,18 @@
+import re
+from functools import lru_cache
 from langchain.tools import tool
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional, Tuple
 import pandas as pd
+from utils.tool_cache import cacheable, read_only
+from utils.spatial_index import GeoGridIndex
+from utils.csv_table import file_fingerprint
+from config.settings import ATTRACTIONS_GRID_CELL_DEG, ATTRACTIONS_MAX_RESULTS
+
+ATTRACTIONS_PATH = "data/attractions.csv"
+PLACES_PATH = "data/places.csv"
+# "28.6315, 77.2167" style coordinates given instead of a place name.
+COORDINATES_PATTERN = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
 
 # --- Input Schemas ---
 
@@ -12,12 +23,55 @@ class LocalRecommendationsInput(BaseModel):
 
 class FindNearbyAttractionsInput(BaseModel):
     """Input for finding nearby attractions."""
-    location: str = Field(description="Hotel name or address.")
-    interests: List[str] = Field(description="List of interests (e.g., ['parks', 'museums']).")
-    max_distance: float = Field(description="Max distance in miles.")
+    location: str = Field(description="Hotel or landmark name, or the guest's coordinates as 'latitude, longitude'.")
+    interests: List[str] = Field(description="List of interests (e.g., ['parks', 'museums']). Empty for any kind.")
+    max_distance: Optional[float] = Field(default=None, description="Max distance in miles. Leave empty for the closest attractions at any distance.")
+    limit: int = Field(default=ATTRACTIONS_MAX_RESULTS, description="Maximum number of attractions to list.")
+
+# --- Setup ---
+
+# file_fingerprint of a file that doesn't exist.
+MISSING_FILE = (0, 0)
+
+@lru_cache(maxsize=1)
+def _load_attractions(fingerprint: Tuple[int, int]) -> Tuple[pd.DataFrame, GeoGridIndex]:
+    """The attraction table and its spatial index, rebuilt when attractions.csv changes (new fingerprint)."""
+    df = pd.read_csv(ATTRACTIONS_PATH).dropna(subset=["latitude", "longitude"]).reset_index(drop=True)
+    index = GeoGridIndex(df["latitude"], df["longitude"], df["type"], cell_deg=ATTRACTIONS_GRID_CELL_DEG)
+    return df, index
+
+@lru_cache(maxsize=1)
+def _load_places(fingerprint: Tuple[int, int]) -> dict:
+    """Lower-cased place name -> (latitude, longitude), from places.csv."""
+    if fingerprint == MISSING_FILE:
+        return {}
+    df = pd.read_csv(PLACES_PATH)
+    return {str(row["name"]).strip().lower(): (row["latitude"], row["longitude"]) for _, row in df.iterrows()}
+
+def _resolve_location(location: str, attractions: pd.DataFrame) -> Optional[Tuple[float, float]]:
+    """Coordinates of a 'latitude, longitude' string, a known place (hotels, landmarks) or an attraction."""
+    match = COORDINATES_PATTERN.match(location)
+    if match:
+        latitude, longitude = float(match.group(1)), float(match.group(2))
+        return (latitude, longitude) if -90 <= latitude <= 90 and -180 <= longitude <= 180 else None
+    name = location.strip().lower()
+    places = _load_places(file_fingerprint(PLACES_PATH))
+    if name in places:
+        return places[name]
+    named = attractions[attractions["name"].str.lower() == name]
+    if not named.empty:
+        return named.iloc[0]["latitude"], named.iloc[0]["longitude"]
+    return None
+
+def warm_up():
+    """Builds the attraction index ahead of the first lookup. Called by `warm_up_tools`."""
+    fingerprint = file_fingerprint(ATTRACTIONS_PATH)
+    if fingerprint != MISSING_FILE:
+        _load_attractions(fingerprint)
 
 # --- Tool Functions ---
 
+@read_only
 @tool(args_schema=LocalRecommendationsInput)
 def provide_local_recommendations_tool(guest_name: str, preferences: List[str]) -> str:
     """Provides local recommendations based on guest preferences."""
@@ -34,24 +88,42 @@ def provide_local_recommendations_tool(guest_name: str, preferences: List[str])
     recommendations = "\n".join(f"- {row['recommendation']}" for _, row in matches.iterrows())
     return f"Recommendations for {guest_name} based on preferences ({', '.join(preferences)}):\n{recommendations}"
 
+@cacheable(ttl_s=3600, data_files=[ATTRACTIONS_PATH, PLACES_PATH])
 @tool(args_schema=FindNearbyAttractionsInput)
-def find_nearby_attractions_tool(location: str, interests: List[str], max_distance: float) -> str:
-    """Finds nearby attractions based on location and interests, using mock data."""
-    try:
-        df = pd.read_csv("data/attractions.csv")
-    except FileNotFoundError:
+def find_nearby_attractions_tool(
+    location: str,
+    interests: List[str],
+    max_distance: Optional[float] = None,
+    limit: int = ATTRACTIONS_MAX_RESULTS,
+) -> str:
+    """
+    Finds attractions near a hotel, landmark or the guest's coordinates, matching their interests.
+    Lists the closest ones first, within max_distance miles if given.
+    """
+    fingerprint = file_fingerprint(ATTRACTIONS_PATH)
+    if fingerprint == MISSING_FILE:
         return "📂 attractions.csv not found."
+    df, index = _load_attractions(fingerprint)
+
+    coordinates = _resolve_location(location, df)
+    if coordinates is None:
+        return f"📍 Location '{location}' not found. Please give a hotel or landmark name, or 'latitude, longitude'."
+    latitude, longitude = coordinates
 
-    results = df[
-        (df["location"].str.lower() == location.lower()) &
-        (df["type"].isin(interests)) &
-        (df["distance"] <= max_distance)
-    ]
+    categories = interests or None
+    limit = max(1, limit)
+    if max_distance is None:
+        positions, distances = index.nearest(latitude, longitude, limit, categories)
+    else:
+        positions, distances = index.within(latitude, longitude, max_distance, categories)
+        positions, distances = positions[:limit], distances[:limit]
 
-    if results.empty:
-        return f"No nearby attractions found within {max_distance} miles for interests: {', '.join(interests)}."
+    if not len(positions):
+        within = f" within {max_distance} miles" if max_distance is not None else ""
+        return f"No nearby attractions found{within} for interests: {', '.join(interests) or 'any'}."
 
+    results = df.iloc[positions]
     return "Nearby attractions:\n" + "\n".join(
-        f"- {row['name']} ({row['distance']} mi, {row['type']})"
-        for _, row in results.iterrows()
+        f"- {name} ({distance:.1f} mi, {kind})"
+        for name, kind, distance in zip(results["name"], results["type"], distances)
     )
@@ -1,22 +1,18 @@
 import os
-import csv
 import random
 import pandas as pd
 from datetime import datetime
 from langchain.tools import tool
 from pydantic import BaseModel, Field
+from utils.csv_table import append_row
+from utils.tool_cache import cacheable
 
 # --- Data Directory ---
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
 
 def safe_append_to_csv(file_path, row_dict, fieldnames):
-    file_exists = os.path.exists(file_path)
-    with open(file_path, mode='a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(row_dict)
+    append_row(file_path, row_dict, fieldnames)
 
 # --- Informational Tool ---
 
@@ -25,6 +21,7 @@ class LocalTransportInput(BaseModel):
     location: str = Field(description="Hotel name or neighborhood.")
     transport_type: str = Field(description="Type of transport (e.g., 'taxi', 'metro', 'bus').")
 
+@cacheable(ttl_s=3600, data_files=[os.path.join(DATA_DIR, "local_transport.csv")], case_insensitive=True)
 @tool(args_schema=LocalTransportInput)
 def local_transport_tool(location: str, transport_type: str) -> str:
     """Provides local transport options from mock data."""
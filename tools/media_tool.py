@@ -1,6 +1,8 @@
 import pandas as pd
 from langchain.tools import tool
+from utils.tool_cache import read_only
 
+@read_only
 @tool
 def get_media_tool(room_type: str) -> str:
     """Provides links to pictures or videos of rooms and amenities."""
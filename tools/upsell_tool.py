@@ -1,6 +1,8 @@
 import pandas as pd
 from langchain.tools import tool
+from utils.tool_cache import read_only
 
+@read_only
 @tool
 def upsell_recommendation_tool(current_room: str) -> str:
     """Provides upsell recommendations for rooms and add-ons."""
@@ -1,7 +1,9 @@
 import pandas as pd
 from langchain.tools import tool
 from datetime import datetime
+from utils.tool_cache import cacheable
 
+@cacheable(ttl_s=900, data_files=["data/mock_weather.csv"], case_insensitive=True)
 @tool
 def get_weather_forecast(city: str, date: str) -> str:
     """
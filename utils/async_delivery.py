@@ -0,0 +1,116 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import requests
+
+from config.settings import (
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    TWILIO_API_BASE_URL,
+    REPLY_WORKER_POOL_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MessagingClient:
+    """
+    Minimal client for the Twilio Messages REST API.
+
+    The base URL is configurable so that a local stub server can stand in for
+    Twilio when testing the asynchronous delivery path.
+    """
+
+    def __init__(self, account_sid: str = None, auth_token: str = None, base_url: str = None, timeout: float = 10.0):
+        self.account_sid = account_sid or TWILIO_ACCOUNT_SID
+        self.auth_token = auth_token or TWILIO_AUTH_TOKEN
+        self.base_url = (base_url or TWILIO_API_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        # A single keep-alive session shared by all worker threads.
+        self.session = requests.Session()
+        self.session.auth = (self.account_sid, self.auth_token)
+
+    def send_message(self, to: str, from_: str, body: str) -> dict:
+        """
+        Sends a text message and returns the decoded API response.
+
+        Raises:
+            requests.HTTPError: If the API rejects the message.
+        """
+        url = f"{self.base_url}/2010-04-01/Accounts/{self.account_sid}/Messages.json"
+        response = self.session.post(url, data={"To": to, "From": from_, "Body": body}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+class ReplyDispatcher:
+    """
+    Runs message-processing jobs on a background worker pool and delivers the
+    resulting replies through a MessagingClient.
+
+    Jobs for the same session are processed strictly in arrival order so that
+    a guest's conversation state is never updated by two workers at once.
+    """
+
+    def __init__(self, client: MessagingClient = None, max_workers: int = None):
+        self.client = client or MessagingClient()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or REPLY_WORKER_POOL_SIZE,
+            thread_name_prefix="reply-worker",
+        )
+        self._lock = threading.Lock()
+        self._pending = {}  # session_id -> deque of queued jobs
+
+    def set_client(self, client: MessagingClient):
+        """Swaps the messaging client, e.g. for a local stub in tests."""
+        self.client = client
+
+    def submit(self, session_id: str, job: Callable[[], str], to: str, from_: str):
+        """
+        Queues a job whose return value is sent to `to` as the reply text.
+
+        Args:
+            session_id (str): Key used to serialize jobs of the same conversation.
+            job (Callable[[], str]): Produces the reply text.
+            to (str): Recipient address (the guest's number).
+            from_ (str): Sender address (our Twilio number).
+        """
+        with self._lock:
+            queue = self._pending.setdefault(session_id, deque())
+            queue.append((job, to, from_))
+            if len(queue) > 1:
+                # A worker is already draining this session's queue.
+                return
+        self._executor.submit(self._drain, session_id)
+
+    def _drain(self, session_id: str):
+        while True:
+            with self._lock:
+                job, to, from_ = self._pending[session_id][0]
+
+            self._run(job, to, from_)
+
+            with self._lock:
+                queue = self._pending[session_id]
+                queue.popleft()
+                if not queue:
+                    del self._pending[session_id]
+                    return
+
+    def _run(self, job: Callable[[], str], to: str, from_: str):
+        try:
+            reply = job()
+        except Exception as e:
+            logger.error(f"Reply job for {to} failed: {e}", exc_info=True)
+            reply = "Sorry, there was an error processing your message."
+
+        try:
+            self.client.send_message(to=to, from_=from_, body=reply)
+        except Exception as e:
+            logger.error(f"Failed to deliver reply to {to}: {e}", exc_info=True)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,74 @@
+import os
+import sqlite3
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+
+from config.settings import GRAPH_CHECKPOINTER, GRAPH_CHECKPOINT_PATH
+
+
+class LatestInMemorySaver(InMemorySaver):
+    """InMemorySaver that keeps only each thread's latest checkpoint, so memory doesn't grow with every turn."""
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        thread_id, checkpoint_ns = saved["configurable"]["thread_id"], saved["configurable"]["checkpoint_ns"]
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        kept_versions = checkpoint["channel_versions"]
+        for checkpoint_id in [checkpoint_id for checkpoint_id in checkpoints if checkpoint_id != checkpoint["id"]]:
+            superseded, _, _ = checkpoints.pop(checkpoint_id)
+            # Channel values are stored once per version; drop those the latest checkpoint no longer uses.
+            for channel, version in self.serde.loads_typed(superseded)["channel_versions"].items():
+                if kept_versions.get(channel) != version:
+                    self.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        return saved
+
+
+def _latest_sqlite_saver(conn: sqlite3.Connection) -> BaseCheckpointSaver:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    class LatestSqliteSaver(SqliteSaver):
+        """SqliteSaver that keeps only each thread's latest checkpoint, so the file doesn't grow with every turn."""
+
+        def put(self, config, checkpoint, metadata, new_versions):
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            key = (saved["configurable"]["thread_id"], saved["configurable"]["checkpoint_ns"], checkpoint["id"])
+            with self.cursor() as cur:
+                for table in ("checkpoints", "writes"):
+                    cur.execute(
+                        f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?", key
+                    )
+            return saved
+
+    return LatestSqliteSaver(conn)
+
+
+def create_checkpointer(kind: str = GRAPH_CHECKPOINTER, path: str = GRAPH_CHECKPOINT_PATH) -> BaseCheckpointSaver:
+    """
+    Creates the checkpointer that stores each session's graph state between turns.
+
+    Args:
+        kind (str): "memory" keeps state in this process only; "sqlite" stores it
+            in a SQLite file (WAL mode), so sessions survive restarts and can be
+            shared by several worker processes.
+        path (str): The SQLite file, for kind="sqlite".
+
+    Either way, only the latest checkpoint of each thread is kept: a turn
+    resumes from it, and older ones are never read.
+
+    Returns:
+        BaseCheckpointSaver: The checkpointer to compile the graph with.
+    """
+    if kind == "memory":
+        return LatestInMemorySaver()
+    elif kind == "sqlite":
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # SqliteSaver serializes access to the connection with its own lock.
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return _latest_sqlite_saver(conn)
+    else:
+        raise ValueError(f"Unsupported graph checkpointer specified in .env: '{kind}'")
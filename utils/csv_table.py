@@ -0,0 +1,154 @@
+import csv
+import hashlib
+import json
+import os
+import tempfile
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.file_lock import file_lock
+
+
+class StaleRowError(Exception):
+    """Raised when a row changed on disk after it was read for editing."""
+
+    def __init__(self, conflicts: List[int]):
+        self.conflicts = conflicts
+        super().__init__(f"{len(conflicts)} row(s) changed since they were loaded: {conflicts}")
+
+
+def row_hash(row: List[str]) -> str:
+    """Fingerprint of one data row, used for optimistic concurrency checks."""
+    return hashlib.sha1(json.dumps(row, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def file_fingerprint(path: str) -> Tuple[int, int]:
+    """(mtime_ns, size) of `path`, or (0, 0) if it doesn't exist. Changes on every write."""
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except FileNotFoundError:
+        return 0, 0
+
+
+def append_row(path: str, row: dict, fieldnames: Iterable[str]):
+    """Appends one row under the file lock, writing the header if the file is new."""
+    with file_lock(path):
+        write_row(path, row, fieldnames)
+
+
+def write_row(path: str, row: dict, fieldnames: Iterable[str]):
+    """Appends one row, writing the header if the file is new. The caller must hold the file lock."""
+    file_exists = os.path.isfile(path)
+    with open(path, mode="a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(fieldnames), quoting=csv.QUOTE_ALL)
+        if not file_exists:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def read_page(path: str, offset: int = 0, limit: int = 100, where: Optional[Callable[[dict], bool]] = None) -> dict:
+    """
+    Reads one page of a CSV file without loading the rest into memory.
+
+    Rows are streamed and only the requested page is kept. Each row comes with
+    its position in the file, which identifies it for `apply_row_edits`, and
+    the hash of its values at read time.
+
+    Args:
+        path (str): The CSV file.
+        offset (int): How many matching rows to skip.
+        limit (int): Maximum number of rows to return.
+        where (Callable[[dict], bool], optional): Keeps only rows for which it
+            returns True. `offset` and `total` count matching rows only.
+
+    Returns:
+        dict: "columns", "rows" (each with "index", "hash" and "values") and
+            "total", the number of matching rows in the file.
+    """
+    page, total = [], 0
+    with file_lock(path), open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        columns = next(reader, [])
+        for index, values in enumerate(reader):
+            if len(values) != len(columns):
+                continue
+            if where is not None and not where(dict(zip(columns, values))):
+                continue
+            if offset <= total < offset + limit:
+                page.append({"index": index, "hash": row_hash(values), "values": dict(zip(columns, values))})
+            total += 1
+    return {"columns": columns, "rows": page, "total": total}
+
+
+def apply_row_edits(
+    path: str,
+    updates: Dict[int, Tuple[str, dict]] = None,
+    deletes: Dict[int, str] = None,
+    inserts: List[dict] = (),
+) -> int:
+    """
+    Applies row-level changes to a CSV file atomically.
+
+    Under the file lock, every updated or deleted row is checked against the
+    hash it had when it was read; if any of them changed in the meantime
+    nothing is written. Otherwise the file is rewritten to a temporary file
+    and swapped in with os.replace, so readers never see a partial file and
+    rows appended by other writers before the lock was taken are kept.
+
+    Args:
+        path (str): The CSV file.
+        updates (Dict[int, Tuple[str, dict]]): Row index -> (hash at read time,
+            {column: new value}). Columns not listed keep their current value.
+        deletes (Dict[int, str]): Row index -> hash at read time.
+        inserts (List[dict]): New rows, appended at the end.
+
+    Returns:
+        int: The number of rows changed, deleted or added.
+
+    Raises:
+        StaleRowError: If a row to update or delete changed since it was read.
+    """
+    updates, deletes = updates or {}, deletes or {}
+    with file_lock(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            columns = next(reader, [])
+            rows = list(reader)
+
+        expected = {**{index: h for index, (h, _) in updates.items()}, **deletes}
+        conflicts = sorted(
+            index for index, h in expected.items()
+            if index >= len(rows) or row_hash(rows[index]) != h
+        )
+        if conflicts:
+            raise StaleRowError(conflicts)
+
+        for index, (_, changes) in updates.items():
+            rows[index] = [str(changes.get(column, value)) for column, value in zip(columns, rows[index])]
+        rows = [row for index, row in enumerate(rows) if index not in deletes]
+        rows += [[str(row.get(column) or "") for column in columns] for row in inserts]
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+                writer.writerow(columns)
+                writer.writerows(rows)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return len(updates) + len(deletes) + len(inserts)
+
+
+def distinct_values(path: str, column: str) -> List[str]:
+    """The distinct values of one column, in order of first appearance."""
+    seen = {}
+    with file_lock(path), open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            value = row.get(column)
+            if value:
+                seen.setdefault(value, None)
+    return list(seen)
@@ -0,0 +1,71 @@
+import threading
+from typing import Dict, Tuple
+
+from langchain.embeddings.base import Embeddings
+
+from config.settings import (
+    MEMORY_EMBEDDING_BACKEND,
+    MEMORY_EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+)
+from utils.memory_setup import get_embedding_size
+
+LOCAL_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+_local_embeddings: Dict[str, Embeddings] = {}
+_local_embeddings_lock = threading.Lock()
+_memory_embeddings = None
+_memory_embeddings_lock = threading.Lock()
+
+
+def get_local_embeddings(model_name: str = LOCAL_EMBEDDING_MODEL) -> Embeddings:
+    """
+    A sentence-transformers model on CPU, loaded once per process and model name.
+
+    The knowledge-base tools and guest memory share it, so the model weights
+    are only held in memory once. Texts are embedded in batches of
+    EMBEDDING_BATCH_SIZE and vectors are normalized, so L2 distance in FAISS
+    ranks the same as cosine similarity.
+    """
+    if model_name not in _local_embeddings:
+        # Locked, so concurrent first calls (e.g. the warm-up thread and a first request) load the weights once.
+        with _local_embeddings_lock:
+            if model_name not in _local_embeddings:
+                from langchain_community.embeddings import HuggingFaceEmbeddings
+
+                _local_embeddings[model_name] = HuggingFaceEmbeddings(
+                    model_name=model_name,
+                    model_kwargs={"device": "cpu"},
+                    encode_kwargs={"batch_size": EMBEDDING_BATCH_SIZE, "normalize_embeddings": True},
+                )
+    return _local_embeddings[model_name]
+
+
+def _create_memory_embeddings(backend: str, model_name: str) -> Embeddings:
+    if backend == "local":
+        return get_local_embeddings(model_name or LOCAL_EMBEDDING_MODEL)
+    elif backend == "gemini":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return GoogleGenerativeAIEmbeddings(model=model_name or "models/embedding-001")
+    else:
+        raise ValueError(f"Unsupported memory embedding backend specified in .env: '{backend}'")
+
+
+def get_memory_embeddings() -> Tuple[Embeddings, int]:
+    """
+    The embedding model used for long-term guest memory, and its vector size.
+
+    Created on first use and shared by every session of the process. With the
+    default "local" backend, memory reads and writes stay on the machine and
+    take milliseconds; "gemini" keeps the previous remote embeddings.
+
+    Returns:
+        Tuple[Embeddings, int]: The model and its embedding dimension.
+    """
+    global _memory_embeddings
+    if _memory_embeddings is None:
+        with _memory_embeddings_lock:
+            if _memory_embeddings is None:
+                model = _create_memory_embeddings(MEMORY_EMBEDDING_BACKEND, MEMORY_EMBEDDING_MODEL)
+                _memory_embeddings = (model, get_embedding_size(model))
+    return _memory_embeddings
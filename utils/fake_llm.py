@@ -0,0 +1,127 @@
+import json
+import re
+import time
+from itertools import count
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from workflows.context_builder import count_tokens
+
+DEFAULT_RESPONSE = "I'm happy to help with that."
+
+_call_ids = count(1)
+
+
+def load_script(path: str) -> list:
+    """Reads the rule list of a fake LLM script file (see ScriptedChatModel)."""
+    if not path:
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("rules", [])
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic, offline stand-in for a provider chat model.
+
+    Selected with LLM_PROVIDER=fake, so benchmarks and load tests can run the
+    real graph with no network or API keys. Answers come from a list of rules,
+    each a dict with:
+
+        prompt      regex searched in the whole prompt, to tell call sites
+                    apart (e.g. "intent classifier" for the router)
+        match       regex searched in the latest user message; when several
+                    rules match, the one matching furthest into that message wins,
+                    so the current query beats older turns quoted in the history
+        tools       true/false to only apply when tools are (not) bound
+        tool_calls  [{"name": ..., "args": {...}}] to request before answering;
+                    the rule only applies if all of these tools are bound
+        response    the text answer; "{tool_output}" is replaced by the
+                    results of the tool calls made in this turn
+
+    Every call sleeps `latency_s` and reports token usage estimated the same
+    way as the context builder, so per-call costs show up in the metrics.
+    """
+
+    model_name: str = "scripted"
+    latency_s: float = 0.0
+    rules: List[dict] = []
+    default_response: str = DEFAULT_RESPONSE
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name}
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _find_rule(self, prompt: str, query: str, bound_tools: set) -> Optional[dict]:
+        best, best_position = None, -2
+        for rule in self.rules:
+            if "tools" in rule and rule["tools"] != bool(bound_tools):
+                continue
+            if any(call["name"] not in bound_tools for call in rule.get("tool_calls", [])):
+                continue
+            if "prompt" in rule and not re.search(rule["prompt"], prompt, re.IGNORECASE):
+                continue
+            position = -1
+            if "match" in rule:
+                found = None
+                for found in re.finditer(rule["match"], query, re.IGNORECASE):
+                    pass
+                if found is None:
+                    continue
+                position = found.start()
+            if position > best_position:
+                best, best_position = rule, position
+        return best
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+        prompt = "\n".join(str(msg.content) for msg in messages)
+        human_turns = [msg for msg in messages if isinstance(msg, HumanMessage)]
+        query = str(human_turns[-1].content) if human_turns else prompt
+        # Tool results that arrived after the latest user message belong to this turn.
+        last_human = max((i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)), default=-1)
+        tool_outputs = [str(msg.content) for msg in messages[last_human + 1:] if isinstance(msg, ToolMessage)]
+
+        bound_tools = {tool["function"]["name"] for tool in kwargs.get("tools") or []}
+        rule = self._find_rule(prompt, query, bound_tools) or {}
+        if rule.get("tool_calls") and not tool_outputs:
+            message = AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": call["name"], "args": call.get("args", {}), "id": f"call_{next(_call_ids)}"}
+                    for call in rule["tool_calls"]
+                ],
+            )
+        else:
+            response = rule.get("response", self.default_response)
+            message = AIMessage(content=response.replace("{tool_output}", "\n".join(tool_outputs)))
+
+        output_tokens = count_tokens(str(message.content)) + sum(
+            count_tokens(json.dumps(call["args"])) for call in message.tool_calls
+        )
+        message.usage_metadata = {
+            "input_tokens": count_tokens(prompt),
+            "output_tokens": output_tokens,
+            "total_tokens": count_tokens(prompt) + output_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
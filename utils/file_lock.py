@@ -0,0 +1,54 @@
+import os
+import time
+from contextlib import contextmanager
+
+
+class FileLockTimeout(TimeoutError):
+    """Raised when a file lock could not be acquired in time."""
+
+
+@contextmanager
+def file_lock(path: str, timeout_s: float = 10.0, stale_after_s: float = 60.0, poll_s: float = 0.02):
+    """
+    Holds an exclusive lock on `path` for the duration of the block.
+
+    The lock is a sibling `<path>.lock` file created with O_EXCL, which works
+    across processes and platforms without extra dependencies. Every writer of
+    a data file (the tools and the admin dashboard) must take it. A lock file
+    older than `stale_after_s` is assumed to belong to a crashed process and
+    is removed.
+
+    Args:
+        path (str): The file being protected.
+        timeout_s (float): How long to wait for the lock before giving up.
+        stale_after_s (float): Age after which an existing lock is broken.
+        poll_s (float): Delay between attempts.
+
+    Raises:
+        FileLockTimeout: If the lock is still held after `timeout_s`.
+    """
+    lock_path = f"{path}.lock"
+    deadline = time.monotonic() + timeout_s
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > stale_after_s:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() >= deadline:
+                raise FileLockTimeout(f"Timed out waiting for the lock on {path}")
+            time.sleep(poll_s)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
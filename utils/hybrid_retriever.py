@@ -0,0 +1,64 @@
+from typing import Dict, Iterable, List, Tuple
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from utils.lexical_index import LexicalIndex
+from utils.retrieval_compression import PDF_ARTIFACT_PATTERN
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Merges several rankings of the same items with reciprocal rank fusion.
+
+    Each item scores the sum of 1 / (k + rank) over the rankings it appears
+    in, so items found by several retrievers rise to the top without having
+    to compare their raw scores.
+
+    Returns:
+        List[Tuple[str, float]]: (item, fused score) pairs, best first.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda entry: entry[1], reverse=True)
+
+
+class HybridRetriever:
+    """
+    Dense and lexical retrieval over the chunks of a FAISS vector store.
+
+    The dense side is the store's similarity search. The lexical side is a
+    BM25 index (utils/lexical_index.py) over the same chunks, built from the
+    store's docstore on first use, which finds exact names, codes and
+    numbers that embeddings tend to blur. The two rankings are merged with
+    reciprocal rank fusion.
+    """
+
+    def __init__(self, vector_store: FAISS, dense_k: int = 4, lexical_k: int = 4, rrf_k: int = 60):
+        self.vector_store = vector_store
+        self.dense_k = dense_k
+        self.lexical_k = lexical_k
+        self.rrf_k = rrf_k
+        self._documents: Dict[str, Document] = {}
+        self.lexical_index = LexicalIndex()
+        self.lexical_index.add_source("docstore", [], self._load_chunks)
+
+    def _load_chunks(self) -> List[Tuple[str, str]]:
+        chunks = []
+        for docstore_id in self.vector_store.index_to_docstore_id.values():
+            document = self.vector_store.docstore.search(docstore_id)
+            if isinstance(document, Document):
+                self._documents[docstore_id] = document
+                chunks.append((PDF_ARTIFACT_PATTERN.sub(" ", document.page_content), docstore_id))
+        return chunks
+
+    def search(self, query: str, k: int = 3) -> List[Document]:
+        """
+        Returns the `k` chunks ranked best by the fused dense and lexical rankings.
+        """
+        lexical_ids = [docstore_id for _, docstore_id in self.lexical_index.search(query, k=self.lexical_k)]
+        dense_ids = [document.id for document in self.vector_store.similarity_search(query, k=self.dense_k)]
+        fused = reciprocal_rank_fusion([dense_ids, lexical_ids], k=self.rrf_k)
+        return [self._documents[docstore_id] for docstore_id, _ in fused[:k] if docstore_id in self._documents]
@@ -0,0 +1,284 @@
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.settings import BOOKING_HORIZON_DAYS, MAX_STAY_NIGHTS
+from utils.csv_table import file_fingerprint, write_row
+from utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_PATH = "data/room_inventory.csv"
+BOOKINGS_PATH = "data/bookings.csv"
+
+# (occupancy share still free, price multiplier): the first tier whose share is exceeded applies.
+PRICE_TIERS = ((0.5, 1.0), (0.2, 1.2))
+SCARCITY_MULTIPLIER = 1.5
+
+
+class BookingError(ValueError):
+    """Raised when a booking or quote request can't be served (unknown room type, bad dates, sold out)."""
+
+
+def parse_stay(check_in_date: str, check_out_date: str = "") -> Tuple[date, date]:
+    """
+    Parses a stay's ISO dates. Without a check-out date, the stay is one night.
+
+    Raises:
+        BookingError: If a date is malformed, check-out is not after check-in, check-in is
+            in the past or more than BOOKING_HORIZON_DAYS ahead, or the stay is longer than
+            MAX_STAY_NIGHTS.
+    """
+    try:
+        check_in = date.fromisoformat(check_in_date.strip())
+        check_out = date.fromisoformat(check_out_date.strip()) if check_out_date.strip() else check_in + timedelta(days=1)
+    except ValueError:
+        raise BookingError(f"Dates must be YYYY-MM-DD, got '{check_in_date}' and '{check_out_date}'.")
+    if check_in < date.today():
+        raise BookingError(f"The check-in date {check_in.isoformat()} is in the past.")
+    if check_in > date.today() + timedelta(days=BOOKING_HORIZON_DAYS):
+        raise BookingError(f"Stays can be booked at most {BOOKING_HORIZON_DAYS} days ahead.")
+    if check_out <= check_in:
+        raise BookingError("The check-out date must be after the check-in date.")
+    if (check_out - check_in).days > MAX_STAY_NIGHTS:
+        raise BookingError(f"Stays are limited to {MAX_STAY_NIGHTS} nights.")
+    return check_in, check_out
+
+
+def price_multipliers(available: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """Dynamic price multipliers for arrays of free and total rooms, by the share still free."""
+    share = available / np.maximum(total, 1)
+    conditions = [share > threshold for threshold, _ in PRICE_TIERS]
+    return np.select(conditions, [multiplier for _, multiplier in PRICE_TIERS], default=SCARCITY_MULTIPLIER)
+
+
+class InventoryCalendar:
+    """
+    Rooms booked per room type and night, as one integer array.
+
+    Row r, column d of the array is the number of rooms of type r booked for
+    the night starting `start + d` days; rooms free on a night are the total
+    rooms of the type minus those booked. Bookings are added as +1/-1 steps at
+    check-in and check-out and integrated with a cumulative sum, so loading
+    any number of bookings is a handful of array operations. A quote for any
+    stay and any set of room types is a single slice of the array, with
+    availability and prices computed for every night at once.
+    """
+
+    def __init__(self, room_types: Sequence[str], total_rooms: Sequence[int], base_prices: Sequence[float], start: date):
+        self.room_types = [str(room_type).strip().lower() for room_type in room_types]
+        self._type_index = {room_type: i for i, room_type in enumerate(self.room_types)}
+        self.total_rooms = np.asarray(total_rooms, dtype=np.int64)
+        self.base_prices = np.asarray(base_prices, dtype=float)
+        self.start = start
+        self._booked = np.zeros((len(self.room_types), 0), dtype=np.int64)
+        self._lock = threading.RLock()
+
+    def type_indices(self, room_types: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        Row indices of the given room types (case-insensitive), or of all of them.
+
+        Raises:
+            BookingError: If a room type is unknown.
+        """
+        if room_types is None or not len(room_types):
+            return np.arange(len(self.room_types))
+        # Looked up once per distinct name, which matters when loading many bookings.
+        names, inverse = np.unique([str(room_type).strip().lower() for room_type in room_types], return_inverse=True)
+        unknown = [name for name in names if name not in self._type_index]
+        if unknown:
+            raise BookingError(f"Unknown room type '{unknown[0]}'. We have: {', '.join(self.room_types)}.")
+        return np.array([self._type_index[name] for name in names])[inverse]
+
+    def _day(self, day: date) -> int:
+        return (day - self.start).days
+
+    def _grow(self, first: date, end: date):
+        """Extends the array with empty nights so that it covers the nights from `first` up to `end`."""
+        before = max(0, -self._day(first))
+        after = max(0, self._day(end) - self._booked.shape[1])
+        if before or after:
+            self._booked = np.pad(self._booked, ((0, 0), (before, after)))
+            self.start -= timedelta(days=before)
+
+    def add_bookings(self, room_types: Sequence[str], check_ins: Sequence[date], check_outs: Sequence[date]):
+        """
+        Adds one booked room per (room type, check-in, check-out) triple.
+
+        Raises:
+            BookingError: If a room type is unknown.
+        """
+        if not len(room_types):
+            return
+        check_ins = np.asarray(check_ins, dtype="datetime64[D]")
+        check_outs = np.asarray(check_outs, dtype="datetime64[D]")
+        with self._lock:
+            rows = self.type_indices(room_types)
+            self._grow(check_ins.min().item(), check_outs.max().item())
+            start = np.datetime64(self.start, "D")
+            starts = (check_ins - start).astype(np.int64)
+            ends = (check_outs - start).astype(np.int64)
+            steps = np.zeros((len(self.room_types), self._booked.shape[1] + 1), dtype=np.int64)
+            np.add.at(steps, (rows, starts), 1)
+            np.add.at(steps, (rows, ends), -1)
+            self._booked += np.cumsum(steps, axis=1)[:, :-1]
+
+    def booked(self, check_in: date, check_out: date, rows: np.ndarray) -> np.ndarray:
+        """Rooms booked for each of `rows` on each night of the stay, shape (len(rows), nights)."""
+        with self._lock:
+            first, end = self._day(check_in), self._day(check_out)
+            result = np.zeros((len(rows), end - first), dtype=np.int64)
+            stored_first, stored_end = max(first, 0), min(end, self._booked.shape[1])
+            if stored_first < stored_end:
+                result[:, stored_first - first:stored_end - first] = self._booked[rows, stored_first:stored_end]
+            return result
+
+    def quote(self, check_in: date, check_out: date, room_types: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        Availability and dynamic prices of a stay for several room types at once.
+
+        Args:
+            check_in (date): First night of the stay.
+            check_out (date): Departure day (not a night of the stay).
+            room_types (Sequence[str], optional): Room types to quote; all of them by default.
+
+        Returns:
+            List[Dict]: Per room type: "room_type", "total_rooms", "available" (rooms free on
+                every night of the stay), "nightly_prices" (a float array, one price per night),
+                "total_price" and "full_nights" (the dates with no room left).
+
+        Raises:
+            BookingError: If a room type is unknown.
+        """
+        rows = self.type_indices(room_types)
+        totals = self.total_rooms[rows][:, None]
+        available = np.maximum(totals - self.booked(check_in, check_out, rows), 0)
+        prices = self.base_prices[rows][:, None] * price_multipliers(available, totals)
+        nights = np.arange(available.shape[1])
+        return [
+            {
+                "room_type": self.room_types[row],
+                "total_rooms": int(self.total_rooms[row]),
+                "available": int(available[i].min()),
+                "nightly_prices": prices[i],
+                "total_price": float(prices[i].sum()),
+                "full_nights": [check_in + timedelta(days=int(night)) for night in nights[available[i] == 0]],
+            }
+            for i, row in enumerate(rows)
+        ]
+
+
+def _build_calendar(inventory_path: str, bookings_path: str) -> InventoryCalendar:
+    inventory = pd.read_csv(inventory_path)
+    today = date.today()
+    calendar = InventoryCalendar(inventory["room_type"], inventory["total_rooms"], inventory["base_price"], today)
+    if not os.path.isfile(bookings_path):
+        return calendar
+    bookings = pd.read_csv(bookings_path, dtype=str).dropna(subset=["room_type", "check_in_date", "check_out_date"])
+    check_ins = pd.to_datetime(bookings["check_in_date"], errors="coerce")
+    check_outs = pd.to_datetime(bookings["check_out_date"], errors="coerce")
+    room_types = bookings["room_type"].str.strip().str.lower()
+    valid = check_ins.notna() & check_outs.notna() & (check_outs > check_ins) & room_types.isin(calendar.room_types)
+    if not valid.all():
+        logger.warning(f"Skipped {int((~valid).sum())} booking(s) with unknown room types or invalid dates in {bookings_path}")
+    # Past stays don't affect availability; leaving them out keeps the array to the nights that can be booked.
+    valid &= check_outs > pd.Timestamp(today)
+    calendar.add_bookings(
+        room_types[valid].tolist(),
+        check_ins[valid].values.astype("datetime64[D]"),
+        check_outs[valid].values.astype("datetime64[D]"),
+    )
+    return calendar
+
+
+_calendar: Optional[InventoryCalendar] = None
+_calendar_fingerprint = None
+_calendar_lock = threading.Lock()
+
+
+def _fingerprint(inventory_path: str, bookings_path: str) -> tuple:
+    return inventory_path, bookings_path, file_fingerprint(inventory_path), file_fingerprint(bookings_path)
+
+
+def _current_calendar(inventory_path: str, bookings_path: str) -> InventoryCalendar:
+    """The calendar, rebuilt if either file changed. The caller must hold the bookings file lock."""
+    global _calendar, _calendar_fingerprint
+    fingerprint = _fingerprint(inventory_path, bookings_path)
+    with _calendar_lock:
+        if _calendar is None or fingerprint != _calendar_fingerprint:
+            _calendar = _build_calendar(inventory_path, bookings_path)
+            _calendar_fingerprint = fingerprint
+        return _calendar
+
+
+def get_calendar(inventory_path: str = INVENTORY_PATH, bookings_path: str = BOOKINGS_PATH) -> InventoryCalendar:
+    """
+    The inventory calendar of the room inventory and bookings files.
+
+    Rebuilt when either file changes on disk (edits from the admin dashboard,
+    or other processes); bookings made with `book_room` update it in place.
+    Rebuilds read the bookings file under its lock, so they never see a
+    booking that is still being written.
+    """
+    with _calendar_lock:
+        if _calendar is not None and _fingerprint(inventory_path, bookings_path) == _calendar_fingerprint:
+            return _calendar
+    with file_lock(bookings_path):
+        return _current_calendar(inventory_path, bookings_path)
+
+
+def book_room(
+    booking: dict,
+    rooms: int = 1,
+    inventory_path: str = INVENTORY_PATH,
+    bookings_path: str = BOOKINGS_PATH,
+) -> dict:
+    """
+    Records a booking if enough rooms of its type are free on every night of the stay.
+
+    The availability check and the write to the bookings file happen under the
+    bookings file lock, so two guests can never both get the last room, and
+    the in-memory calendar is updated in the same step. bookings.csv has one
+    row per room, so a booking of several rooms writes that many rows with the
+    same confirmation number.
+
+    Args:
+        booking (dict): The bookings.csv row: at least "room_type", "check_in_date" and
+            "check_out_date" (YYYY-MM-DD; empty for one night), plus any other columns to record.
+        rooms (int): Number of rooms to book.
+        inventory_path (str): The room inventory file.
+        bookings_path (str): The bookings file.
+
+    Returns:
+        dict: The quote of the booked stay (for one room), as returned by `InventoryCalendar.quote`.
+
+    Raises:
+        BookingError: If the dates or room type are invalid, or not enough rooms are free on a night.
+    """
+    global _calendar_fingerprint
+    if rooms < 1:
+        raise BookingError("At least one room must be booked.")
+    check_in, check_out = parse_stay(booking["check_in_date"], booking.get("check_out_date", ""))
+    # Recorded with both dates spelled out, so the row is counted again when the calendar is rebuilt.
+    booking = {**booking, "check_in_date": check_in.isoformat(), "check_out_date": check_out.isoformat()}
+    with file_lock(bookings_path):
+        calendar = _current_calendar(inventory_path, bookings_path)
+        quote = calendar.quote(check_in, check_out, [booking["room_type"]])[0]
+        if quote["available"] < rooms:
+            if not quote["available"]:
+                nights = ", ".join(night.isoformat() for night in quote["full_nights"])
+                raise BookingError(f"No {quote['room_type']} rooms left on {nights}.")
+            raise BookingError(f"Only {quote['available']} {quote['room_type']} rooms are free for the whole stay.")
+        for _ in range(rooms):
+            write_row(bookings_path, booking, list(booking.keys()))
+        with _calendar_lock:
+            # A concurrent reader may already have rebuilt the calendar from the updated file.
+            if _calendar is calendar:
+                calendar.add_bookings([booking["room_type"]] * rooms, [check_in] * rooms, [check_out] * rooms)
+                _calendar_fingerprint = _fingerprint(inventory_path, bookings_path)
+    return quote
@@ -0,0 +1,269 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+from itertools import count
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Words joined by a hyphen or apostrophe are kept as one token, so "wi-fi" and "wifi" match.
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could do does for from had has have how i if in into is it its
+me my no not of on or our so that the their them then there these they this to us was we were what
+when where which who will with would you your
+""".split())
+
+# Longest first. Only applied to words of more than three letters, leaving a stem of at least three.
+_SUFFIXES = (
+    "ational", "ization", "fulness", "ousness", "iveness", "ations", "ation", "ments", "ment",
+    "ingly", "edly", "ings", "ing", "ies", "ied", "ed", "ly", "es", "s",
+)
+
+
+def stem(word: str) -> str:
+    """
+    Light suffix-stripping stemmer for English.
+
+    Maps common inflections to one form ("bookings", "booked" and "booking"
+    to "book", "rates" to "rate"). It is not linguistically exact; it only
+    has to be consistent between indexing and querying, and the typo
+    tolerance covers most of what it misses.
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix in _SUFFIXES:
+        if not word.endswith(suffix) or len(word) - len(suffix) < 3:
+            continue
+        base = word[:-len(suffix)]
+        if suffix in ("ies", "ied"):
+            return base + "y"
+        if suffix == "s" and base.endswith(("s", "u", "i")):
+            return word  # "pass", "bus", "wifi"
+        if suffix == "es" and not base.endswith(("s", "x", "z", "ch", "sh")):
+            return word[:-1]  # "rates" -> "rate"
+        if suffix in ("ing", "ed") and len(base) > 3 and base[-1] == base[-2] and base[-1] not in "lsz":
+            return base[:-1]  # "swimming" -> "swim"
+        return base
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cases, splits into words, drops stopwords and stems what is left."""
+    words = (word.replace("-", "").replace("'", "") for word in _TOKEN_PATTERN.findall(text.lower()))
+    return [stem(word) for word in words if word and word not in STOPWORDS]
+
+
+def _deletes(term: str, max_distance: int) -> Set[str]:
+    """`term` and every string obtained by deleting up to `max_distance` characters from it."""
+    results = {term}
+    frontier = {term}
+    for _ in range(max_distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier if len(word) > 1 for i in range(len(word))}
+        results |= frontier
+    return results
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Damerau-Levenshtein distance (optimal string alignment) between `a` and `b`.
+
+    Returns limit + 1 as soon as the distance is known to exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class _Source:
+    def __init__(self, name: str, paths: Tuple[str, ...], loader: Callable[[], Iterable[Tuple[str, str]]]):
+        self.name = name
+        self.paths = paths
+        self.loader = loader
+        self.fingerprint = None
+        self.doc_ids: List[int] = []
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index with stemming and typo-tolerant matching.
+
+    Documents come from sources: a loader function and the files it reads.
+    Before each search, sources whose files changed (size or modification
+    time) are reindexed; only their documents are removed and added again, so
+    an edit to one file never rebuilds the others.
+
+    Query terms that are not in the vocabulary are matched to the closest
+    vocabulary terms within `max_edit_distance` (1 for terms of up to five
+    letters) using a SymSpell-style dictionary of deletes, and score as the
+    matched term with weight 1 / (1 + distance). Searches are a few
+    dictionary lookups per query term.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, max_edit_distance: int = 2):
+        self.k1 = k1
+        self.b = b
+        self.max_edit_distance = max_edit_distance
+        self._sources: Dict[str, _Source] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}  # term -> {doc_id: term frequency}
+        self._deletes: Dict[str, Set[str]] = {}  # delete variant -> vocabulary terms
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._payloads: Dict[int, str] = {}
+        self._total_length = 0
+        self._next_id = count()
+        self._lock = threading.RLock()
+
+    def add_source(self, name: str, paths: Iterable[str], loader: Callable[[], Iterable[Tuple[str, str]]]):
+        """
+        Registers a source of documents, indexed on the next search or `refresh`.
+
+        Args:
+            name (str): Unique name of the source.
+            paths (Iterable[str]): Files the loader reads; a change to any of them reindexes the
+                source. With no paths, the source is indexed once.
+            loader (Callable): Returns (text, payload) pairs. `text` is indexed and
+                `payload` is what searches return for the document.
+        """
+        with self._lock:
+            self._sources[name] = _Source(name, tuple(paths), loader)
+
+    def _term_distance(self, term: str) -> int:
+        return min(self.max_edit_distance, 1 if len(term) <= 5 else 2)
+
+    def _add_document(self, text: str, payload: str) -> Optional[int]:
+        terms = Counter(tokenize(text))
+        if not terms:
+            return None
+        doc_id = next(self._next_id)
+        self._doc_terms[doc_id] = terms
+        self._payloads[doc_id] = payload
+        self._doc_lengths[doc_id] = sum(terms.values())
+        self._total_length += self._doc_lengths[doc_id]
+        for term, frequency in terms.items():
+            postings = self._postings.setdefault(term, {})
+            if not postings:
+                for variant in _deletes(term, self._term_distance(term)):
+                    self._deletes.setdefault(variant, set()).add(term)
+            postings[doc_id] = frequency
+        return doc_id
+
+    def _remove_document(self, doc_id: int):
+        terms = self._doc_terms.pop(doc_id)
+        del self._payloads[doc_id]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                for variant in _deletes(term, self._term_distance(term)):
+                    variants = self._deletes.get(variant)
+                    if variants is not None:
+                        variants.discard(term)
+                        if not variants:
+                            del self._deletes[variant]
+
+    @staticmethod
+    def _fingerprint(paths: Tuple[str, ...]) -> tuple:
+        fingerprint = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                fingerprint.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                fingerprint.append(None)
+        return tuple(fingerprint)
+
+    def refresh(self) -> List[str]:
+        """
+        Reindexes the sources whose files changed since they were last indexed.
+
+        Returns:
+            List[str]: The names of the reindexed sources.
+        """
+        refreshed = []
+        with self._lock:
+            for source in self._sources.values():
+                fingerprint = self._fingerprint(source.paths)
+                if fingerprint == source.fingerprint:
+                    continue
+                for doc_id in source.doc_ids:
+                    self._remove_document(doc_id)
+                source.doc_ids = []
+                # A source without files is loaded once; one whose files are all gone is emptied.
+                if not source.paths or any(part is not None for part in fingerprint):
+                    documents = source.loader()
+                    source.doc_ids = [
+                        doc_id for doc_id in (self._add_document(text, payload) for text, payload in documents)
+                        if doc_id is not None
+                    ]
+                source.fingerprint = fingerprint
+                refreshed.append(source.name)
+        return refreshed
+
+    def _match(self, term: str) -> List[Tuple[str, float]]:
+        """Vocabulary terms matching a query term, with their weights."""
+        if term in self._postings:
+            return [(term, 1.0)]
+        limit = self._term_distance(term)
+        candidates = set()
+        for variant in _deletes(term, limit):
+            candidates |= self._deletes.get(variant, set())
+        best, matches = limit + 1, []
+        for candidate in candidates:
+            distance = edit_distance(term, candidate, limit)
+            if distance < best:
+                best, matches = distance, [candidate]
+            elif distance == best:
+                matches.append(candidate)
+        return [(match, 1.0 / (1 + best)) for match in matches] if best <= limit else []
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[float, str]]:
+        """
+        Ranks the indexed documents against `query` with BM25.
+
+        Returns:
+            List[Tuple[float, str]]: Up to `k` (score, payload) pairs with distinct
+                payloads, best first. Documents sharing no term with the query are left out.
+        """
+        self.refresh()
+        with self._lock:
+            doc_count = len(self._doc_terms)
+            if not doc_count:
+                return []
+            average_length = self._total_length / doc_count
+            scores: Dict[int, float] = {}
+            for query_term in set(tokenize(query)):
+                for term, weight in self._match(query_term):
+                    postings = self._postings[term]
+                    idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, frequency in postings.items():
+                        length = self._doc_lengths[doc_id]
+                        norm = frequency * (self.k1 + 1) / (
+                            frequency + self.k1 * (1 - self.b + self.b * length / average_length)
+                        )
+                        scores[doc_id] = scores.get(doc_id, 0.0) + weight * idf * norm
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            results, seen = [], set()
+            for doc_id, score in ranked:
+                payload = self._payloads[doc_id]
+                if payload in seen:
+                    continue
+                seen.add(payload)
+                results.append((score, payload))
+                if len(results) == k:
+                    break
+            return results
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+
+def _serialize(generations: Sequence[Generation]) -> str:
+    return json.dumps([
+        {"message": message_to_dict(g.message)} if isinstance(g, ChatGeneration) else {"text": g.text}
+        for g in generations
+    ])
+
+
+def _deserialize(payload: str) -> list[Generation]:
+    generations = []
+    for item in json.loads(payload):
+        if "message" in item:
+            generations.append(ChatGeneration(message=messages_from_dict([item["message"]])[0]))
+        else:
+            generations.append(Generation(text=item["text"]))
+    return generations
+
+
+class LLMResponseCache:
+    """
+    Two-tier exact-match store for LLM responses.
+
+    An in-memory LRU of live generation objects sits in front of a SQLite file
+    of serialized ones, so hot prompts are served without any decoding and the
+    cache survives restarts. Entries expire after the TTL of the role that
+    wrote them. Hit and miss counters are kept per role.
+    """
+
+    def __init__(self, path: str, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._memory = OrderedDict()  # key -> (expires_at, generations)
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0})
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, role TEXT, expires_at REAL, payload TEXT)"
+        )
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+        self._conn.commit()
+
+    def get(self, key: str, role: str) -> Optional[list[Generation]]:
+        """Returns the cached generations for `key`, or None on a miss or expiry."""
+        now = time.time()
+        with self._lock:
+            stats = self._stats[role]
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._memory.move_to_end(key)
+                    stats["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT expires_at, payload FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[0] < now:
+                stats["misses"] += 1
+                return None
+
+            generations = _deserialize(row[1])
+            self._remember(key, row[0], generations)
+            stats["disk_hits"] += 1
+            return generations
+
+    def set(self, key: str, role: str, ttl: float, generations: Sequence[Generation]):
+        """Stores `generations` in both tiers for `ttl` seconds."""
+        expires_at = time.time() + ttl
+        payload = _serialize(generations)
+        with self._lock:
+            self._remember(key, expires_at, list(generations))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, role, expires_at, payload) VALUES (?, ?, ?, ?)",
+                (key, role, expires_at, payload),
+            )
+            self._conn.commit()
+            self._stats[role]["writes"] += 1
+
+    def clear(self, role: str = None):
+        with self._lock:
+            if role is None:
+                self._memory.clear()
+                self._conn.execute("DELETE FROM llm_cache")
+            else:
+                # Memory entries don't record their role, so drop the whole LRU.
+                self._memory.clear()
+                self._conn.execute("DELETE FROM llm_cache WHERE role = ?", (role,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Returns per-role counters plus hit rates, and totals under "all"."""
+        with self._lock:
+            report = {role: dict(counters) for role, counters in self._stats.items()}
+        totals = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+        for counters in report.values():
+            for name in totals:
+                totals[name] += counters[name]
+        report["all"] = totals
+        for counters in report.values():
+            lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+            counters["hit_rate"] = (counters["memory_hits"] + counters["disk_hits"]) / lookups if lookups else 0.0
+        return report
+
+    def _remember(self, key: str, expires_at: float, generations: list[Generation]):
+        self._memory[key] = (expires_at, generations)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+class RoleCache(BaseCache):
+    """
+    LangChain cache adapter that stores one role's responses in a shared
+    LLMResponseCache with that role's TTL.
+
+    LangChain passes the serialized prompt and an `llm_string` that already
+    covers the model name, its parameters and any bound tools. The two are
+    hashed together to form the key.
+    """
+
+    def __init__(self, store: LLMResponseCache, role: str, ttl: float):
+        self.store = store
+        self.role = role
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        return self.store.get(self._key(prompt, llm_string), self.role)
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        self.store.set(self._key(prompt, llm_string), self.role, self.ttl, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear(self.role)
@@ -0,0 +1,66 @@
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from pydantic import ConfigDict
+
+from utils.metrics import metrics, record_llm_usage
+from utils.rate_limiter import ProviderLimiter, remaining_time
+
+
+class ManagedChatModel(BaseChatModel):
+    """
+    Wraps a shared provider chat model for a given role.
+
+    Every call goes through the provider's ProviderLimiter, so all roles and
+    agents that use the same provider share one rate budget and concurrency cap.
+    Tool binding is delegated to the wrapped model and the resulting kwargs are
+    re-bound on this wrapper, so ReAct agents still go through the limiter.
+    Each call's latency and token usage are recorded per role and model.
+    Inside a turn (see rate_limiter.call_deadline) each request's timeout is
+    capped by the time left, so no call outlives the turn's deadline.
+    """
+
+    client: BaseChatModel
+    limiter: ProviderLimiter
+    role: str = "default"
+    request_timeout: Optional[float] = None
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"managed-{self.client._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"role": self.role, **self.client._identifying_params}
+
+    @property
+    def model_label(self) -> str:
+        return getattr(self.client, "model_name", None) or getattr(self.client, "model", None) or self.client._llm_type
+
+    def bind_tools(self, tools, **kwargs):
+        bound = self.client.bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)
+
+    def _timeout_kwargs(self) -> dict:
+        remaining = remaining_time()
+        if remaining is None:
+            return {}
+        return {"timeout": remaining if self.request_timeout is None else min(remaining, self.request_timeout)}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with metrics.timer("hospitalitybot_llm_duration_seconds", role=self.role, model=self.model_label):
+            result = self.limiter.call(lambda: self.client._generate(messages, stop=stop, **self._timeout_kwargs(), **kwargs))
+        for generation in result.generations:
+            record_llm_usage(self.role, self.model_label, getattr(generation.message, "usage_metadata", None))
+        return result
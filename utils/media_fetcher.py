@@ -0,0 +1,90 @@
+import logging
+import mimetypes
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import (
+    MEDIA_MAX_BYTES,
+    MEDIA_CONNECT_TIMEOUT_S,
+    MEDIA_READ_TIMEOUT_S,
+    MEDIA_DOWNLOAD_TIMEOUT_S,
+    MEDIA_POOL_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MediaFetchError(Exception):
+    """Raised when a media file cannot be downloaded within the configured limits."""
+
+
+class MediaFetcher:
+    """
+    Downloads media attachments (e.g. voice notes) over a pooled keep-alive session.
+
+    The body is streamed in chunks straight into a single bytearray, with a hard
+    byte cap and connect/read/total timeouts. The returned buffer can be handed
+    to the transcriber as-is, without further copies.
+    """
+
+    def __init__(
+        self,
+        auth: tuple = None,
+        max_bytes: int = MEDIA_MAX_BYTES,
+        connect_timeout: float = MEDIA_CONNECT_TIMEOUT_S,
+        read_timeout: float = MEDIA_READ_TIMEOUT_S,
+        download_timeout: float = MEDIA_DOWNLOAD_TIMEOUT_S,
+        pool_size: int = MEDIA_POOL_SIZE,
+        chunk_size: int = 64 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.timeout = (connect_timeout, read_timeout)
+        self.download_timeout = download_timeout
+        self.chunk_size = chunk_size
+
+        self.session = requests.Session()
+        self.session.auth = auth
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def fetch(self, url: str) -> tuple[bytearray, str]:
+        """
+        Downloads a media file.
+
+        Args:
+            url (str): The media URL (e.g. Twilio's MediaUrl0).
+
+        Raises:
+            MediaFetchError: If the request fails, times out or exceeds the byte cap.
+
+        Returns:
+            tuple[bytearray, str]: The media bytes and a file extension guessed
+            from the Content-Type (defaults to ".wav").
+        """
+        started = time.monotonic()
+        try:
+            with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+
+                content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+                extension = mimetypes.guess_extension(content_type) or ".wav"
+
+                declared_length = int(response.headers.get("Content-Length") or 0)
+                if declared_length > self.max_bytes:
+                    raise MediaFetchError(f"Media is {declared_length} bytes, limit is {self.max_bytes}.")
+
+                buffer = bytearray()
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    buffer += chunk
+                    if len(buffer) > self.max_bytes:
+                        raise MediaFetchError(f"Media exceeds the {self.max_bytes} byte limit.")
+                    if time.monotonic() - started > self.download_timeout:
+                        raise MediaFetchError(f"Media download took longer than {self.download_timeout}s.")
+        except requests.RequestException as e:
+            raise MediaFetchError(f"Could not download media from {url}: {e}") from e
+
+        logger.info(f"Fetched {len(buffer)} bytes of {content_type or 'unknown type'} in {time.monotonic() - started:.3f}s")
+        return buffer, extension
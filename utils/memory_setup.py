@@ -3,8 +3,16 @@ from langchain_community.vectorstores import FAISS
 from langchain_community.docstore import InMemoryDocstore
 from langchain.embeddings.base import Embeddings
 import faiss
+from typing import Optional
 
-def create_long_term_memory(embedding_model: Embeddings):
+def get_embedding_size(embedding_model: Embeddings) -> int:
+    """Returns the vector size of an embedding model by embedding a dummy text."""
+    try:
+        return len(embedding_model.embed_query("test"))
+    except Exception as e:
+        raise ValueError(f"Could not determine embedding size from the provided model. Error: {e}")
+
+def create_long_term_memory(embedding_model: Embeddings, embedding_size: Optional[int] = None):
     """
     Creates a long-term memory instance using an in-memory FAISS vector store.
 
@@ -15,15 +23,15 @@ def create_long_term_memory(embedding_model: Embeddings):
     Args:
         embedding_model: An initialized LangChain embedding model instance 
                          (e.g., OpenAIEmbeddings, GoogleGenerativeAIEmbeddings).
+        embedding_size: The model's vector size, if already known. Pass it when creating
+                        memories for many sessions with a shared model, to skip the probe call.
 
     Returns:
         An instance of VectorStoreRetrieverMemory.
     """
-    # Determine the embedding dimension by embedding a dummy text
-    try:
-        embedding_size = len(embedding_model.embed_query("test"))
-    except Exception as e:
-        raise ValueError(f"Could not determine embedding size from the provided model. Error: {e}")
+    # Probe the embedding dimension unless the caller already knows it
+    if embedding_size is None:
+        embedding_size = get_embedding_size(embedding_model)
 
     # Initialize an in-memory FAISS index
     index = faiss.IndexFlatL2(embedding_size)
@@ -0,0 +1,284 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import METRICS_ENABLED
+
+# Upper bounds in seconds, from fast tool lookups to slow multi-step agent runs.
+DEFAULT_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0,
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram for one label set.
+
+    Recording is a bisect and a few increments under a lock, so it is cheap
+    enough for every node, tool and LLM call. Quantiles are estimated from the
+    buckets by linear interpolation, as Prometheus' histogram_quantile does.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            counts, observed_max = list(self.counts), self.max
+        return bucket_quantile(self.buckets, counts, q, observed_max)
+
+
+def bucket_quantile(buckets: Tuple[float, ...], counts: List[int], q: float, observed_max: float) -> float:
+    """
+    Estimates the q-quantile (0..1) from bucket counts.
+
+    `counts` has one entry per upper bound in `buckets` plus a final +Inf slot.
+    Values are interpolated linearly inside the bucket holding the rank and
+    capped at the largest value observed.
+    """
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    for index, bucket_count in enumerate(counts):
+        if cumulative + bucket_count >= rank and bucket_count:
+            lower = buckets[index - 1] if index > 0 else 0.0
+            upper = buckets[index] if index < len(buckets) else observed_max
+            estimate = lower + (upper - lower) * (rank - cumulative) / bucket_count
+            return min(estimate, observed_max)
+        cumulative += bucket_count
+    return observed_max
+
+
+class MetricsRegistry:
+    """
+    Process-wide histograms and counters, rendered in the Prometheus text format.
+
+    Series are created on first use. Collectors registered with
+    `register_collector` are called at render time to report gauges kept
+    elsewhere (e.g. cache sizes and hit rates).
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, dict, float]]]] = []
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels):
+        """Records one observation in the histogram `name`."""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        series = self._histograms.get(name, {}).get(key)
+        if series is None:
+            with self._lock:
+                series = self._histograms.setdefault(name, {}).setdefault(key, Histogram())
+        series.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Adds `amount` to the counter `name`."""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Times the enclosed block into `name`, labelled status="error" if it raises."""
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, status=status, **labels)
+
+    def timed(self, name: str, **labels) -> Callable:
+        """Decorator form of `timer`."""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, dict, float]]]):
+        """Registers a callable returning (name, labels, value) gauge samples."""
+        self._collectors.append(collector)
+
+    def _collect_gauges(self) -> Dict[str, List[Tuple[LabelKey, float]]]:
+        gauges = {}
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                gauges.setdefault(name, []).append((_label_key(labels), value))
+        return gauges
+
+    def render_prometheus(self) -> str:
+        """Returns all series in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+        lines = []
+
+        for name, series in sorted(histograms.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in sorted(series.items()):
+                with histogram._lock:
+                    counts, total, value_sum = list(histogram.counts), histogram.count, histogram.sum
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', repr(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {total}")
+                lines.append(f"{name}_sum{_format_labels(key)} {value_sum}")
+                lines.append(f"{name}_count{_format_labels(key)} {total}")
+
+        for name, series in sorted(counters.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+        for name, samples in sorted(self._collect_gauges().items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            for key, value in samples:
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self, quantiles: Tuple[float, ...] = (0.5, 0.99)) -> dict:
+        """
+        Returns a JSON-friendly breakdown of every series.
+
+        Histograms report count, mean, max and the requested quantiles (as
+        "p50", "p99", ...); counters and gauges report their values.
+        """
+        with self._lock:
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+
+        def label_str(key: LabelKey) -> str:
+            return ",".join(f"{k}={v}" for k, v in key) or "all"
+
+        report = {"histograms": {}, "counters": {}, "gauges": {}}
+        for name, series in histograms.items():
+            report["histograms"][name] = {
+                label_str(key): {
+                    "count": histogram.count,
+                    "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                    "max": histogram.max,
+                    **{f"p{round(q * 100):g}": histogram.quantile(q) for q in quantiles},
+                }
+                for key, histogram in series.items()
+            }
+        for name, series in counters.items():
+            report["counters"][name] = {label_str(key): value for key, value in series.items()}
+        for name, samples in self._collect_gauges().items():
+            report["gauges"][name] = {label_str(key): value for key, value in samples}
+        return report
+
+    def total(self, name: str, **labels) -> float:
+        """
+        Sums a counter, or counts a histogram's observations, over every series
+        whose labels include `labels`.
+        """
+        wanted = set(_label_key(labels))
+        with self._lock:
+            counters = dict(self._counters.get(name, {}))
+            histograms = dict(self._histograms.get(name, {}))
+        total = sum(value for key, value in counters.items() if wanted <= set(key))
+        total += sum(histogram.count for key, histogram in histograms.items() if wanted <= set(key))
+        return total
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _create_registry() -> MetricsRegistry:
+    registry = MetricsRegistry(enabled=METRICS_ENABLED)
+    registry.describe("hospitalitybot_turn_duration_seconds", "End-to-end time to answer one incoming message.")
+    registry.describe("hospitalitybot_node_duration_seconds", "Time spent in each graph node.")
+    registry.describe("hospitalitybot_tool_duration_seconds", "Time spent in each tool call.")
+    registry.describe("hospitalitybot_llm_duration_seconds", "Time per LLM call, including rate limiting and retries.")
+    registry.describe("hospitalitybot_llm_tokens_total", "LLM tokens by role, model and direction (input/output).")
+    registry.describe("hospitalitybot_agent_budget_exhausted_total", "Agent runs cut short, by agent and reason (max_steps, max_tool_calls, timeout, deadline).")
+    registry.describe("hospitalitybot_speculation_total", "Speculative agent runs by agent and outcome (hit, miss, blocked, queued, unused, error).")
+    registry.describe("hospitalitybot_speculation_wasted_seconds_total", "Agent time spent on speculative runs whose result was not used.")
+    registry.describe("hospitalitybot_stt_duration_seconds", "Speech-to-text transcription time.")
+    registry.describe("hospitalitybot_tts_duration_seconds", "Text-to-speech synthesis time.")
+    registry.describe("hospitalitybot_tts_first_chunk_seconds", "Time until the first synthesized audio chunk.")
+    return registry
+
+
+# The shared registry every component records into.
+metrics = _create_registry()
+
+
+def instrument_node(name: str, func: Callable) -> Callable:
+    """Wraps a graph node so its run time is recorded under node=`name`."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with metrics.timer("hospitalitybot_node_duration_seconds", node=name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def record_llm_usage(role: str, model: str, usage: Optional[dict]):
+    """Adds the input and output token counts of one LLM call to the token counters."""
+    if not usage:
+        return
+    for direction in ("input", "output"):
+        tokens = usage.get(f"{direction}_tokens")
+        if tokens:
+            metrics.inc("hospitalitybot_llm_tokens_total", tokens, role=role, model=model, direction=direction)
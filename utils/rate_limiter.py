@@ -0,0 +1,211 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_ERROR_NAMES = ("RateLimit", "ResourceExhausted", "ServiceUnavailable", "InternalServerError", "Overloaded")
+
+# Set by the code running a cancellable unit of work (an agent run); LLM calls made within it check it.
+_cancel_event: ContextVar[Optional[threading.Event]] = ContextVar("llm_cancel_event", default=None)
+# time.monotonic() value by which LLM calls in this context must finish (the turn's deadline).
+_call_deadline: ContextVar[Optional[float]] = ContextVar("llm_call_deadline", default=None)
+
+
+class CallCancelled(Exception):
+    """Raised instead of starting or retrying an LLM call whose run has been cancelled."""
+
+
+class DeadlineExceeded(CallCancelled):
+    """Raised instead of starting, waiting for or retrying an LLM call once its deadline has passed."""
+
+
+@contextmanager
+def cancellable(event: threading.Event):
+    """
+    Makes LLM calls in this context stop waiting or retrying once `event` is set.
+
+    A call already in flight runs to completion; the next attempt, and any wait
+    for a rate or concurrency slot before it, raises CallCancelled instead.
+    """
+    token = _cancel_event.set(event)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+
+@contextmanager
+def call_deadline(deadline: Optional[float]):
+    """
+    Bounds LLM calls in this context by `deadline`, a time.monotonic() value.
+
+    No attempt starts, waits for a rate or concurrency slot, or is retried past
+    the deadline (DeadlineExceeded is raised instead), and each request's
+    timeout is capped by the time remaining (see `remaining_time`). A nested
+    deadline never extends an outer one. None leaves the calls unbounded.
+    """
+    current = _call_deadline.get()
+    if deadline is None or (current is not None and current <= deadline):
+        deadline = current
+    token = _call_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _call_deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current call deadline, or None if there is none."""
+    deadline = _call_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _raise_if_cancelled(name: str):
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise CallCancelled(f"{name} call cancelled")
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"{name} call deadline exceeded")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `rate` tokens are added per second up to `capacity`.
+    A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """
+        Blocks until a token is available, then consumes it.
+
+        Returns False without waiting if no token would be available before
+        `deadline` (a time.monotonic() value).
+        """
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait >= deadline:
+                return False
+            # Sleep outside the lock so other threads can refill and check.
+            time.sleep(wait)
+
+
+def get_status_code(error: Exception) -> int | None:
+    """Extracts an HTTP status code from provider SDK exceptions, if present."""
+    for candidate in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "code"):
+            value = getattr(candidate, attr, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Returns True for rate-limit (429) and server-side (5xx) failures."""
+    status = get_status_code(error)
+    if status is not None:
+        return status == 429 or 500 <= status < 600
+    name = type(error).__name__
+    return any(marker in name for marker in RETRYABLE_ERROR_NAMES)
+
+
+def get_retry_after(error: Exception) -> float | None:
+    """Reads a Retry-After header (in seconds) from the error's response, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ProviderLimiter:
+    """
+    Process-wide guard for one LLM provider: a token bucket for request rate,
+    a semaphore for concurrent in-flight calls, and jittered exponential
+    backoff for retryable failures.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_second: float,
+        burst: float,
+        max_concurrency: int,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+    ):
+        self.name = name
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.semaphore = threading.BoundedSemaphore(max(max_concurrency, 1))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """
+        Runs `fn` under the rate and concurrency limits, retrying on 429/5xx.
+
+        Raises:
+            CallCancelled: If the surrounding run was cancelled (see `cancellable`) before an attempt.
+            DeadlineExceeded: If the call deadline (see `call_deadline`) passes before an attempt
+                or while waiting for a rate or concurrency slot.
+            Exception: The last error once retries are exhausted, a retry would end past the
+                deadline, or any non-retryable error.
+        """
+        attempt = 0
+        while True:
+            _raise_if_cancelled(self.name)
+            deadline = _call_deadline.get()
+            if not self.bucket.acquire(deadline):
+                raise DeadlineExceeded(f"{self.name} call deadline exceeded waiting for a rate slot")
+            remaining = remaining_time()
+            if not self.semaphore.acquire(timeout=None if remaining is None else max(remaining, 0)):
+                raise DeadlineExceeded(f"{self.name} call deadline exceeded waiting for a concurrency slot")
+            try:
+                _raise_if_cancelled(self.name)
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                error = e
+            finally:
+                self.semaphore.release()
+
+            # Full jitter spreads retries out so bursts don't retry in lockstep.
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+            retry_after = get_retry_after(error)
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.max_delay))
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise error
+            attempt += 1
+            logger.warning(f"{self.name} call failed ({error}); retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            event = _cancel_event.get()
+            if event is not None:
+                event.wait(delay)  # wakes up early if the run is cancelled
+            else:
+                time.sleep(delay)
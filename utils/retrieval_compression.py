@@ -0,0 +1,117 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+from utils.lexical_index import tokenize
+from workflows.context_builder import count_tokens, truncate_to_tokens
+
+# PDF extraction leaves "(cid:10)" style glyph references in the text; they carry no meaning.
+PDF_ARTIFACT_PATTERN = re.compile(r"\(cid:\d+\)")
+# Sentence ends, and line breaks, which separate list items and headings in the extracted documents.
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+# A sentence is a near duplicate of a kept one when at least this share of its
+# word trigrams occur in it, e.g. the tail of a sentence cut at a chunk overlap.
+SHINGLE_SIZE = 3
+NEAR_DUPLICATE_SHARE = 0.8
+
+
+def split_sentences(text: str) -> List[str]:
+    """Splits retrieved text into sentences and lines, dropping PDF artifacts and blank pieces."""
+    text = PDF_ARTIFACT_PATTERN.sub(" ", text)
+    sentences = (" ".join(piece.split()) for piece in _SENTENCE_BOUNDARY.split(text))
+    return [sentence for sentence in sentences if sentence]
+
+
+def _unique_sentences(texts: Iterable[str]) -> List[Tuple[int, str, List[str]]]:
+    """
+    (rank, sentence, terms) for every sentence of the retrieved texts, in order.
+
+    A sentence whose terms were already seen in the same order is dropped,
+    and so is one that shares most of its word trigrams with a single kept
+    sentence. That removes text repeated across documents, whatever its
+    whitespace or casing, and the overlap between neighbouring chunks, where
+    the second chunk usually starts mid-sentence. Sentences shorter than a
+    trigram are only dropped when repeated exactly.
+    """
+    seen, sentences = set(), []
+    owners: Dict[Tuple[str, ...], Set[int]] = {}
+    for rank, text in enumerate(texts):
+        for sentence in split_sentences(text):
+            terms = tokenize(sentence)
+            key = " ".join(terms) or sentence.lower()
+            if key in seen:
+                continue
+            shingles = {tuple(terms[i:i + SHINGLE_SIZE]) for i in range(len(terms) - SHINGLE_SIZE + 1)}
+            shared = Counter(owner for shingle in shingles for owner in owners.get(shingle, ()))
+            if shared and max(shared.values()) >= NEAR_DUPLICATE_SHARE * len(shingles):
+                continue
+            seen.add(key)
+            for shingle in shingles:
+                owners.setdefault(shingle, set()).add(len(sentences))
+            sentences.append((rank, sentence, terms))
+    return sentences
+
+
+def compress_results(query: str, texts: Iterable[str], max_tokens: int) -> str:
+    """
+    Turns retrieved chunks into a de-duplicated tool result of at most `max_tokens`.
+
+    Repeated and overlapping sentences are dropped first. If the rest fits
+    the budget it is returned whole. Otherwise the sentences sharing the most
+    (idf-weighted) terms with the query are kept first, earlier-ranked chunks winning ties;
+    the remaining budget goes to the sentences around them and then to the
+    best chunks' other sentences. The kept sentences are returned in their
+    original order.
+
+    Args:
+        query (str): The search query.
+        texts (Iterable[str]): Retrieved chunks, best first.
+        max_tokens (int): Token budget for the whole result.
+
+    Returns:
+        str: The selected sentences, one per line.
+    """
+    sentences = _unique_sentences(texts)
+    if sum(count_tokens(sentence) + 1 for _, sentence, _ in sentences) <= max_tokens:
+        return "\n".join(sentence for _, sentence, _ in sentences)
+
+    query_terms = set(tokenize(query))
+    document_frequency = {
+        term: sum(1 for _, _, terms in sentences if term in terms) for term in query_terms
+    }
+    scores = [
+        sum(math.log(1 + len(sentences) / document_frequency[term]) for term in query_terms.intersection(terms))
+        for _, _, terms in sentences
+    ]
+    matching = [position for position in range(len(sentences)) if scores[position] > 0]
+    # Best score first; ties go to the better-ranked chunk, then to the earlier sentence.
+    matching.sort(key=lambda position: (-scores[position], sentences[position][0], position))
+
+    selected, used = set(), 0
+
+    def select(candidates: List[int]):
+        nonlocal used
+        for position in candidates:
+            cost = count_tokens(sentences[position][1]) + 1
+            if position not in selected and used + cost <= max_tokens:
+                selected.add(position)
+                used += cost
+
+    select(matching)
+    # Spend what is left on context: the lines around the matches (a heading's list items follow
+    # it, so later lines win ties), then the rest of the chunks in the retriever's order.
+    anchors = sorted(selected)
+
+    def context_distance(position: int) -> Tuple[int, int, int, int]:
+        rank = sentences[position][0]
+        distances = [abs(position - anchor) * 2 + (anchor > position) for anchor in anchors
+                     if sentences[anchor][0] == rank]
+        return (0, min(distances), rank, position) if distances else (1, 0, rank, position)
+
+    select(sorted(range(len(sentences)), key=context_distance))
+    if not selected and sentences:
+        # Even the best sentence is over budget on its own; return it cut to size.
+        best = matching[0] if matching else 0
+        return truncate_to_tokens(sentences[best][1], max_tokens)
+    return "\n".join(sentences[position][1] for position in sorted(selected))
@@ -0,0 +1,178 @@
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_MILES = 3958.7613
+
+
+def haversine_miles(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Great-circle distances in miles from one point to arrays of points, all in degrees."""
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeoGridIndex:
+    """
+    Points with a category, bucketed into a latitude/longitude grid.
+
+    Points are sorted by grid cell, so the cells covering a query circle are
+    a few contiguous slices found with binary search, one per grid row. Only
+    the points in those cells get their haversine distance computed and
+    their category checked, both as numpy array operations, which keeps
+    queries in the sub-millisecond range for city catalogs of tens of
+    thousands of points.
+
+    Query results are positions into the arrays the index was built from,
+    with their distances, nearest first.
+    """
+
+    def __init__(
+        self,
+        latitudes: Iterable[float],
+        longitudes: Iterable[float],
+        categories: Iterable[str],
+        cell_deg: float = 0.02,
+    ):
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        category_names = [str(category).strip().lower() for category in categories]
+        self.cell_deg = cell_deg
+        self._rows = int(math.ceil(180 / cell_deg))
+        self._columns = int(math.ceil(360 / cell_deg))
+        self._category_ids: Dict[str, int] = {}
+        category_ids = np.array(
+            [self._category_ids.setdefault(name, len(self._category_ids)) for name in category_names],
+            dtype=np.int32,
+        )
+        keys = self._row(latitudes) * self._columns + self._column(longitudes)
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._positions = order
+        self._latitudes = latitudes[order]
+        self._longitudes = longitudes[order]
+        self._categories = category_ids[order]
+        self._category_counts = np.bincount(category_ids, minlength=len(self._category_ids))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _row(self, latitudes) -> np.ndarray:
+        rows = np.floor((np.asarray(latitudes, dtype=float) + 90) / self.cell_deg).astype(np.int64)
+        return np.clip(rows, 0, self._rows - 1)
+
+    def _column(self, longitudes) -> np.ndarray:
+        columns = np.floor((np.asarray(longitudes, dtype=float) + 180) / self.cell_deg).astype(np.int64)
+        return columns % self._columns
+
+    def _cell_ranges(self, latitude: float, longitude: float, radius: float) -> List[Tuple[int, int]]:
+        """(first key, last key) ranges of the grid cells that can hold points within `radius` miles."""
+        angle = radius / EARTH_RADIUS_MILES
+        delta_lat = math.degrees(angle)
+        first_row, last_row = (int(row) for row in self._row([latitude - delta_lat, latitude + delta_lat]))
+        cos_lat = math.cos(math.radians(latitude))
+        if latitude + delta_lat >= 90 or latitude - delta_lat <= -90 or math.sin(angle) >= cos_lat:
+            spans = [(0, self._columns - 1)]  # the circle reaches a pole: every longitude
+        else:
+            delta_lon = math.degrees(math.asin(math.sin(angle) / cos_lat))
+            first = int(math.floor((longitude - delta_lon + 180) / self.cell_deg))
+            last = int(math.floor((longitude + delta_lon + 180) / self.cell_deg))
+            if last - first + 1 >= self._columns:
+                spans = [(0, self._columns - 1)]
+            else:
+                first, last = first % self._columns, last % self._columns
+                # Across the antimeridian, the columns wrap around into two spans.
+                spans = [(first, last)] if first <= last else [(first, self._columns - 1), (0, last)]
+        return [
+            (row * self._columns + first, row * self._columns + last)
+            for row in range(first_row, last_row + 1)
+            for first, last in spans
+        ]
+
+    def _wanted_ids(self, categories: Iterable[str]) -> List[int]:
+        return [self._category_ids[name] for name in {str(c).strip().lower() for c in categories}
+                if name in self._category_ids]
+
+    def _category_mask(self, categories: Optional[Iterable[str]], candidates: np.ndarray) -> np.ndarray:
+        return np.isin(self._categories[candidates], self._wanted_ids(categories))
+
+    def within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius: float,
+        categories: Optional[Iterable[str]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds every point within `radius` miles of a location.
+
+        Args:
+            latitude (float): Latitude of the location, in degrees.
+            longitude (float): Longitude of the location, in degrees.
+            radius (float): Search radius in miles.
+            categories (Iterable[str], optional): Keep only points in these categories (case-insensitive).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Positions of the points in the input arrays and their
+                distances in miles, nearest first.
+        """
+        if not len(self) or radius < 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        ranges = np.array(self._cell_ranges(latitude, longitude, radius), dtype=np.int64)
+        starts = np.searchsorted(self._keys, ranges[:, 0], side="left")
+        ends = np.searchsorted(self._keys, ranges[:, 1], side="right")
+        candidates = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends) if end > start]
+                                    or [np.empty(0, dtype=np.int64)])
+        if categories is not None:
+            candidates = candidates[self._category_mask(categories, candidates)]
+        distances = haversine_miles(latitude, longitude, self._latitudes[candidates], self._longitudes[candidates])
+        inside = distances <= radius
+        candidates, distances = candidates[inside], distances[inside]
+        nearest_first = np.argsort(distances, kind="stable")
+        return self._positions[candidates[nearest_first]], distances[nearest_first]
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        categories: Optional[Iterable[str]] = None,
+        max_radius: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the `k` points nearest to a location.
+
+        Searches a circle of one grid cell first and doubles its radius until it
+        holds `k` matching points, so dense areas only look at a few cells.
+        `k` is capped at the number of points in the wanted categories, so
+        rare or unknown categories don't widen the search to the whole globe.
+
+        Args:
+            latitude (float): Latitude of the location, in degrees.
+            longitude (float): Longitude of the location, in degrees.
+            k (int): Number of points to return.
+            categories (Iterable[str], optional): Keep only points in these categories (case-insensitive).
+            max_radius (float, optional): Ignore points farther than this many miles.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Positions of the points in the input arrays and their
+                distances in miles, nearest first.
+        """
+        if categories is None:
+            matching = len(self)
+        else:
+            categories = list(categories)
+            matching = int(self._category_counts[self._wanted_ids(categories)].sum())
+        k = min(k, matching)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        half_circumference = math.pi * EARTH_RADIUS_MILES
+        limit = half_circumference if max_radius is None else min(max_radius, half_circumference)
+        radius = min(limit, math.radians(self.cell_deg) * EARTH_RADIUS_MILES)
+        while True:
+            positions, distances = self.within(latitude, longitude, radius, categories)
+            if len(positions) >= k or radius >= limit:
+                return positions[:k], distances[:k]
+            radius = min(limit, radius * 2)
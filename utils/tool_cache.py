@@ -0,0 +1,237 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+from langchain.tools import BaseTool
+
+from utils.metrics import metrics
+
+CACHE_METADATA_KEY = "cache"
+READ_ONLY_METADATA_KEY = "read_only"
+# Relative data file paths are resolved against the project root, not the working directory.
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def cacheable(
+    ttl_s: float = 300,
+    max_entries: int = 256,
+    data_files: Iterable[str] = (),
+    case_insensitive: bool = False,
+    skip_when: Optional[Callable[[dict], bool]] = None,
+):
+    """
+    Declares a tool's results as cacheable.
+
+    Apply it on top of `@tool`. The declaration is stored in the tool's metadata
+    and picked up by `load_tools_from_directory`, which wraps the tool with a
+    ToolResultCache. Only use it on read-only tools whose result depends on
+    nothing but their arguments and the listed data files; tools that write
+    (bookings, orders) must never be declared cacheable.
+
+    Args:
+        ttl_s (float): How long a result stays valid, in seconds.
+        max_entries (int): Maximum number of distinct argument sets kept.
+        data_files (Iterable[str]): Files the result is derived from, relative to
+            the project root. Any change to their size or modification time drops
+            the tool's cached results.
+        case_insensitive (bool): Whether string arguments are compared
+            case-insensitively. Only set it if the tool itself ignores case.
+        skip_when (Callable[[dict], bool], optional): Called with the bound
+            arguments (defaults applied); when it returns True the call bypasses
+            the cache. For arguments whose meaning changes over time, such as a
+            default of "now".
+
+    Returns:
+        Callable: A decorator that returns the same tool, annotated.
+    """
+    policy = {
+        "ttl_s": ttl_s,
+        "max_entries": max_entries,
+        "data_files": tuple(os.path.join(PROJECT_ROOT, path) for path in data_files),
+        "case_insensitive": case_insensitive,
+        "skip_when": skip_when,
+    }
+
+    def decorator(tool: BaseTool) -> BaseTool:
+        tool.metadata = {**(tool.metadata or {}), CACHE_METADATA_KEY: policy}
+        return tool
+
+    return decorator
+
+
+def read_only(tool: BaseTool) -> BaseTool:
+    """
+    Declares that a tool has no side effects, without caching its results.
+
+    Apply it on top of `@tool`. Read-only tools, and tools declared
+    @cacheable, may be called by speculative agent runs.
+    """
+    tool.metadata = {**(tool.metadata or {}), READ_ONLY_METADATA_KEY: True}
+    return tool
+
+
+def is_read_only(tool: BaseTool) -> bool:
+    """Whether a tool is declared @read_only or @cacheable."""
+    metadata = tool.metadata or {}
+    return bool(metadata.get(READ_ONLY_METADATA_KEY)) or CACHE_METADATA_KEY in metadata
+
+
+def _normalize(value, case_insensitive: bool):
+    """Maps equivalent argument values to the same hashable key."""
+    if isinstance(value, str):
+        # Whitespace is kept: the tools compare strings exactly, so " Paris" and "Paris" can differ.
+        return value.casefold() if case_insensitive else value
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _normalize(v, case_insensitive)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_normalize(v, case_insensitive) for v in value]
+        # Collections are used as filters (e.g. a list of interests), so order does not matter.
+        try:
+            return tuple(sorted(set(items)))
+        except TypeError:
+            return tuple(items)
+    return repr(value)
+
+
+class ToolResultCache:
+    """
+    TTL and size bounded LRU cache for one tool's results.
+
+    Keys are the tool's bound arguments after normalization (optionally
+    case-folded, collections sorted, numbers as floats).
+    The cache is cleared whenever one of the tool's data files changes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl_s: float,
+        max_entries: int,
+        data_files: Iterable[str] = (),
+        case_insensitive: bool = False,
+        skip_when: Optional[Callable[[dict], bool]] = None,
+    ):
+        self.name = name
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.data_files = tuple(data_files)
+        self.case_insensitive = case_insensitive
+        self.skip_when = skip_when
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._fingerprint = self._data_fingerprint()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _data_fingerprint(self) -> tuple:
+        fingerprint = []
+        for path in self.data_files:
+            try:
+                stat = os.stat(path)
+                fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                fingerprint.append((path, None, None))
+        return tuple(fingerprint)
+
+    def wrap(self, func: Callable) -> Callable:
+        """Returns `func` with its results served from this cache."""
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def cached(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if self.skip_when is not None and self.skip_when(dict(bound.arguments)):
+                return func(*args, **kwargs)
+            key = tuple((name, _normalize(value, self.case_insensitive)) for name, value in bound.arguments.items())
+
+            found, result = self.get(key)
+            if found:
+                return result
+            result = func(*args, **kwargs)
+            self.set(key, result)
+            return result
+
+        return cached
+
+    def get(self, key) -> tuple:
+        """Returns (True, result) on a hit and (False, None) on a miss."""
+        fingerprint = self._data_fingerprint()
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                self._entries.clear()
+                self._fingerprint = fingerprint
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, result):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Caches of the tools loaded in this process, by tool name.
+_tool_caches = {}
+
+
+def apply_cache_policy(tool: BaseTool) -> Optional[ToolResultCache]:
+    """
+    Wraps a tool declared with @cacheable with a ToolResultCache.
+
+    Returns:
+        Optional[ToolResultCache]: The tool's cache, or None if it did not declare one.
+    """
+    policy = (tool.metadata or {}).get(CACHE_METADATA_KEY)
+    if not policy or getattr(tool, "func", None) is None:
+        return None
+    if tool.name in _tool_caches:
+        return _tool_caches[tool.name]
+    cache = ToolResultCache(tool.name, **policy)
+    tool.func = cache.wrap(tool.func)
+    _tool_caches[tool.name] = cache
+    return cache
+
+
+def get_tool_cache_stats() -> dict:
+    """Returns hit/miss counters of every tool result cache, by tool name."""
+    return {name: cache.stats() for name, cache in _tool_caches.items()}
+
+
+def _cache_gauges():
+    for name, stats in get_tool_cache_stats().items():
+        for field in ("entries", "hits", "misses", "hit_rate"):
+            yield f"hospitalitybot_tool_cache_{field}", {"tool": name}, stats[field]
+
+
+metrics.register_collector(_cache_gauges)
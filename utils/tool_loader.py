@@ -1,8 +1,18 @@
 import os
 import importlib.util
 import inspect
+import logging
 from langchain.tools import BaseTool
 
+from config.settings import TOOL_CACHE_ENABLED
+from utils.metrics import metrics
+from utils.tool_cache import apply_cache_policy
+
+logger = logging.getLogger(__name__)
+
+# `warm_up` functions of the loaded tool modules, which build indexes and models ahead of use.
+_warm_up_hooks = []
+
 def load_tools_from_directory(directory: str) -> dict:
     """
     Dynamically loads all LangChain tools from a given directory.
@@ -10,6 +20,10 @@ def load_tools_from_directory(directory: str) -> dict:
     This function scans all .py files in the specified directory,
     imports them as modules, and inspects them to find any objects
     that are instances of LangChain's BaseTool (which the @tool decorator creates).
+    Tools declared with @cacheable get their result cache attached here,
+    unless TOOL_CACHE_ENABLED is false. Every tool call is timed into the
+    tool latency histogram, cache hits included. A module-level `warm_up()`
+    function, if the module defines one, is registered for `warm_up_tools`.
 
     Args:
         directory (str): The relative path to the directory containing tool files.
@@ -29,9 +43,30 @@ def load_tools_from_directory(directory: str) -> dict:
             if spec and spec.loader:
                 module = importlib.util.module_from_spec(spec)
                 spec.loader.exec_module(module)
+                if callable(getattr(module, "warm_up", None)):
+                    _warm_up_hooks.append((module_name, module.warm_up))
 
                 for name, obj in inspect.getmembers(module):
                     if isinstance(obj, BaseTool):
+                        if TOOL_CACHE_ENABLED:
+                            apply_cache_policy(obj)
+                        if getattr(obj, "func", None) is not None:
+                            obj.func = metrics.timed("hospitalitybot_tool_duration_seconds", tool=obj.name)(obj.func)
                         tool_map[obj.name] = obj
 
-    return tool_map
\ No newline at end of file
+    return tool_map
+
+def warm_up_tools():
+    """
+    Runs the `warm_up` hook of every loaded tool module.
+
+    Tools build their indexes lazily, so without this the first guest to need
+    one pays for loading it. Apps call it once per process, typically on a
+    background thread at startup. Failures are logged and left for the tool
+    to report when it is actually used.
+    """
+    for module_name, hook in list(_warm_up_hooks):
+        try:
+            hook()
+        except Exception as e:
+            logger.warning(f"Warm-up of {module_name} failed: {e}")
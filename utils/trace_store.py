@@ -0,0 +1,375 @@
+import bisect
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from utils.metrics import DEFAULT_LATENCY_BUCKETS, bucket_quantile
+
+logger = logging.getLogger(__name__)
+
+# Trace latencies are whole turns, so the buckets start where node latencies end.
+TRACE_LATENCY_BUCKETS = DEFAULT_LATENCY_BUCKETS + (90.0, 120.0, 180.0, 300.0)
+
+ROW_FIELDS = (
+    "id", "timestamp", "date", "language", "user_query", "agent_response",
+    "intents", "agents_run", "latency", "observations",
+)
+
+
+def trace_to_row(trace) -> dict:
+    """Flattens a Langfuse trace into the columns the dashboard shows."""
+    trace_input = trace.input if isinstance(trace.input, dict) else {}
+    trace_output = trace.output if isinstance(trace.output, dict) else {}
+    timestamp = trace.timestamp
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return {
+        "id": trace.id,
+        "timestamp": timestamp.astimezone(timezone.utc).isoformat(),
+        "date": timestamp.astimezone(timezone.utc).date().isoformat(),
+        "language": trace_input.get("detected_language") or "N/A",
+        "user_query": trace_input.get("original_query", "N/A"),
+        "agent_response": trace_output.get("aggregated_output", "N/A"),
+        "intents": ", ".join(trace_output.get("intents") or []),
+        "agents_run": ", ".join(trace_output.get("processed_intents") or []),
+        "latency": trace.latency,
+        "observations": len(trace.observations) if trace.observations else 0,
+    }
+
+
+class TraceStore:
+    """
+    Local SQLite copy of the Langfuse traces, with incrementally maintained aggregates.
+
+    `sync` pages through the traces API in timestamp order, resuming where the
+    previous call stopped, so each refresh only fetches what is new. Agent counts, daily
+    volume and a latency histogram are kept per language and updated row by
+    row as traces are inserted or change. The dashboard's KPIs therefore cover
+    the full history at a constant cost per refresh.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS traces (
+                    id TEXT PRIMARY KEY, timestamp TEXT, date TEXT, language TEXT,
+                    user_query TEXT, agent_response TEXT, intents TEXT, agents_run TEXT,
+                    latency REAL, observations INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS traces_timestamp ON traces (timestamp);
+                CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS agent_counts (
+                    language TEXT, agent TEXT, count INTEGER, PRIMARY KEY (language, agent)
+                );
+                CREATE TABLE IF NOT EXISTS daily_volume (
+                    language TEXT, date TEXT, count INTEGER, PRIMARY KEY (language, date)
+                );
+                CREATE TABLE IF NOT EXISTS latency_buckets (
+                    language TEXT, bucket INTEGER, count INTEGER, PRIMARY KEY (language, bucket)
+                );
+                CREATE TABLE IF NOT EXISTS language_totals (
+                    language TEXT PRIMARY KEY, traces INTEGER, latency_count INTEGER,
+                    latency_sum REAL, latency_max REAL
+                );
+                """
+            )
+            self._conn.commit()
+
+    # --- Ingestion ---
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_state(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def _add(self, table: str, keys: dict, amount: int):
+        columns = ", ".join(keys)
+        placeholders = ", ".join("?" for _ in keys)
+        self._conn.execute(
+            f"INSERT INTO {table} ({columns}, count) VALUES ({placeholders}, ?) "
+            f"ON CONFLICT ({columns}) DO UPDATE SET count = count + excluded.count",
+            (*keys.values(), amount),
+        )
+
+    def _apply(self, row: dict, sign: int):
+        """Adds (sign=1) or removes (sign=-1) one trace's contribution to the aggregates."""
+        language = row["language"]
+        for agent in filter(None, (row["agents_run"] or "").split(", ")):
+            self._add("agent_counts", {"language": language, "agent": agent}, sign)
+        self._add("daily_volume", {"language": language, "date": row["date"]}, sign)
+
+        latency = row["latency"]
+        if latency is not None:
+            bucket = bisect.bisect_left(TRACE_LATENCY_BUCKETS, latency)
+            self._add("latency_buckets", {"language": language, "bucket": bucket}, sign)
+        self._conn.execute(
+            "INSERT INTO language_totals (language, traces, latency_count, latency_sum, latency_max) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT (language) DO UPDATE SET "
+            "traces = traces + excluded.traces, latency_count = latency_count + excluded.latency_count, "
+            "latency_sum = latency_sum + excluded.latency_sum, "
+            "latency_max = MAX(latency_max, excluded.latency_max)",
+            (
+                language, sign,
+                sign if latency is not None else 0,
+                sign * latency if latency is not None else 0.0,
+                latency if latency is not None else 0.0,
+            ),
+        )
+
+    def upsert(self, rows: List[dict]) -> int:
+        """
+        Stores traces and updates the aggregates for the ones that are new or changed.
+
+        Returns:
+            int: The number of new or changed traces.
+        """
+        changed = 0
+        with self._lock:
+            for row in rows:
+                existing = self._conn.execute("SELECT * FROM traces WHERE id = ?", (row["id"],)).fetchone()
+                if existing is not None:
+                    existing = dict(existing)
+                    if all(existing[field] == row[field] for field in ROW_FIELDS):
+                        continue
+                    # Traces still running when first fetched get their latency and output later.
+                    self._apply(existing, -1)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO traces ({', '.join(ROW_FIELDS)}) "
+                    f"VALUES ({', '.join('?' for _ in ROW_FIELDS)})",
+                    tuple(row[field] for field in ROW_FIELDS),
+                )
+                self._apply(row, 1)
+                changed += 1
+            self._conn.commit()
+        return changed
+
+    def sync(self, api, page_size: int = 100, max_pages: int = 5, overlap_s: float = 300) -> int:
+        """
+        Fetches traces newer than the stored cursor, and re-checks the latest ones.
+
+        The cursor is the timestamp of the newest stored trace. New traces are
+        read forward from it in timestamp order, and the page reached is kept
+        between calls: a backlog larger than `max_pages` pages is worked
+        through over several refreshes instead of being restarted each time.
+        Once the scan reaches the end, the next one starts from the new cursor.
+
+        Separately, one page of the newest traces in the `overlap_s` window
+        before the cursor is fetched again, so that traces which were still
+        running at the last sync get their output and latency once complete.
+        This costs one API call per sync, whatever the traffic.
+
+        Args:
+            api: The Langfuse API client (`langfuse_client.api`).
+            page_size (int): Traces per API page.
+            max_pages (int): Page budget of the forward scan for this call.
+            overlap_s (float): Width of the re-checked window before the cursor, in seconds.
+
+        Returns:
+            int: The number of new or changed traces stored.
+        """
+        with self._lock:
+            cursor = self._get_state("cursor")
+            scan_from = self._get_state("scan_from") or cursor
+            page = int(self._get_state("scan_page") or 1)
+
+        changed = 0
+        if cursor:
+            newest = datetime.fromisoformat(cursor)
+            response = api.trace.list(
+                page=1, limit=page_size, from_timestamp=newest - timedelta(seconds=overlap_s),
+                to_timestamp=newest, order_by="timestamp.desc",
+            )
+            changed += self.upsert([trace_to_row(trace) for trace in response.data])
+
+        from_timestamp = datetime.fromisoformat(scan_from) if scan_from else None
+        finished = False
+        for _ in range(max_pages):
+            response = api.trace.list(
+                page=page, limit=page_size, from_timestamp=from_timestamp, order_by="timestamp.asc",
+            )
+            rows = [trace_to_row(trace) for trace in response.data]
+            if not rows:
+                finished = True
+                break
+            changed += self.upsert(rows)
+            newest = max(row["timestamp"] for row in rows)
+            if cursor is None or newest > cursor:
+                cursor = newest
+            page += 1
+            total_pages = getattr(getattr(response, "meta", None), "total_pages", None)
+            if total_pages is not None and page > total_pages:
+                finished = True
+                break
+
+        if finished:
+            # Everything up to the cursor has been read; the next scan starts there.
+            scan_from, page = cursor, 1
+        with self._lock:
+            if cursor is not None:
+                self._set_state("cursor", cursor)
+            if scan_from is not None:
+                self._set_state("scan_from", scan_from)
+            self._set_state("scan_page", str(page))
+            self._conn.commit()
+
+        if changed:
+            logger.info(f"Synced {changed} new or updated traces (cursor {cursor}).")
+        return changed
+
+    # --- Queries ---
+
+    @staticmethod
+    def _language_filter(languages: Optional[List[str]]) -> tuple:
+        if not languages:
+            return "", ()
+        return f" WHERE language IN ({', '.join('?' for _ in languages)})", tuple(languages)
+
+    @staticmethod
+    def _trace_filter(languages: Optional[List[str]], agents: Optional[List[str]]) -> tuple:
+        """WHERE clause and parameters over the traces table: any of the languages, and any of the agents."""
+        clauses, params = [], []
+        if languages:
+            clauses.append(f"language IN ({', '.join('?' for _ in languages)})")
+            params += languages
+        if agents:
+            clauses.append("(" + " OR ".join("(', ' || agents_run || ', ') LIKE ?" for _ in agents) + ")")
+            params += [f"%, {agent}, %" for agent in agents]
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), tuple(params)
+
+    @staticmethod
+    def _bucket_expression() -> str:
+        """SQL for a trace's latency bucket, the same index `_apply` computes with bisect_left."""
+        cases = " ".join(f"WHEN latency <= {bound!r} THEN {i}" for i, bound in enumerate(TRACE_LATENCY_BUCKETS))
+        return f"CASE {cases} ELSE {len(TRACE_LATENCY_BUCKETS)} END"
+
+    def _bucket_counts(self, languages: Optional[List[str]], agents: Optional[List[str]]) -> list:
+        """(bucket, count) rows. The caller must hold the lock."""
+        if not agents:
+            where, params = self._language_filter(languages)
+            return self._conn.execute(
+                f"SELECT bucket, SUM(count) AS count FROM latency_buckets{where} "
+                f"GROUP BY bucket HAVING SUM(count) > 0 ORDER BY bucket",
+                params,
+            ).fetchall()
+        # The aggregates are kept per language only, so an agent filter is answered from the traces table.
+        where, params = self._trace_filter(languages, agents)
+        where += " AND latency IS NOT NULL" if where else " WHERE latency IS NOT NULL"
+        return self._conn.execute(
+            f"SELECT {self._bucket_expression()} AS bucket, COUNT(*) AS count FROM traces{where} "
+            f"GROUP BY bucket ORDER BY bucket",
+            params,
+        ).fetchall()
+
+    def languages(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT language FROM language_totals WHERE traces > 0 ORDER BY language").fetchall()
+        return [row["language"] for row in rows]
+
+    def agents(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT agent FROM agent_counts WHERE count > 0 ORDER BY agent").fetchall()
+        return [row["agent"] for row in rows]
+
+    def kpis(self, languages: Optional[List[str]] = None, agents: Optional[List[str]] = None) -> dict:
+        """Total traces, mean and p50/p95/p99 latency over the full history."""
+        with self._lock:
+            if agents:
+                where, params = self._trace_filter(languages, agents)
+                totals = self._conn.execute(
+                    f"SELECT COUNT(*) AS traces, COUNT(latency) AS latency_count, "
+                    f"SUM(latency) AS latency_sum, MAX(latency) AS latency_max FROM traces{where}",
+                    params,
+                ).fetchone()
+            else:
+                where, params = self._language_filter(languages)
+                totals = self._conn.execute(
+                    f"SELECT SUM(traces) AS traces, SUM(latency_count) AS latency_count, "
+                    f"SUM(latency_sum) AS latency_sum, MAX(latency_max) AS latency_max FROM language_totals{where}",
+                    params,
+                ).fetchone()
+            bucket_rows = self._bucket_counts(languages, agents)
+
+        counts = [0] * (len(TRACE_LATENCY_BUCKETS) + 1)
+        for row in bucket_rows:
+            counts[row["bucket"]] = row["count"]
+        latency_count = totals["latency_count"] or 0
+        latency_max = totals["latency_max"] or 0.0
+        return {
+            "traces": totals["traces"] or 0,
+            "mean_latency": (totals["latency_sum"] / latency_count) if latency_count else None,
+            **{
+                f"p{q}_latency": bucket_quantile(TRACE_LATENCY_BUCKETS, counts, q / 100, latency_max) if latency_count else None
+                for q in (50, 95, 99)
+            },
+        }
+
+    def agent_counts(self, languages: Optional[List[str]] = None, agents: Optional[List[str]] = None) -> List[dict]:
+        """How often each agent ran, in the traces that ran any of `agents` (all traces by default)."""
+        if not agents:
+            where, params = self._language_filter(languages)
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT agent, SUM(count) AS count FROM agent_counts{where} "
+                    f"GROUP BY agent HAVING SUM(count) > 0 ORDER BY count DESC",
+                    params,
+                ).fetchall()
+            return [dict(row) for row in rows]
+
+        known = self.agents()
+        where, params = self._trace_filter(languages, agents)
+        columns = ", ".join("SUM((', ' || agents_run || ', ') LIKE ?)" for _ in known)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {columns} FROM traces{where}", (*(f"%, {agent}, %" for agent in known), *params),
+            ).fetchone() if known else None
+        counts = [{"agent": agent, "count": row[i] or 0} for i, agent in enumerate(known)] if row else []
+        return sorted((count for count in counts if count["count"] > 0), key=lambda count: -count["count"])
+
+    def daily_volume(self, languages: Optional[List[str]] = None, agents: Optional[List[str]] = None) -> List[dict]:
+        if agents:
+            where, params = self._trace_filter(languages, agents)
+            query = f"SELECT date, COUNT(*) AS count FROM traces{where} GROUP BY date ORDER BY date"
+        else:
+            where, params = self._language_filter(languages)
+            query = (
+                f"SELECT date, SUM(count) AS count FROM daily_volume{where} "
+                f"GROUP BY date HAVING SUM(count) > 0 ORDER BY date"
+            )
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def latency_histogram(self, languages: Optional[List[str]] = None, agents: Optional[List[str]] = None) -> List[dict]:
+        """Trace counts per latency bucket, labelled with the bucket's upper bound."""
+        with self._lock:
+            rows = self._bucket_counts(languages, agents)
+        return [
+            {
+                "le": f"≤ {TRACE_LATENCY_BUCKETS[row['bucket']]:g}s" if row["bucket"] < len(TRACE_LATENCY_BUCKETS) else f"> {TRACE_LATENCY_BUCKETS[-1]:g}s",
+                "count": row["count"],
+            }
+            for row in rows
+        ]
+
+    def recent(self, limit: int = 200, offset: int = 0, languages: Optional[List[str]] = None, agents: Optional[List[str]] = None) -> List[dict]:
+        """The newest traces matching the filters, for the table view."""
+        where, params = self._trace_filter(languages, agents)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM traces{where} ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [dict(row) for row in rows]
@@ -7,6 +7,7 @@ import logging
 import audioop
 import torch
 import tempfile
+import time
 from datetime import datetime
 from typing import Generator
 from pathlib import Path
@@ -14,6 +15,7 @@ from onnxruntime import InferenceSession
 from piper.config import PiperConfig
 from piper.voice import PiperVoice, AudioChunk
 from config.settings import PIPER_VOICE_MODEL_PATH, WHISPER_MODEL_NAME, WHISPER_DOWNLOAD_ROOT
+from utils.metrics import metrics
 
 class SpeechToTextManager:
     """
@@ -48,9 +50,10 @@ class SpeechToTextManager:
         except Exception as e:
             self.logger.error(f"Failed to load Whisper model: {e}", exc_info=True)
 
-    def transcribe_audio(self, audio_data: bytes, suffix: str = ".wav") -> str | None:
+    def transcribe_audio(self, audio_data: bytes | bytearray | memoryview, suffix: str = ".wav") -> str | None:
         """
         Transcribes mu-law encoded audio data using Whisper (via temp WAV).
+        Accepts any bytes-like buffer so downloads can be passed in without copying.
         """
         if not audio_data:
             return None
@@ -69,7 +72,8 @@ class SpeechToTextManager:
                 f.write(audio_data)
 
             # Transcribe from file path
-            result = self._model.transcribe(temp_audio_path, fp16=self.use_fp16)
+            with metrics.timer("hospitalitybot_stt_duration_seconds", model=WHISPER_MODEL_NAME):
+                result = self._model.transcribe(temp_audio_path, fp16=self.use_fp16)
             transcript = result.get("text", "").strip()
 
             self.logger.info(f"Transcription result: '{transcript}'")
@@ -132,9 +136,15 @@ class TextToSpeechManager:
         in_rate = self.config.sample_rate
         sample_width = 2  # 16-bit PCM
         n_channels = 1    # mono
+        start = time.perf_counter()
+        first_chunk = True
+        status = "ok"
 
         try:
             for audio_chunk in self._voice.synthesize(text):
+                if first_chunk:
+                    metrics.observe("hospitalitybot_tts_first_chunk_seconds", time.perf_counter() - start)
+                    first_chunk = False
                 if not isinstance(audio_chunk, AudioChunk):
                     self.logger.error("Unexpected object from Piper.")
                     continue
@@ -145,4 +155,8 @@ class TextToSpeechManager:
                 mulaw_chunk = audioop.lin2ulaw(resampled_pcm, sample_width)
                 yield mulaw_chunk
         except Exception as e:
+            status = "error"
             self.logger.error(f"Piper synthesis error: {e}", exc_info=True)
+        finally:
+            # Covers synthesis only up to where the consumer stopped reading.
+            metrics.observe("hospitalitybot_tts_duration_seconds", time.perf_counter() - start, status=status)
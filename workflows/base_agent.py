@@ -1,29 +1,161 @@
 from langgraph.prebuilt import create_react_agent
 from config.llm_loader import load_llm
+from config.settings import AGENT_MAX_STEPS, AGENT_MAX_TOOL_CALLS, AGENT_TIMEOUT_S, TURN_FINALIZE_RESERVE_S
+from utils.metrics import metrics
+from utils.rate_limiter import CallCancelled, cancellable
+import contextvars
 import logging
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+import threading
+import time
+from typing import Optional, Set
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
+
+OUT_OF_BUDGET_REPLY = "I couldn't finish looking into this in time."
+# stopped_by reasons that mean the agent ran out of budget (as opposed to a speculative run being stopped).
+BUDGET_STOP_REASONS = ("max_steps", "max_tool_calls", "timeout")
+
+
+class _RunProgress:
+    """What one agent run has produced so far, shared between the worker and the caller."""
+
+    def __init__(self):
+        self.steps = 0
+        self.tool_calls = 0
+        self.final_answer = None
+        self.last_text = ""
+        self.tool_outputs = []
+        self.stopped_by = None
+        self.error = None
+        self.lock = threading.Lock()
+
+    def stop(self, reason: str):
+        """Records why the run stopped. The first reason wins; the worker and the caller may both report one."""
+        with self.lock:
+            if self.stopped_by is None:
+                self.stopped_by = reason
+
+    def best_answer(self) -> str:
+        """The final answer if there is one, otherwise the most useful partial result."""
+        with self.lock:
+            if self.final_answer:
+                return self.final_answer
+            if self.tool_outputs:
+                return "Partial results gathered so far:\n" + "\n".join(self.tool_outputs)
+            return self.last_text or OUT_OF_BUDGET_REPLY
+
 
 class ReActAgent:
-    def __init__(self, tools):
+    def __init__(self, tools, name: str = "agent", max_steps: int = AGENT_MAX_STEPS,
+                 max_tool_calls: int = AGENT_MAX_TOOL_CALLS, timeout_s: float = AGENT_TIMEOUT_S):
         """
         Initializes a ReAct agent with a given set of tools.
 
         Args:
             tools (dict): A dictionary of tools available to the agent.
+            name (str): The agent's name, used in logs and metrics.
+            max_steps (int): Maximum model calls per run.
+            max_tool_calls (int): Maximum tool calls per run.
+            timeout_s (float): Maximum wall-clock seconds per run.
         """
-        self.llm = load_llm()
+        self.name = name
+        self.max_steps = max_steps
+        self.max_tool_calls = max_tool_calls
+        self.timeout_s = timeout_s
+        self.llm = load_llm(role="agent")
         self.agent = create_react_agent(model=self.llm, tools=list(tools.values()))
 
-    def __call__(self, state: dict) -> dict:
+    def _record(self, progress: _RunProgress, update: dict, safe_tools: Optional[Set[str]] = None) -> Optional[str]:
         """
-        Executes the agent with the user's input from the state.
+        Accounts for one streamed graph update.
+
+        Returns:
+            Optional[str]: Why the run must stop before its next step ("max_steps",
+                "max_tool_calls", or "unsafe_tool" for a tool outside `safe_tools`),
+                or None to continue.
+        """
+        with progress.lock:
+            for node_update in update.values():
+                for msg in (node_update or {}).get("messages", []):
+                    if isinstance(msg, ToolMessage):
+                        progress.tool_outputs.append(str(msg.content))
+                    elif isinstance(msg, AIMessage):
+                        progress.steps += 1
+                        if msg.content:
+                            progress.last_text = msg.content if isinstance(msg.content, str) else str(msg.content)
+                        if not msg.tool_calls:
+                            progress.final_answer = progress.last_text
+                            return None
+                        # Stop before the tools run, not after, so the caps are never exceeded.
+                        if safe_tools is not None and any(call["name"] not in safe_tools for call in msg.tool_calls):
+                            return "unsafe_tool"
+                        if progress.tool_calls + len(msg.tool_calls) > self.max_tool_calls:
+                            return "max_tool_calls"
+                        if progress.steps >= self.max_steps:
+                            return "max_steps"
+                        progress.tool_calls += len(msg.tool_calls)
+        return None
+
+    def _run(self, messages: list, progress: _RunProgress, cancelled: threading.Event, done: threading.Event,
+             safe_tools: Optional[Set[str]] = None):
+        """
+        The ReAct loop, run on the worker thread.
+
+        It runs in a copy of the caller's context, so the node's callbacks
+        (Langfuse tracing) see every model and tool call. It stops before the
+        next step once `cancelled` is set, and LLM calls made after that raise
+        CallCancelled instead of waiting for a provider slot or retrying.
+        """
+        # The recursion limit is only a backstop; _record stops the run first.
+        config = {"recursion_limit": 2 * self.max_steps + 2}
+        stream = self.agent.stream({"messages": messages}, config=config, stream_mode="updates")
+        try:
+            with cancellable(cancelled):
+                for update in stream:
+                    reason = self._record(progress, update, safe_tools)
+                    if reason:
+                        progress.stop(reason)
+                        break
+                    if cancelled.is_set():
+                        progress.stop("cancelled")
+                        break
+        except CallCancelled:
+            progress.stop("cancelled")
+        except Exception as e:
+            progress.error = e
+        finally:
+            stream.close()
+            done.set()
+
+    def __call__(self, state: dict, deadline: Optional[float] = None, cancelled: Optional[threading.Event] = None,
+                 safe_tools: Optional[Set[str]] = None) -> dict:
+        """
+        Executes the agent with the user's input from the state, within its budgets.
+
+        The ReAct loop runs on a worker thread and is stopped before a step that
+        would exceed the step or tool-call budget. The caller waits at most
+        until the agent's timeout or the turn deadline (minus the reserve for
+        the final response), whichever is sooner. A run that is cut short
+        returns its best partial answer: the final answer if there is one,
+        else the tool results gathered so far.
 
         Args:
             state (dict): The current state of the graph.
+            deadline (float, optional): time.monotonic() value by which the whole turn must finish.
+            cancelled (threading.Event, optional): Set by the caller to stop the run at its next step.
+            safe_tools (Set[str], optional): If given, the run stops before calling any
+                other tool, with stopped_by "unsafe_tool". Used for speculative runs.
 
         Returns:
-            dict: The updated state with the agent's 'output'.
+            dict: The updated state with the agent's 'output', and 'stopped_by'
+                (None, or the reason the run was cut short).
         """
+        timeout_s = self.timeout_s
+        if deadline is not None:
+            timeout_s = min(timeout_s, deadline - TURN_FINALIZE_RESERVE_S - time.monotonic())
+        if timeout_s <= 0:
+            metrics.inc("hospitalitybot_agent_budget_exhausted_total", agent=self.name, reason="deadline")
+            return {"output": OUT_OF_BUDGET_REPLY, "stopped_by": "deadline"}
+
         try:
             # Sanitize the history to prevent confusion from old tool calls.
             # This ensures we only pass the text content of user and AI messages,
@@ -36,8 +168,29 @@ class ReActAgent:
             ]
 
             # The agent expects the system prompt to be part of the messages list.
-            result = self.agent.invoke({"messages": clean_history})
-            return {"output": result['messages'][-1].content}
+            progress, done = _RunProgress(), threading.Event()
+            cancelled = cancelled or threading.Event()
+            # The worker runs in a copy of this context, which carries the node's run config and callbacks.
+            context = contextvars.copy_context()
+            worker = threading.Thread(
+                target=context.run, args=(self._run, clean_history, progress, cancelled, done, safe_tools),
+                name=f"react-{self.name}", daemon=True,
+            )
+            worker.start()
+            if not done.wait(timeout=timeout_s):
+                # The worker finishes its current model or tool call in the background, then stops.
+                progress.stop("timeout")
+                cancelled.set()
+
+            if progress.error is not None and not progress.final_answer:
+                raise progress.error
+            if progress.stopped_by in BUDGET_STOP_REASONS:
+                logging.warning(
+                    f"{self.name} stopped by {progress.stopped_by} after {progress.steps} steps "
+                    f"and {progress.tool_calls} tool calls; returning its partial answer."
+                )
+                metrics.inc("hospitalitybot_agent_budget_exhausted_total", agent=self.name, reason=progress.stopped_by)
+            return {"output": progress.best_answer(), "stopped_by": progress.stopped_by}
         except Exception as e:
             logging.error(f"Error in ReActAgent: {e}", exc_info=True)
             return {"output": "I encountered an error. Please try again."}
@@ -0,0 +1,97 @@
+# workflows/context_builder.py
+from typing import List, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+# Rough per-message overhead for role markers and separators.
+MESSAGE_OVERHEAD_TOKENS = 4
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimates the token count of a string.
+
+    Uses the common ~4 characters per token approximation, which is close enough
+    for budgeting across providers and needs no tokenizer download.
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def count_message_tokens(message: BaseMessage) -> int:
+    return count_tokens(str(message.content)) + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text down to roughly `max_tokens`, marking the cut with an ellipsis."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    return text[: max_tokens * CHARS_PER_TOKEN - 1].rstrip() + "…"
+
+
+class ContextBuilder:
+    """
+    Assembles prompt context within a token budget.
+
+    Fixed instructions are always kept, as is the latest message (the user's
+    current query). When the rest does not fit, retrieved memory is truncated
+    first and then the oldest conversation turns are dropped.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+
+    def build(
+        self,
+        fixed_parts: List[str],
+        history: List[BaseMessage],
+        memory: str = "",
+    ) -> Tuple[str, List[BaseMessage], dict]:
+        """
+        Fits memory and history into the budget left over by the fixed parts.
+
+        Args:
+            fixed_parts (List[str]): Instruction blocks that must be sent in full.
+            history (List[BaseMessage]): Conversation messages, oldest first. The last one is always kept.
+            memory (str): Retrieved long-term memory, if any.
+
+        Returns:
+            Tuple[str, List[BaseMessage], dict]: The (possibly truncated) memory,
+            the trimmed history and a per-component token report.
+        """
+        fixed_tokens = sum(count_tokens(part) for part in fixed_parts)
+        history_tokens = [count_message_tokens(msg) for msg in history]
+        available = self.budget - fixed_tokens
+
+        # Drop the oldest turns until the history fits, always keeping the latest message.
+        start = 0
+        total = sum(history_tokens)
+        while total > available and start < len(history) - 1:
+            total -= history_tokens[start]
+            start += 1
+        # A trimmed history should start on a user turn, as some providers require.
+        while start and start < len(history) - 1 and not isinstance(history[start], HumanMessage):
+            total -= history_tokens[start]
+            start += 1
+        trimmed_history = history[start:]
+
+        # Memory has lower priority than the history and only gets what is left over.
+        memory = truncate_to_tokens(memory, available - total) if memory else ""
+
+        report = {
+            "budget": self.budget,
+            "fixed": fixed_tokens,
+            "memory": count_tokens(memory),
+            "history": total,
+            "dropped_messages": start,
+        }
+        return memory, trimmed_history, report
+
+    def trim_history(self, fixed_parts: List[str], history: List[BaseMessage]) -> List[BaseMessage]:
+        """Convenience wrapper for callers without retrieved memory."""
+        _, trimmed_history, _ = self.build(fixed_parts, history)
+        return trimmed_history
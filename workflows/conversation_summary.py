@@ -0,0 +1,109 @@
+# workflows/conversation_summary.py
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage
+
+from config.llm_loader import load_llm
+from config.settings import CONVERSATION_WINDOW_SIZE, SUMMARY_MIN_BATCH, SUMMARY_MAX_TOKENS
+from utils.prompt_loader import load_prompt_from_file
+from workflows.context_builder import truncate_to_tokens
+
+SUMMARY_PROMPT = load_prompt_from_file("config/prompts/conversation_summary_prompt.txt")
+
+
+class RollingSummary:
+    """
+    Running summary of one session's conversation.
+
+    `summarized_count` is the number of messages, from the start of the
+    session's history, that are already folded into `text`.
+    """
+
+    def __init__(self, text: str = "", summarized_count: int = 0):
+        # Pass the values saved in a thread's checkpoint to resume a session.
+        self.text = text
+        self.summarized_count = summarized_count if text else 0
+        self._pending = False
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Tuple[str, int]:
+        """Returns the summary text and the number of messages folded into it, consistently."""
+        with self._lock:
+            return self.text, self.summarized_count
+
+
+class ConversationSummarizer:
+    """
+    Folds messages that have left the conversation window into a RollingSummary.
+
+    Updates run on a small background pool so they never add to turn latency.
+    Each update summarizes only the newly evicted messages on top of the
+    previous summary, so the cost per update stays constant however long the
+    conversation gets.
+    """
+
+    def __init__(self, window_size: int = CONVERSATION_WINDOW_SIZE, min_batch: int = SUMMARY_MIN_BATCH, max_workers: int = 2):
+        self.window_size = window_size
+        self.min_batch = min_batch
+        self.llm = load_llm(role="summarizer")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="conversation-summary")
+
+    def schedule_update(self, summary: RollingSummary, messages: List[BaseMessage], first_index: int = 0) -> Optional[Future]:
+        """
+        Starts a background update if enough messages have fallen out of the window.
+
+        Args:
+            summary (RollingSummary): The session's summary.
+            messages (List[BaseMessage]): The thread's stored messages.
+            first_index (int): Position of messages[0] in the conversation (the
+                thread's message_base). Messages dropped before the summary
+                covered them are skipped.
+
+        Returns:
+            Optional[Future]: The running update, or None if nothing was scheduled.
+        """
+        with summary._lock:
+            start = max(summary.summarized_count, first_index)
+            evicted = messages[start - first_index:max(len(messages) - self.window_size, 0)]
+            if summary._pending or len(evicted) < self.min_batch:
+                return None
+            summary._pending = True
+        return self._executor.submit(self._update, summary, evicted, start + len(evicted))
+
+    def _update(self, summary: RollingSummary, evicted: List[BaseMessage], summarized_count: int):
+        try:
+            prompt = SUMMARY_PROMPT.format(
+                summary=summary.text or "(empty)",
+                new_messages="\n".join(f"{msg.type}: {msg.content}" for msg in evicted),
+                max_words=SUMMARY_MAX_TOKENS * 3 // 4,
+            )
+            new_text = truncate_to_tokens(self.llm.invoke(prompt).content.strip(), SUMMARY_MAX_TOKENS)
+            with summary._lock:
+                summary.text = new_text
+                summary.summarized_count = summarized_count
+        except Exception as e:
+            logging.error(f"Conversation summary update failed: {e}", exc_info=True)
+        finally:
+            with summary._lock:
+                summary._pending = False
+
+
+def history_context(summary: Optional[RollingSummary], message_count: int, window_size: int = CONVERSATION_WINDOW_SIZE) -> Tuple[str, int]:
+    """
+    Decides how a thread's history is presented to the graph this turn.
+
+    Args:
+        summary (RollingSummary, optional): The session's summary, or None when
+            rolling summaries are disabled.
+        message_count (int): Messages in the thread, including the new one.
+        window_size (int): Messages kept verbatim when there is no summary.
+
+    Returns:
+        Tuple[str, int]: The conversation_summary and history_offset fields for the turn.
+    """
+    if summary is not None:
+        return summary.snapshot()
+    return "", max(message_count - window_size, 0)
@@ -1,5 +1,5 @@
 # workflows/formatter.py
-from hospitalitybot.state import AgentState
+from hospitalitybot.state import AgentState, summarized_messages
 from langchain_core.messages import AIMessage
 
 def format_output(state: AgentState) -> dict:
@@ -7,10 +7,15 @@ def format_output(state: AgentState) -> dict:
     Takes the final aggregated output and formats it into an AIMessage,
     adding it to the conversation history. This makes the AI's response
     part of the state for the next turn in a conversation.
+
+    Messages the conversation summary already covers are dropped at the same
+    time, so the checkpointed history doesn't grow with the session.
     """
     # Get the final response synthesized by the summarizer
     final_response = state.get("aggregated_output", "I'm sorry, I don't have a response for you.")
     
     # Create the AIMessage and return it to be added to the state.
-    # The `operator.add` on the `messages` field in AgentState handles appending.
-    return {"messages": [AIMessage(content=final_response)]}
\ No newline at end of file
+    # The append-only reducer on the `messages` field in AgentState adds it to the thread.
+    update = summarized_messages(state)
+    update.messages.append(AIMessage(content=final_response))
+    return {"messages": update, "message_base": state.get("message_base", 0) + update.count}
\ No newline at end of file
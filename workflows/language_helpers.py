@@ -2,8 +2,9 @@
 from config.llm_loader import load_llm
 from utils.prompt_loader import load_prompt_from_file
 
-# Use the same shared LLM instance
-SHARED_LLM = load_llm()
+# Shared LLM clients from the central registry
+DETECTION_LLM = load_llm(role="language")
+TRANSLATION_LLM = load_llm(role="translation")
 
 # --- Prompts for Language Tasks ---
 DETECTION_PROMPT = load_prompt_from_file("config/prompts/language_detection_prompt.txt")
@@ -11,8 +12,8 @@ TRANSLATION_PROMPT = load_prompt_from_file("config/prompts/translation_prompt.tx
 
 # --- Chains for Language Tasks ---
 
-detection_chain = DETECTION_PROMPT | SHARED_LLM
-translation_chain = TRANSLATION_PROMPT | SHARED_LLM
+detection_chain = DETECTION_PROMPT | DETECTION_LLM
+translation_chain = TRANSLATION_PROMPT | TRANSLATION_LLM
 
 # --- Helper Functions ---
 
@@ -4,7 +4,9 @@ from config.settings import CONFIDENCE_THRESHOLD, ROUTER_INTENTS
 import json
 import os
 import re
-from config.settings import CONVERSATION_WINDOW_SIZE
+from config.settings import CONTEXT_TOKEN_BUDGETS
+from workflows.context_builder import ContextBuilder
+from hospitalitybot.state import recent_messages
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from typing import List
 import logging
@@ -17,7 +19,8 @@ def load_prompt():
         return PromptTemplate.from_template(f.read())
 
 prompt = load_prompt()
-llm = load_llm()
+llm = load_llm(role="router")
+ROUTER_CONTEXT = ContextBuilder(CONTEXT_TOKEN_BUDGETS["router"])
 
 
 def route_intent(state: dict) -> dict:
@@ -30,13 +33,20 @@ def route_intent(state: dict) -> dict:
     Returns:
         dict: The updated state with 'intent' and 'confidence' keys.
     """
-    messages = state["messages"][-CONVERSATION_WINDOW_SIZE:]
+    # Only the turns not yet covered by the summary are shown verbatim.
+    messages = recent_messages(state)
     if not messages:
         # Should not happen in a normal flow, but good practice to handle
-        return {"intents": ["general"], "confidence": 0, "processed_intents": [], "aggregated_output": ""}
+        return {"intents": ["general"], "confidence": 0, "processed_intents": None, "aggregated_output": ""}
     user_input = messages[-1].content
 
-    chat_history = "\n".join([f"{msg.type}: {msg.content}" for msg in messages[:-1]])
+    # Older turns are represented by the rolling summary rather than verbatim.
+    summary = state.get("conversation_summary")
+    summary_str = f"Summary of earlier conversation: {summary}\n" if summary else ""
+
+    # Keep the classification prompt within the router's token budget by dropping the oldest turns.
+    messages = ROUTER_CONTEXT.trim_history([prompt.template, json.dumps(ROUTER_INTENTS), summary_str], messages)
+    chat_history = summary_str + "\n".join([f"{msg.type}: {msg.content}" for msg in messages[:-1]])
 
     try:
         formatted_prompt = prompt.format(
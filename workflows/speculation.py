@@ -0,0 +1,181 @@
+# workflows/speculation.py
+import contextvars
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+from utils.metrics import metrics
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+class KeywordIntentPredictor:
+    """
+    Guesses the most likely agent for a message from keywords, without an LLM call.
+
+    Each agent scores one point per distinct keyword found in the message. The
+    prediction is the best-scoring agent, but only if it scores at least
+    `min_score` and strictly more than every other agent; otherwise there is
+    no prediction. It only decides what to start early, never the route itself.
+    """
+
+    def __init__(self, keywords: Dict[str, Iterable[str]], min_score: int = 1):
+        self.min_score = min_score
+        self._agents_by_word: Dict[str, set] = {}
+        for agent, words in keywords.items():
+            for word in words:
+                self._agents_by_word.setdefault(word.lower(), set()).add(agent)
+
+    def predict(self, text: str) -> Optional[str]:
+        """
+        Args:
+            text (str): The guest's message, in English.
+
+        Returns:
+            Optional[str]: The predicted agent, or None if no agent clearly stands out.
+        """
+        scores: Dict[str, int] = {}
+        for word in set(_WORD_PATTERN.findall(text.lower())):
+            for agent in self._agents_by_word.get(word, ()):
+                scores[agent] = scores.get(agent, 0) + 1
+        if not scores:
+            return None
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_agent, best_score = ranked[0]
+        if best_score < self.min_score or (len(ranked) > 1 and ranked[1][1] == best_score):
+            return None
+        return best_agent
+
+
+class _Speculation:
+    def __init__(self, agent: str):
+        self.agent = agent
+        self.cancelled = threading.Event()
+        self.future: Optional[Future] = None
+        self.run_seconds = 0.0
+
+
+class SpeculationRegistry:
+    """
+    Agent runs started before the router has decided, keyed by speculation_id.
+
+    Agents register the function that computes their result. `start` runs it
+    on a worker pool while the router is still classifying the message. The
+    agent's graph node then `claim`s the result if the router picked that
+    agent. If the router picked another one, `discard` cancels the run, and
+    the agent time it had already used is counted as wasted.
+
+    Outcomes are counted in hospitalitybot_speculation_total by agent:
+    "hit" (result used), "blocked" (the run reached a tool with side effects
+    and the agent ran again normally), "queued" (the run had not started when
+    claimed, so the agent ran inline instead), "miss" (router disagreed),
+    "unused" (the turn ended without reaching the agent) and "error".
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculation")
+        self._runners: Dict[str, Callable] = {}
+        self._pending: Dict[str, _Speculation] = {}
+        self._lock = threading.Lock()
+
+    def register(self, agent: str, runner: Callable):
+        """
+        Makes an agent eligible for speculation.
+
+        Args:
+            agent (str): The agent's name, as returned by the router.
+            runner (Callable): `runner(state, config, cancelled)` returning the
+                agent's result. It must have no side effects and must stop
+                soon after the `cancelled` event is set.
+        """
+        self._runners[agent] = runner
+
+    def start(self, speculation_id: str, agent: str, state: dict, config: dict) -> bool:
+        """
+        Starts running `agent` on `state` ahead of the router's decision.
+
+        Returns:
+            bool: Whether a run was started. Nothing starts for agents that
+                did not register or if this speculation_id already has a run.
+        """
+        runner = self._runners.get(agent)
+        if runner is None:
+            return False
+        speculation = _Speculation(agent)
+        with self._lock:
+            if speculation_id in self._pending:
+                return False
+            self._pending[speculation_id] = speculation
+            # Run in a copy of the caller's context so tracing callbacks follow the speculative run.
+            speculation.future = self._executor.submit(
+                contextvars.copy_context().run, self._execute, speculation, runner, state, config
+            )
+        return True
+
+    def _execute(self, speculation: _Speculation, runner: Callable, state: dict, config: dict):
+        start = time.perf_counter()
+        try:
+            return runner(state, config, speculation.cancelled)
+        finally:
+            speculation.run_seconds = time.perf_counter() - start
+
+    def claim(self, speculation_id: str, agent: str, usable: Callable[[dict], bool] = lambda result: True) -> Optional[dict]:
+        """
+        Takes the speculative result for `agent`, waiting for the run to finish.
+
+        A run still queued behind busy workers is cancelled instead, so the
+        node runs the agent itself rather than waiting for the pool.
+
+        Args:
+            speculation_id (str): The turn's speculation id.
+            agent (str): The agent whose graph node is running.
+            usable (Callable): Whether a finished result can stand in for a
+                normal run. Unusable results count as "blocked" and wasted.
+
+        Returns:
+            Optional[dict]: The runner's result, or None if no usable run was
+                started for this agent; the caller then runs the agent itself.
+        """
+        with self._lock:
+            speculation = self._pending.get(speculation_id)
+            if speculation is None or speculation.agent != agent:
+                return None
+            del self._pending[speculation_id]
+        if speculation.future.cancel():
+            metrics.inc("hospitalitybot_speculation_total", agent=agent, outcome="queued")
+            return None
+        try:
+            result = speculation.future.result()
+        except Exception as e:
+            logging.error(f"Speculative run of {agent} failed: {e}", exc_info=True)
+            metrics.inc("hospitalitybot_speculation_total", agent=agent, outcome="error")
+            return None
+        if not usable(result):
+            metrics.inc("hospitalitybot_speculation_total", agent=agent, outcome="blocked")
+            metrics.inc("hospitalitybot_speculation_wasted_seconds_total", speculation.run_seconds, agent=agent)
+            return None
+        metrics.inc("hospitalitybot_speculation_total", agent=agent, outcome="hit")
+        return result
+
+    def discard(self, speculation_id: str, outcome: str = "miss"):
+        """
+        Cancels the run for this speculation_id, if one is still pending.
+
+        The run stops at its next step; its agent time is added to
+        hospitalitybot_speculation_wasted_seconds_total once it has stopped.
+        """
+        with self._lock:
+            speculation = self._pending.pop(speculation_id, None)
+        if speculation is None:
+            return
+        speculation.cancelled.set()
+        speculation.future.cancel()
+        metrics.inc("hospitalitybot_speculation_total", agent=speculation.agent, outcome=outcome)
+        speculation.future.add_done_callback(
+            lambda _: metrics.inc(
+                "hospitalitybot_speculation_wasted_seconds_total", speculation.run_seconds, agent=speculation.agent
+            )
+        )